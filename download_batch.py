@@ -36,10 +36,15 @@
 import subprocess
 import argparse
 import re
+import base64
+import queue
+import threading
 import requests
+from collections import deque
 from pathlib import Path
-from mutagen.mp3 import MP3
-from mutagen.id3 import ID3
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from mutagen import File as MutagenFile
+from mutagen.flac import Picture
 from datetime import datetime
 
 # 尝试导入spotdl相关模块
@@ -48,17 +53,27 @@
     from spotdl.utils.spotify import SpotifyClient
     from spotdl.download.downloader import Downloader
     from spotdl.utils.config import SPOTIFY_OPTIONS
+    from spotdl.utils.formatter import sanitize_string
     SPOTDL_AVAILABLE = True
 except ImportError:
     SPOTDL_AVAILABLE = False
     SPOTIFY_OPTIONS = None
     print("⚠️  警告: spotdl模块不可用，将无法获取元数据")
 
+    def sanitize_string(string):
+        """与spotdl.utils.formatter.sanitize_string相同的文件名清理规则"""
+        string = "".join(char for char in string if char not in "/?\\*|<>")
+        return string.replace('"', "'").replace(":", "-")
+
+
+# spotdl每完成一首歌（标签和歌词都已写入）输出的日志行
+DOWNLOADED_REGEX = re.compile(r'Downloaded "(?P<name>.+?)": ')
+
 
 class SpotifyBatchDownloader:
     """Spotify批量下载器类"""
     
-    def __init__(self, output_dir="downloads", audio_format="mp3", max_songs=None):
+    def __init__(self, output_dir="downloads", audio_format="mp3", max_songs=None, workers=None):
         """
         初始化下载器
         
@@ -66,11 +81,13 @@ def __init__(self, output_dir="downloads", audio_format="mp3", max_songs=None):
             output_dir: 下载目录
             audio_format: 音频格式 (mp3, wav, flac等)
             max_songs: 最大下载数量（用于歌手）
+            workers: 并行处理文件的线程数（默认: CPU核心数，最多8个）
         """
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
         self.audio_format = audio_format
         self.max_songs = max_songs
+        self.workers = workers or min(8, os.cpu_count() or 1)
         
         # 初始化Spotify客户端（如果可用）
         if SPOTDL_AVAILABLE and SPOTIFY_OPTIONS:
@@ -121,11 +138,24 @@ def detect_url_type(self, spotify_url):
     
     def get_songs_list(self, spotify_url):
         """
-        获取URL对应的歌曲列表
+        获取URL对应的歌曲列表（等待全部下载完成）
         
         Returns:
             list: 临时目录中下载的音频文件列表
         """
+        return list(self.iter_songs(spotify_url))
+    
+    def iter_songs(self, spotify_url):
+        """
+        逐首返回已下载完成的音频文件
+        
+        spotdl子进程的输出会被实时读取，每出现一行
+        'Downloaded "...": ...' 就立即返回对应的文件，
+        调用方可以在其余歌曲仍在下载时开始后处理。
+        
+        Yields:
+            Path: 已下载完成（含标签和歌词）的音频文件
+        """
         temp_dir = self.output_dir / "temp"
         temp_dir.mkdir(exist_ok=True)
         
@@ -135,6 +165,7 @@ def get_songs_list(self, spotify_url):
             "--output", str(temp_dir),
             "--format", self.audio_format,
             "--generate-lrc",
+            "--simple-tui",
             spotify_url
         ]
         
@@ -143,74 +174,111 @@ def get_songs_list(self, spotify_url):
         if url_type == 'artist' and self.max_songs:
             print(f"⚠️  歌手模式：将下载最多 {self.max_songs} 首热门歌曲")
         
+        # 加宽终端，避免rich日志自动换行导致无法匹配完成行
+        env = dict(os.environ, COLUMNS="10000", PYTHONIOENCODING="utf-8")
+        
+        yielded = set()
+        output_tail = deque(maxlen=200)
+        
+        def pending_files():
+            return [
+                f for f in sorted(temp_dir.glob(f"*.{self.audio_format}"))
+                if f not in yielded
+            ]
+        
         try:
-            # 使用Popen而不是run，以便更好地处理长时间运行的进程
+            # stderr合并到stdout，逐行读取，避免管道写满阻塞子进程
             process = subprocess.Popen(
                 cmd,
                 stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
                 text=True,
-                bufsize=1
+                encoding="utf-8",
+                errors="replace",
+                bufsize=1,
+                env=env
             )
-            stdout, stderr = process.communicate()
             
-            audio_files = list(temp_dir.glob(f"*.{self.audio_format}"))
-            if not audio_files:
+            with process:
+                for line in process.stdout:
+                    output_tail.append(line)
+                    match = DOWNLOADED_REGEX.search(line)
+                    if not match:
+                        continue
+                    
+                    audio_file = self._match_downloaded_file(
+                        match.group('name'), pending_files()
+                    )
+                    if audio_file is not None:
+                        yielded.add(audio_file)
+                        yield audio_file
+                
+                process.wait()
+            
+            # 进程结束后所有文件都已完成，补上未能按名称匹配到的文件
+            for audio_file in pending_files():
+                yielded.add(audio_file)
+                yield audio_file
+            
+            output = "".join(output_tail)
+            
+            if not yielded:
                 print(f"⚠️  警告: 命令执行成功但未找到音频文件")
                 print(f"   查找目录: {temp_dir}")
                 print(f"   查找格式: *.{self.audio_format}")
                 all_files = list(temp_dir.glob("*"))
                 if all_files:
                     print(f"   目录中的文件: {[f.name for f in all_files]}")
-                if stdout:
-                    print(f"   命令输出: {stdout[:500]}")
+                if output:
+                    print(f"   命令输出: {output[-500:]}")
             
             if process.returncode != 0:
                 error_msg = f"❌ 下载失败 (返回码: {process.returncode})"
                 error_detail = ""
                 
                 # 提取关键错误信息
-                if stderr:
-                    error_msg += f"\n错误信息: {stderr[:1000]}"
+                if output:
+                    error_msg += f"\n错误信息: {output[-1000:]}"
                     # 检查是否是"No results found"错误
-                    if "No results found" in stderr or "LookupError" in stderr:
+                    if "No results found" in output or "LookupError" in output:
                         # 尝试提取歌曲名称
-                        match = re.search(r'No results found for song: (.+)', stderr)
+                        match = re.search(r'No results found for song: (.+)', output)
                         if match:
                             song_name = match.group(1).strip()
                             error_detail = f"未找到匹配的歌曲: {song_name}。可能原因：1) YouTube上不存在该歌曲 2) 歌曲名称不匹配 3) 地区限制"
                         else:
                             error_detail = "未找到匹配的歌曲。可能原因：1) YouTube上不存在该歌曲 2) 歌曲名称不匹配 3) 地区限制"
                     else:
-                        error_detail = stderr[:500]
-                
-                if stdout:
-                    error_msg += f"\n输出: {stdout[:500]}"
+                        error_detail = output[-500:]
                 
                 print(error_msg)
                 if error_detail:
                     print(f"   详细说明: {error_detail}")
-                return []
-            
-            return audio_files
         except BrokenPipeError as e:
             error_msg = f"❌ 下载失败: 管道中断 (Broken pipe)"
             print(error_msg)
-            return []
-        except subprocess.CalledProcessError as e:
-            error_msg = f"❌ 下载失败 (返回码: {e.returncode})"
-            if e.stderr:
-                error_msg += f"\n错误信息: {e.stderr[:1000]}"
-            if e.stdout:
-                error_msg += f"\n输出: {e.stdout[:500]}"
-            print(error_msg)
-            return []
         except Exception as e:
             error_msg = f"❌ 下载失败: {str(e)}"
             print(error_msg)
             import traceback
             traceback.print_exc()
-            return []
+    
+    def _match_downloaded_file(self, display_name, candidates):
+        """
+        根据spotdl输出的歌曲名（"艺术家 - 标题"）找到对应的临时文件
+        
+        display_name只包含第一位艺术家，而文件名包含全部艺术家，
+        所以按"以艺术家开头、以标题结尾"匹配。
+        """
+        artist, _, title = display_name.partition(" - ")
+        artist = sanitize_string(artist)
+        title = sanitize_string(title)
+        
+        for audio_file in candidates:
+            if audio_file.stem.startswith(artist) and audio_file.stem.endswith(title):
+                return audio_file
+        
+        return None
     
     def process_batch(self, spotify_url):
         """
@@ -236,28 +304,25 @@ def process_batch(self, spotify_url):
         if url_type == 'track':
             return self.download_song(spotify_url)
         
-        print("📥 开始下载...")
-        audio_files = self.get_songs_list(spotify_url)
-        
-        if not audio_files:
-            print("❌ 未找到任何歌曲")
-            return False
-        
-        print(f"\n✅ 找到 {len(audio_files)} 首歌曲，开始处理...\n")
+        print("📥 开始下载（每首歌下载完成后立即处理）...")
         
         success_count = 0
         failed_count = 0
+        total = 0
         
-        for i, audio_file in enumerate(audio_files, 1):
-            print(f"\n{'─'*60}")
-            print(f"处理进度: [{i}/{len(audio_files)}]")
-            print(f"{'─'*60}")
+        for audio_file, result in self.process_files(self.iter_songs(spotify_url)):
+            total += 1
+            print(f"处理进度: [{total}] {audio_file.name}")
             
-            if self.process_single_file(audio_file):
+            if result:
                 success_count += 1
             else:
                 failed_count += 1
         
+        if total == 0:
+            print("❌ 未找到任何歌曲")
+            return False
+        
         # 清理临时目录
         temp_dir = self.output_dir / "temp"
         try:
@@ -271,13 +336,54 @@ def process_batch(self, spotify_url):
         print(f"\n{'='*60}")
         print(f"📊 下载统计")
         print(f"{'='*60}")
-        print(f"  总计: {len(audio_files)} 首")
+        print(f"  总计: {total} 首")
         print(f"  成功: {success_count} 首 ✅")
         print(f"  失败: {failed_count} 首 ❌")
         print(f"{'='*60}\n")
         
         return success_count > 0
     
+    def process_files(self, audio_files):
+        """
+        使用线程池并行处理已下载的音频文件
+        
+        audio_files可以是列表，也可以是 iter_songs 这样边下载边产出的
+        迭代器：每拿到一个文件就立即提交处理，不必等待全部下载完成。
+        
+        Args:
+            audio_files: 音频文件路径的可迭代对象
+            
+        Yields:
+            tuple: (audio_file, process_single_file的结果)，按完成顺序返回
+        """
+        done = queue.Queue()
+        
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            def submit_all():
+                count = 0
+                try:
+                    for audio_file in audio_files:
+                        future = executor.submit(self.process_single_file, audio_file)
+                        future.add_done_callback(
+                            lambda f, audio_file=audio_file: done.put((audio_file, f))
+                        )
+                        count += 1
+                finally:
+                    # 标记提交结束，并告知总数
+                    done.put((None, count))
+            
+            threading.Thread(target=submit_all, daemon=True).start()
+            
+            total = None
+            finished = 0
+            while total is None or finished < total:
+                audio_file, item = done.get()
+                if audio_file is None:
+                    total = item
+                    continue
+                finished += 1
+                yield audio_file, item.result()
+    
     def process_single_file(self, audio_file):
         """
         处理单个已下载的音频文件
@@ -288,8 +394,8 @@ def process_single_file(self, audio_file):
         try:
             lrc_file = audio_file.with_suffix('.lrc')
             
-            # 提取元数据
-            metadata = self.extract_metadata(audio_file)
+            # 提取元数据（单次读取，同时取出封面）
+            metadata, cover_data = self.read_audio_file(audio_file)
             if not metadata:
                 print(f"⚠️  跳过: {audio_file.name} (无法提取元数据)")
                 return False
@@ -301,7 +407,10 @@ def process_single_file(self, audio_file):
             song_dir = self.output_dir / folder_name
             
             # 如果目录已存在，跳过
-            if song_dir.exists():
+            # （mkdir不带exist_ok是原子操作，并行处理时同名歌曲不会互相覆盖）
+            try:
+                song_dir.mkdir()
+            except FileExistsError:
                 print(f"⏭️  跳过: {folder_name} (已存在)")
                 # 清理临时文件
                 audio_file.unlink()
@@ -319,7 +428,6 @@ def process_single_file(self, audio_file):
                     "full_path": str(song_dir)
                 }
             
-            song_dir.mkdir(exist_ok=True)
             print(f"📁 {folder_name}")
             
             # 移动音频文件
@@ -334,7 +442,7 @@ def process_single_file(self, audio_file):
                 print(f"  ✓ 歌词: {lrc_file.name}")
             
             # 提取封面
-            if self.extract_cover(new_audio_file, song_dir):
+            if self.extract_cover(cover_data, song_dir):
                 print(f"  ✓ 封面: cover.jpg")
             
             # 保存元数据
@@ -488,7 +596,7 @@ def download_song(self, spotify_url):
         lrc_file = audio_file.with_suffix('.lrc')
         
         print("\n📝 提取元数据...")
-        metadata = self.extract_metadata(audio_file)
+        metadata, cover_data = self.read_audio_file(audio_file)
         
         if not metadata:
             print("❌ 无法提取元数据")
@@ -512,7 +620,7 @@ def download_song(self, spotify_url):
             print(f"✅ 歌词文件: {lrc_file.name}")
         
         print("\n🖼️  提取封面...")
-        self.extract_cover(new_audio_file, song_dir)
+        self.extract_cover(cover_data, song_dir)
         
         print("\n💾 保存元数据...")
         self.save_metadata(metadata, song_dir)
@@ -540,50 +648,170 @@ def download_song(self, spotify_url):
         }
     
     def extract_metadata(self, audio_file):
-        """提取音频文件的元数据"""
+        """提取音频文件的元数据（不含封面数据）"""
+        metadata, _ = self.read_audio_file(audio_file)
+        return metadata
+    
+    def read_audio_file(self, audio_file):
+        """
+        单次读取音频文件的标签、音频信息和封面
+        
+        支持 mp3 / m4a / flac / opus / ogg，文件只打开解析一次，
+        封面直接从已解析的标签中取出，无需再调用ffmpeg。
+        
+        Returns:
+            tuple: (metadata字典, 封面字节) ，失败时返回 (None, None)
+        """
         try:
-            audio = MP3(str(audio_file))
-            tags = ID3(str(audio_file))
+            audio = MutagenFile(str(audio_file))
+            if audio is None:
+                raise ValueError(f"不支持的音频格式: {audio_file.suffix}")
+            
+            tags = audio.tags if audio.tags is not None else {}
+            kind = type(audio).__name__
+            
+            if kind == 'MP3':
+                fields = self._read_id3_fields(tags)
+                cover_mime, cover_data = self._read_id3_cover(tags)
+            elif kind == 'MP4':
+                fields = self._read_mp4_fields(tags)
+                cover_mime, cover_data = self._read_mp4_cover(tags)
+            else:
+                # FLAC / OggOpus / OggVorbis 都使用 Vorbis Comment
+                fields = self._read_vorbis_fields(tags)
+                cover_mime, cover_data = self._read_vorbis_cover(audio, tags)
+            
+            info = audio.info
+            length = getattr(info, 'length', 0) or 0
+            bitrate = getattr(info, 'bitrate', 0) or 0
+            sample_rate = getattr(info, 'sample_rate', 0) or 0
             
             metadata = {
-                'title': str(tags.get('TIT2', 'Unknown')),
-                'artist': str(tags.get('TPE1', 'Unknown')),
-                'album': str(tags.get('TALB', 'Unknown')),
-                'album_artist': str(tags.get('TPE2', 'Unknown')),
-                'date': str(tags.get('TDRC', 'Unknown')),
-                'genre': str(tags.get('TCON', 'Unknown')),
-                'track': str(tags.get('TRCK', 'Unknown')),
-                'disc': str(tags.get('TPOS', 'Unknown')),
-                'copyright': str(tags.get('TCOP', 'Unknown')),
-                'publisher': str(tags.get('TENC', 'Unknown')),
-                'isrc': str(tags.get('TSRC', 'Unknown')),
-                'spotify_url': str(tags.get('WOAS', 'Unknown')),
-                'youtube_url': str(tags.get('COMM::XXX', 'Unknown')),
-                'duration': f"{int(audio.info.length // 60)}分{int(audio.info.length % 60)}秒",
-                'duration_seconds': int(audio.info.length),
-                'bitrate': f"{audio.info.bitrate // 1000} kbps",
-                'sample_rate': f"{audio.info.sample_rate} Hz",
-                'channels': '立体声' if audio.info.channels == 2 else '单声道',
-                'format': self.audio_format.upper(),
+                **fields,
+                'duration': f"{int(length // 60)}分{int(length % 60)}秒",
+                'duration_seconds': int(length),
+                'bitrate': f"{bitrate // 1000} kbps",
+                'sample_rate': f"{sample_rate} Hz",
+                'channels': '立体声' if getattr(info, 'channels', 0) == 2 else '单声道',
+                'format': audio_file.suffix.lstrip('.').upper() or self.audio_format.upper(),
                 'file_size': f"{audio_file.stat().st_size / 1024 / 1024:.2f} MB",
                 'download_date': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             }
             
-            has_cover = False
-            for key in tags.keys():
-                if key.startswith('APIC'):
-                    has_cover = True
-                    apic = tags[key]
-                    metadata['cover_type'] = apic.mime
-                    metadata['cover_size'] = f"{len(apic.data) / 1024:.1f} KB"
-                    break
-            metadata['has_cover'] = has_cover
+            metadata['has_cover'] = cover_data is not None
+            if cover_data is not None:
+                metadata['cover_type'] = cover_mime
+                metadata['cover_size'] = f"{len(cover_data) / 1024:.1f} KB"
             
-            return metadata
+            return metadata, cover_data
             
         except Exception as e:
             print(f"提取元数据错误: {e}")
-            return None
+            return None, None
+    
+    @staticmethod
+    def _first(value, default='Unknown'):
+        """取标签的第一个值并转为字符串"""
+        if value is None:
+            return default
+        if isinstance(value, list):
+            if not value:
+                return default
+            value = value[0]
+        if isinstance(value, bytes):
+            value = value.decode('utf-8', errors='replace')
+        return str(value)
+    
+    def _read_id3_fields(self, tags):
+        """读取ID3标签 (mp3)"""
+        return {
+            'title': str(tags.get('TIT2', 'Unknown')),
+            'artist': str(tags.get('TPE1', 'Unknown')),
+            'album': str(tags.get('TALB', 'Unknown')),
+            'album_artist': str(tags.get('TPE2', 'Unknown')),
+            'date': str(tags.get('TDRC', 'Unknown')),
+            'genre': str(tags.get('TCON', 'Unknown')),
+            'track': str(tags.get('TRCK', 'Unknown')),
+            'disc': str(tags.get('TPOS', 'Unknown')),
+            'copyright': str(tags.get('TCOP', 'Unknown')),
+            'publisher': str(tags.get('TENC', 'Unknown')),
+            'isrc': str(tags.get('TSRC', 'Unknown')),
+            'spotify_url': str(tags.get('WOAS', 'Unknown')),
+            'youtube_url': str(tags.get('COMM::XXX', 'Unknown')),
+        }
+    
+    def _read_id3_cover(self, tags):
+        """从ID3的APIC帧中取封面"""
+        for key in tags.keys():
+            if key.startswith('APIC'):
+                apic = tags[key]
+                return apic.mime, apic.data
+        return None, None
+    
+    def _read_mp4_fields(self, tags):
+        """读取MP4标签 (m4a)"""
+        def number_pair(key):
+            value = tags.get(key)
+            if not value:
+                return 'Unknown'
+            number, total = value[0]
+            return f"{number}/{total}" if total else str(number)
+        
+        return {
+            'title': self._first(tags.get('\xa9nam')),
+            'artist': self._first(tags.get('\xa9ART')),
+            'album': self._first(tags.get('\xa9alb')),
+            'album_artist': self._first(tags.get('aART')),
+            'date': self._first(tags.get('\xa9day')),
+            'genre': self._first(tags.get('\xa9gen')),
+            'track': number_pair('trkn'),
+            'disc': number_pair('disk'),
+            'copyright': self._first(tags.get('cprt')),
+            'publisher': self._first(tags.get('\xa9too')),
+            'isrc': self._first(tags.get('----:spotdl:ISRC')),
+            'spotify_url': self._first(tags.get('----:spotdl:WOAS')),
+            'youtube_url': self._first(tags.get('\xa9cmt')),
+        }
+    
+    def _read_mp4_cover(self, tags):
+        """从MP4的covr原子中取封面"""
+        covers = tags.get('covr')
+        if not covers:
+            return None, None
+        cover = covers[0]
+        mime = 'image/png' if getattr(cover, 'imageformat', None) == 14 else 'image/jpeg'
+        return mime, bytes(cover)
+    
+    def _read_vorbis_fields(self, tags):
+        """读取Vorbis Comment标签 (flac/opus/ogg)"""
+        return {
+            'title': self._first(tags.get('title')),
+            'artist': self._first(tags.get('artist')),
+            'album': self._first(tags.get('album')),
+            'album_artist': self._first(tags.get('albumartist')),
+            'date': self._first(tags.get('date')),
+            'genre': self._first(tags.get('genre')),
+            'track': self._first(tags.get('tracknumber')),
+            'disc': self._first(tags.get('discnumber')),
+            'copyright': self._first(tags.get('copyright')),
+            'publisher': self._first(tags.get('encodedby')),
+            'isrc': self._first(tags.get('isrc')),
+            'spotify_url': self._first(tags.get('woas')),
+            'youtube_url': self._first(tags.get('comment')),
+        }
+    
+    def _read_vorbis_cover(self, audio, tags):
+        """从FLAC图片块或metadata_block_picture中取封面"""
+        pictures = getattr(audio, 'pictures', None)
+        if pictures:
+            return pictures[0].mime, pictures[0].data
+        for encoded in tags.get('metadata_block_picture', []):
+            try:
+                picture = Picture(base64.b64decode(encoded))
+                return picture.mime, picture.data
+            except Exception:
+                continue
+        return None, None
     
     def get_metadata_and_lyrics_only(self, spotify_url):
         """
@@ -862,23 +1090,23 @@ def get_metadata_and_lyrics_only(self, spotify_url):
             traceback.print_exc()
             return None
     
-    def extract_cover(self, audio_file, output_dir):
-        """提取并保存封面图片"""
-        cover_file = output_dir / "cover.jpg"
+    def extract_cover(self, cover_data, output_dir):
+        """
+        保存封面图片
         
-        cmd = [
-            "ffmpeg",
-            "-i", str(audio_file),
-            "-an",
-            "-vcodec", "copy",
-            str(cover_file),
-            "-y"
-        ]
+        Args:
+            cover_data: 从标签中读出的封面字节（见 read_audio_file）
+            output_dir: 歌曲目录
+        """
+        if not cover_data:
+            return False
         
+        cover_file = output_dir / "cover.jpg"
         try:
-            subprocess.run(cmd, capture_output=True, check=True)
+            with open(cover_file, 'wb') as f:
+                f.write(cover_data)
             return True
-        except subprocess.CalledProcessError:
+        except OSError:
             return False
     
     def save_metadata(self, metadata, output_dir):
@@ -988,6 +1216,12 @@ def main():
         help='歌手模式下的最大下载数量 (默认: 无限制)'
     )
     
+    parser.add_argument(
+        '--workers',
+        type=int,
+        help='并行处理文件的线程数 (默认: CPU核心数，最多8个)'
+    )
+    
     args = parser.parse_args()
     
     print("\n" + "="*60)
@@ -997,7 +1231,8 @@ def main():
     downloader = SpotifyBatchDownloader(
         output_dir=args.output,
         audio_format=args.format,
-        max_songs=args.max_songs
+        max_songs=args.max_songs,
+        workers=args.workers
     )
     
     success = downloader.process_batch(args.url)
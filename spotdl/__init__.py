@@ -7,16 +7,17 @@
 import concurrent.futures
 import logging
 from pathlib import Path
-from typing import List, Optional, Tuple, Union
+from typing import TYPE_CHECKING, List, Optional, Tuple, Union
 
 from spotdl._version import __version__
 from spotdl.console import console_entry_point
-from spotdl.download.downloader import Downloader
 from spotdl.types.options import DownloaderOptionalOptions, DownloaderOptions
 from spotdl.types.song import Song
-from spotdl.utils.search import parse_query
 from spotdl.utils.spotify import SpotifyClient
 
+if TYPE_CHECKING:
+    from spotdl.download.downloader import Downloader
+
 __all__ = ["Spotdl", "console_entry_point", "__version__"]
 
 logger = logging.getLogger(__name__)
@@ -79,8 +80,13 @@ def __init__(
             headless=headless,
         )
 
+        # The downloader pulls in yt-dlp and the providers,
+        # import it only when the Spotdl class is used
+        # pylint: disable=import-outside-toplevel
+        from spotdl.download.downloader import Downloader
+
         # Initialize downloader
-        self.downloader = Downloader(
+        self.downloader: "Downloader" = Downloader(
             settings=downloader_settings,
             loop=loop,
         )
@@ -99,6 +105,10 @@ def search(self, query: List[str]) -> List[Song]:
         - query can be a list of song titles, urls, uris
         """
 
+        from spotdl.utils.search import (  # pylint: disable=import-outside-toplevel
+            parse_query,
+        )
+
         return parse_query(
             query=query,
             threads=self.downloader.settings["threads"],
@@ -9,30 +9,27 @@
 import sys
 import time
 
-from spotdl.console.download import download
-from spotdl.console.meta import meta
-from spotdl.console.save import save
-from spotdl.console.sync import sync
-from spotdl.console.url import url
-from spotdl.console.web import web
-from spotdl.download.downloader import Downloader, DownloaderError
 from spotdl.utils.arguments import parse_arguments
 from spotdl.utils.config import create_settings
 from spotdl.utils.console import ACTIONS, generate_initial_config, is_executable
-from spotdl.utils.downloader import check_ytmusic_connection
-from spotdl.utils.ffmpeg import FFmpegError, download_ffmpeg, is_ffmpeg_installed
+from spotdl.utils.ffmpeg import FFmpegError, download_ffmpeg, find_ffmpeg
+from spotdl.utils.lazy import LazyImportDict, import_object
 from spotdl.utils.logging import init_logging
 from spotdl.utils.spotify import SpotifyClient, SpotifyError, save_spotify_cache
 
 __all__ = ["console_entry_point", "OPERATIONS"]
 
-OPERATIONS = {
-    "download": download,
-    "sync": sync,
-    "save": save,
-    "meta": meta,
-    "url": url,
-}
+# Operations are imported only when they are run, so that
+# e.g. `spotdl url` doesn't pay for loading the web server
+OPERATIONS = LazyImportDict(
+    {
+        "download": "spotdl.console.download:download",
+        "sync": "spotdl.console.sync:sync",
+        "save": "spotdl.console.save:save",
+        "meta": "spotdl.console.meta:meta",
+        "url": "spotdl.console.url:url",
+    }
+)
 
 logger = logging.getLogger(__name__)
 
@@ -85,24 +82,21 @@ def entry_point():
     # If the application is frozen, we check for ffmpeg
     # if it's not present download it create config file
     if is_executable():
-        if is_ffmpeg_installed() is False:
+        if find_ffmpeg() is None:
             download_ffmpeg()
 
-    # Check if ffmpeg is installed
-    if is_ffmpeg_installed(downloader_settings["ffmpeg"]) is False:
-        raise FFmpegError(
-            "FFmpeg is not installed. Please run `spotdl --download-ffmpeg` to install it, "
-            "or `spotdl --ffmpeg /path/to/ffmpeg` to specify the path to ffmpeg."
-        )
-
-    # Check if we are not blocked by ytm
-    if "youtube-music" in downloader_settings["audio_providers"]:
-        if not check_ytmusic_connection():
-            raise DownloaderError(
-                "You are blocked by YouTube Music. "
-                "Please use a VPN, change youtube-music to piped, or use other audio providers"
+    # Check if ffmpeg is installed, the result is cached between runs.
+    # YouTube Music availability is checked by the downloader on first use
+    if not downloader_settings["no_preflight"]:
+        if find_ffmpeg(downloader_settings["ffmpeg"]) is None:
+            raise FFmpegError(
+                "FFmpeg is not installed. Please run `spotdl --download-ffmpeg` to install it, "
+                "or `spotdl --ffmpeg /path/to/ffmpeg` to specify the path to ffmpeg."
             )
 
+    # pylint: disable=import-outside-toplevel
+    from spotdl.download.downloader import Downloader, DownloaderError
+
     # Initialize spotify client
     SpotifyClient.init(**spotify_settings)
     spotify_client = SpotifyClient()
@@ -116,7 +110,7 @@ def entry_point():
             web_settings["web_use_output_dir"] = True
 
         # Start web ui
-        web(web_settings, downloader_settings)
+        import_object("spotdl.console.web:web")(web_settings, downloader_settings)
 
         return None
 
@@ -147,6 +141,7 @@ def graceful_exit(_signal, _frame):
             save_spotify_cache(spotify_client.cache)
 
         downloader.progress_handler.close()
+        downloader.close(wait=False)
         sys.exit(0)
 
     signal.signal(signal.SIGINT, graceful_exit)
@@ -174,6 +169,7 @@ def graceful_exit(_signal, _frame):
         logger.debug("Took %d seconds", end_time - start_time)
 
         downloader.progress_handler.close()
+        downloader.close(wait=False)
         logger.exception("An error occurred")
 
         sys.exit(1)
@@ -185,5 +181,6 @@ def graceful_exit(_signal, _frame):
         save_spotify_cache(spotify_client.cache)
 
     downloader.progress_handler.close()
+    downloader.close()
 
     return None
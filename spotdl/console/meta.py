@@ -2,23 +2,135 @@
 Sync Lyrics module for the console
 """
 
-import asyncio
 import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
 
 from spotdl.download.downloader import Downloader
 from spotdl.types.song import Song
+from spotdl.utils.config import GlobalConfig, get_meta_index_path
+from spotdl.utils.console import is_frozen
 from spotdl.utils.ffmpeg import FFMPEG_FORMATS
 from spotdl.utils.lrc import generate_lrc
+from spotdl.utils.lyrics import SongLyrics
+from spotdl.utils.meta_index import MetaIndex
 from spotdl.utils.metadata import embed_metadata, get_file_metadata
-from spotdl.utils.search import QueryError, get_search_results, parse_query, reinit_song
+from spotdl.utils.search import (
+    QueryError,
+    get_search_results,
+    parse_query,
+    reinit_song,
+    reinit_songs,
+)
 
-__all__ = ["meta"]
+__all__ = ["meta", "init_worker", "read_file_metadata", "write_file_metadata"]
+
+# Tags are read and written in a process pool
+# when there are at least this many files to process.
+# Frozen executables always use threads, their worker processes
+# would start the cli again.
+PROCESS_POOL_THRESHOLD = 100
 
 logger = logging.getLogger(__name__)
 
 
+def init_worker(parameters: Dict[str, Any]) -> None:
+    """
+    Initialize a worker process with the global config of the main process,
+    worker processes that aren't forked start with an empty one.
+
+    ### Arguments
+    - parameters: The `GlobalConfig` parameters.
+    """
+
+    GlobalConfig.parameters.update(parameters)
+
+
+def read_file_metadata(path: Path, id3_separator: str) -> Optional[Dict[str, Any]]:
+    """
+    Read the metadata of a file, runs in a worker process.
+
+    ### Arguments
+    - path: Path to the file.
+    - id3_separator: The separator used for the id3 tags.
+
+    ### Returns
+    - Dict of song metadata, the album art is replaced by `True`
+        so that the image doesn't have to be sent back to the main process.
+    """
+
+    try:
+        song_meta = get_file_metadata(path, id3_separator)
+    except Exception as exception:  # pylint: disable=W0718
+        logger.debug("Could not read metadata of %s: %s", path, exception)
+        return None
+
+    if song_meta and song_meta.get("album_art"):
+        song_meta["album_art"] = True
+
+    return song_meta
+
+
+def write_file_metadata(
+    path: Path, song: Song, skip_album_art: Optional[bool] = False
+) -> Optional[str]:
+    """
+    Apply metadata to a file, runs in a worker process.
+
+    ### Arguments
+    - path: Path to the file.
+    - song: Song object.
+    - skip_album_art: Boolean to skip album art embedding.
+
+    ### Returns
+    - Error message if the metadata couldn't be applied.
+    """
+
+    try:
+        embed_metadata(path, song, skip_album_art=skip_album_art)
+    except Exception as exception:  # pylint: disable=W0718
+        return str(exception)
+
+    return None
+
+
+def has_full_metadata(song_meta: Optional[Dict[str, Any]]) -> bool:
+    """
+    Check if the file has all the fields we can assume are correct.
+
+    ### Arguments
+    - song_meta: Metadata of the file.
+
+    ### Returns
+    - True if the metadata doesn't have to be updated.
+    """
+
+    return bool(
+        song_meta
+        and song_meta.get("artist")
+        and song_meta.get("artists")
+        and song_meta.get("name")
+        and song_meta.get("lyrics")
+        and song_meta.get("album_art")
+    )
+
+
+def has_track_url(song: Song) -> bool:
+    """
+    Check if the song can be updated with `reinit_songs`.
+
+    ### Arguments
+    - song: Song object.
+
+    ### Returns
+    - True if the song has a Spotify track url.
+    """
+
+    return bool(song.url and "open.spotify.com" in song.url and "track" in song.url)
+
+
 def meta(query: List[str], downloader: Downloader) -> None:
     """
     This function applies metadata to the selected songs
@@ -30,7 +142,10 @@ def meta(query: List[str], downloader: Downloader) -> None:
     - downloader: Already initialized downloader instance.
 
     ### Notes
-    - This function is multi-threaded.
+    - Files that didn't change since their metadata was applied are skipped,
+        see `spotdl.utils.meta_index.MetaIndex`.
+    - Tags are read and written in a process pool,
+        Spotify and lyrics lookups are done in a thread pool.
     """
 
     # Create a list of all songs from all paths in query
@@ -51,134 +166,238 @@ def meta(query: List[str], downloader: Downloader) -> None:
 
             paths.append(test_path)
 
-    def process_file(file: Path):
-        # metadata of the file, url is present in the file.
-        song_meta = get_file_metadata(file, downloader.settings["id3_separator"])
-
-        # Check if song has metadata
-        # and if it has all the required fields
-        # if it has all of these fields, we can assume that the metadata is correct
-        if song_meta and not downloader.settings["force_update_metadata"]:
-            if (
-                song_meta.get("artist")
-                and song_meta.get("artists")
-                and song_meta.get("name")
-                and song_meta.get("lyrics")
-                and song_meta.get("album_art")
-            ):
+    settings = downloader.settings
+    force_update = settings["force_update_metadata"]
+
+    index = MetaIndex()
+    index_path = get_meta_index_path()
+    index.load(index_path)
+
+    def needs_lrc(file: Path) -> bool:
+        return settings["generate_lrc"] and not file.with_suffix(".lrc").exists()
+
+    # Skip files that didn't change since the last run without opening them
+    pending = [
+        file
+        for file in paths
+        if force_update or needs_lrc(file) or not index.is_current(file)
+    ]
+
+    if len(pending) != len(paths):
+        logger.info("Skipping %d unchanged files", len(paths) - len(pending))
+
+    workers = settings["threads"]
+    tag_executor: Executor = (
+        ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_worker,
+            initargs=(dict(GlobalConfig.parameters),),
+        )
+        if len(pending) >= PROCESS_POOL_THRESHOLD and not is_frozen()
+        else ThreadPoolExecutor(max_workers=workers)
+    )
+
+    # Lyrics resolved in this run, reused for the lrc files
+    file_lyrics: Dict[Path, SongLyrics] = {}
+
+    def save_lrc(song: Song, file: Path):
+        lrc_file = file.with_suffix(".lrc")
+        if lrc_file.exists():
+            logger.info("Lrc file already exists for %s", file.name)
+            return
+
+        generate_lrc(song, file, file_lyrics.get(file))
+        if lrc_file.exists():
+            logger.info("Saved lrc file for %s", song.display_name)
+        else:
+            logger.info("Could not find lrc file for %s", song.display_name)
+
+    # Spotify urls found in the files, used to re-download them
+    file_urls: Dict[Path, str] = {}
+
+    try:
+        with tag_executor, ThreadPoolExecutor(max_workers=workers) as net_executor:
+            files_meta = list(
+                tag_executor.map(
+                    read_file_metadata,
+                    pending,
+                    repeat(settings["id3_separator"]),
+                    chunksize=32,
+                )
+            )
+
+            for file, song_meta in zip(pending, files_meta):
+                if song_meta and song_meta.get("url"):
+                    file_urls[file] = song_meta["url"]
+
+            complete: List[Tuple[Path, Dict[str, Any]]] = []
+            to_reinit: List[Tuple[Path, Dict[str, Any]]] = []
+            to_search: List[Tuple[Path, Optional[Dict[str, Any]]]] = []
+            for file, song_meta in zip(pending, files_meta):
+                # If the song has all of these fields,
+                # we can assume that the metadata is correct
+                if song_meta and not force_update and has_full_metadata(song_meta):
+                    complete.append((file, song_meta))
+                elif (
+                    not song_meta
+                    or None
+                    in [
+                        song_meta.get("name"),
+                        song_meta.get("album_art"),
+                        song_meta.get("artist"),
+                        song_meta.get("artists"),
+                        song_meta.get("track_number"),
+                    ]
+                    or force_update
+                ):
+                    # Song does not have metadata, or it is missing some fields
+                    # or we are forcing update of metadata
+                    # so we search for it
+                    to_search.append((file, song_meta))
+                else:
+                    to_reinit.append((file, song_meta))
+
+            for file, song_meta in complete:
                 logger.info("Song already has metadata: %s", file.name)
-                if downloader.settings["generate_lrc"]:
-                    lrc_file = file.with_suffix(".lrc")
-                    if lrc_file.exists():
-                        logger.info("Lrc file already exists for %s", file.name)
-                        return None
-
-                    song = Song.from_missing_data(
-                        name=song_meta["name"],
-                        artists=song_meta["artists"],
-                        artist=song_meta["artist"],
+
+            if settings["generate_lrc"]:
+                list(
+                    net_executor.map(
+                        lambda item: save_lrc(
+                            Song.from_missing_data(
+                                name=item[1]["name"],
+                                artists=item[1]["artists"],
+                                artist=item[1]["artist"],
+                                lyrics=item[1]["lyrics"],
+                            ),
+                            item[0],
+                        ),
+                        complete,
                     )
+                )
+
+            for file, song_meta in complete:
+                index.add_file(
+                    file, (song_meta.get("url") or "").split("/")[-1] or None
+                )
 
-                    generate_lrc(song, file)
-                    if lrc_file.exists():
-                        logger.info("Saved lrc file for %s", song.display_name)
-                    else:
-                        logger.info("Could not find lrc file for %s", song.display_name)
-
-                return None
-
-        # Same as above
-        if (
-            not song_meta
-            or None
-            in [
-                song_meta.get("name"),
-                song_meta.get("album_art"),
-                song_meta.get("artist"),
-                song_meta.get("artists"),
-                song_meta.get("track_number"),
+            resolved: List[Tuple[Path, Optional[Dict[str, Any]], Song]] = []
+
+            # Songs that have a Spotify track url are updated with bulk requests,
+            # the others are looked up one by one,
+            # and the missing metadata is filled in
+            old_songs = [
+                Song.from_missing_data(**song_meta) for _, song_meta in to_reinit
             ]
-            or downloader.settings["force_update_metadata"]
-        ):
-            # Song does not have metadata, or it is missing some fields
-            # or we are forcing update of metadata
-            # so we search for it
-            logger.debug("Searching metadata for %s", file.name)
-            search_results = get_search_results(file.stem)
-            if not search_results:
-                logger.error("Could not find metadata for %s", file.name)
-                return None
-
-            song = search_results[0]
-        else:
-            # Song has metadata, so we use it to reinitialize the song object
-            # and fill in the missing metadata
-            try:
-                song = reinit_song(Song.from_missing_data(**song_meta))
-            except QueryError:
-                logger.error("Could not find metadata for %s", file.name)
-                return None
-
-        # Check if the song has lyric
-        # if not use downloader to find lyrics
-        if song_meta is None or song_meta.get("lyrics") is None:
-            logger.debug("Fetching lyrics for %s", song.display_name)
-            song.lyrics = downloader.search_lyrics(song)
-            if song.lyrics:
-                logger.info("Found lyrics for song: %s", song.display_name)
-        else:
-            song.lyrics = song_meta.get("lyrics")
+            new_songs: List[Optional[Song]] = list(reinit_songs(old_songs))
 
-        # Apply metadata to the song
-        embed_metadata(file, song, skip_album_art=downloader.settings["skip_album_art"])
+            def reinit_file_song(song: Song) -> Optional[Song]:
+                try:
+                    return reinit_song(song)
+                except QueryError:
+                    return None
 
-        logger.info("Applied metadata to %s", file.name)
+            not_bulk = [
+                position
+                for position, song in enumerate(old_songs)
+                if not has_track_url(song)
+            ]
+            for position, song in zip(
+                not_bulk,
+                net_executor.map(
+                    reinit_file_song, [old_songs[position] for position in not_bulk]
+                ),
+            ):
+                new_songs[position] = song
 
-        if downloader.settings["generate_lrc"]:
-            lrc_file = file.with_suffix(".lrc")
-            if lrc_file.exists():
-                logger.info("Lrc file already exists for %s", file.name)
-                return None
+            for (file, song_meta), old_song, song in zip(
+                to_reinit, old_songs, new_songs
+            ):
+                if song is None or song is old_song:
+                    logger.error("Could not find metadata for %s", file.name)
+                    continue
 
-            generate_lrc(song, file)
-            if lrc_file.exists():
-                logger.info("Saved lrc file for %s", song.display_name)
-            else:
-                logger.info("Could not find lrc file for %s", song.display_name)
-        return None
+                resolved.append((file, song_meta, song))
 
-    async def pool_worker(file_path: Path) -> None:
-        async with downloader.semaphore:
-            # The following function calls blocking code, which would block whole event loop.
-            # Therefore it has to be called in a separate thread via ThreadPoolExecutor. This
-            # is not a problem, since GIL is released for the I/O operations, so it shouldn't
-            # hurt performance.
-            await downloader.loop.run_in_executor(None, process_file, file_path)
+            def search_song(item: Tuple[Path, Optional[Dict[str, Any]]]):
+                logger.debug("Searching metadata for %s", item[0].name)
+                search_results = get_search_results(item[0].stem)
+                return search_results[0] if search_results else None
 
-    tasks = [pool_worker(path) for path in paths]
+            for (file, song_meta), song in zip(
+                to_search, net_executor.map(search_song, to_search)
+            ):
+                if song is None:
+                    logger.error("Could not find metadata for %s", file.name)
+                    continue
+
+                resolved.append((file, song_meta, song))
+
+            # Check if the song has lyrics
+            # if not use downloader to find lyrics
+            missing_lyrics: List[Tuple[Path, Song]] = []
+            for file, song_meta, song in resolved:
+                if song_meta is None or song_meta.get("lyrics") is None:
+                    logger.debug("Fetching lyrics for %s", song.display_name)
+                    missing_lyrics.append((file, song))
+                else:
+                    song.lyrics = song_meta.get("lyrics")
+
+            if missing_lyrics:
+                for (file, song), song_lyrics in zip(
+                    missing_lyrics,
+                    downloader.lyrics_resolver.resolve_batch(
+                        [song for _, song in missing_lyrics], workers
+                    ),
+                ):
+                    file_lyrics[file] = song_lyrics
+                    song.lyrics = song_lyrics.lyrics or song_lyrics.synced
+                    if song.lyrics:
+                        logger.info("Found lyrics for song: %s", song.display_name)
+
+            # Apply metadata to the songs
+            errors = tag_executor.map(
+                write_file_metadata,
+                [file for file, _, _ in resolved],
+                [song for _, _, song in resolved],
+                repeat(settings["skip_album_art"]),
+                chunksize=8,
+            )
+
+            applied: List[Tuple[Path, Song]] = []
+            for (file, _, song), error in zip(resolved, errors):
+                if error:
+                    logger.error("Could not apply metadata to %s: %s", file.name, error)
+                    continue
+
+                logger.info("Applied metadata to %s", file.name)
+                applied.append((file, song))
 
-    # call all task asynchronously, and wait until all are finished
-    downloader.loop.run_until_complete(asyncio.gather(*tasks))
+            if settings["generate_lrc"]:
+                list(net_executor.map(lambda item: save_lrc(item[1], item[0]), applied))
+
+            for file, song in applied:
+                index.add_file(file, song.song_id)
+    finally:
+        index.save(index_path)
 
     # to re-download the local songs
-    if downloader.settings["redownload"]:
+    if settings["redownload"]:
         songs_url: List[str] = []
         for file in paths:
-            meta_data = get_file_metadata(
-                Path(file), downloader.settings["id3_separator"]
-            )
-            if meta_data and meta_data["url"]:
-                songs_url.append(meta_data["url"])
+            entry = index.get(index.get_key(file))
+            if entry and entry.get("song_id"):
+                songs_url.append(f"https://open.spotify.com/track/{entry['song_id']}")
+            elif file in file_urls:
+                songs_url.append(file_urls[file])
 
         songs_list = parse_query(
             query=songs_url,
-            threads=downloader.settings["threads"],
-            use_ytm_data=downloader.settings["ytm_data"],
-            playlist_numbering=downloader.settings["playlist_numbering"],
-            album_type=downloader.settings["album_type"],
-            playlist_retain_track_cover=downloader.settings[
-                "playlist_retain_track_cover"
-            ],
+            threads=settings["threads"],
+            use_ytm_data=settings["ytm_data"],
+            playlist_numbering=settings["playlist_numbering"],
+            album_type=settings["album_type"],
+            playlist_retain_track_cover=settings["playlist_retain_track_cover"],
         )
 
         downloader.download_multiple_songs(songs_list)
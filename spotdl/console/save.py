@@ -10,6 +10,7 @@
 from spotdl.download.downloader import Downloader, DownloaderError
 from spotdl.types.song import Song
 from spotdl.utils.m3u import gen_m3u_files
+from spotdl.utils.save_format import write_save_file
 from spotdl.utils.search import parse_query
 
 __all__ = ["save"]
@@ -101,8 +102,9 @@ async def pool_worker(song: Song):
         print(json.dumps(save_data, indent=4, ensure_ascii=False))
     elif save_path:
         # Save the songs to a file
-        with open(save_path, "w", encoding="utf-8") as save_file:
-            json.dump(save_data, save_file, indent=4, ensure_ascii=False)
+        write_save_file(
+            save_path, save_data, save_format=downloader.settings["save_format"]
+        )
 
     if m3u_file:
         gen_m3u_files(
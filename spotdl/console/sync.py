@@ -2,22 +2,576 @@
 Sync module for the console.
 """
 
-import json
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from spotdl.download.downloader import Downloader
+from spotdl.types.options import DownloaderOptions
 from spotdl.types.song import Song
 from spotdl.utils.formatter import create_file_name
 from spotdl.utils.m3u import gen_m3u_files
-from spotdl.utils.search import parse_query
-
-__all__ = ["sync"]
+from spotdl.utils.metadata import embed_metadata, get_file_metadata
+from spotdl.utils.save_format import (
+    NDJSON_FORMAT,
+    SaveFormatError,
+    load_save_file,
+    write_save_file,
+)
+from spotdl.utils.search import (
+    get_simple_songs,
+    merge_song_data,
+    parse_query,
+    reinit_songs,
+)
+from spotdl.utils.spotify import PRIORITY_BULK, SpotifyClient, request_priority
+from spotdl.utils.watch import get_snapshot_ids
+
+__all__ = [
+    "RETAG_FIELDS",
+    "SyncPlan",
+    "plan_sync",
+    "execute_sync_plan",
+    "load_sync_file",
+    "update_sync",
+    "refresh_songs",
+    "watch_cycle",
+    "watch",
+    "sync",
+]
+
+# Song fields written to the tags,
+# files are retagged when one of them changes
+RETAG_FIELDS = (
+    "name",
+    "artists",
+    "artist",
+    "genres",
+    "disc_number",
+    "disc_count",
+    "album_name",
+    "album_artist",
+    "year",
+    "date",
+    "track_number",
+    "tracks_count",
+    "explicit",
+    "publisher",
+    "url",
+    "isrc",
+    "cover_url",
+    "copyright_text",
+)
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class SyncPlan:
+    """
+    Actions needed to bring the downloaded files in line with the new song list.
+    """
+
+    downloads: List[Song] = field(default_factory=list)
+    renames: List[Tuple[Path, Path]] = field(default_factory=list)
+    deletes: List[Path] = field(default_factory=list)
+    retags: List[Tuple[Path, Song]] = field(default_factory=list)
+
+    def describe(self) -> List[str]:
+        """
+        Describe the plan, one line per action.
+
+        ### Returns
+        - The lines, followed by a summary line.
+        """
+
+        lines = [f"Delete '{path}'" for path in self.deletes]
+        lines.extend(f"Rename '{old}' to '{new}'" for old, new in self.renames)
+        lines.extend(f"Retag '{path}'" for path, _ in self.retags)
+        lines.extend(f"Download {song.display_name}" for song in self.downloads)
+        lines.append(
+            f"{len(self.downloads)} to download, {len(self.renames)} to rename, "
+            f"{len(self.deletes)} to delete, {len(self.retags)} to retag"
+        )
+
+        return lines
+
+
+def plan_sync(
+    old_files: List[Tuple[Path, Dict[str, Any]]],
+    new_files: List[Tuple[Path, Song]],
+    delete: bool = True,
+) -> SyncPlan:
+    """
+    Compute the actions needed to sync the files,
+    using hash indexes of the old and new entries.
+
+    ### Arguments
+    - old_files: Paths and song data of the previous sync.
+    - new_files: Paths and songs of the current song list.
+    - delete: Whether songs that are no longer in the list are deleted,
+        and files whose path changed are renamed.
+
+    ### Returns
+    - The sync plan.
+
+    ### Notes
+    - The plan is computed in linear time,
+        only the files of the previous sync are checked for existence.
+    """
+
+    plan = SyncPlan()
+
+    # A song can be in the list several times, with a file for every copy
+    new_by_url: Dict[str, Dict[Path, Song]] = {}
+    for new_path, song in new_files:
+        new_by_url.setdefault(song.url, {}).setdefault(new_path, song)
+
+    # Old files that are already where they should be
+    kept: Dict[Path, Dict[str, Any]] = {
+        old_path: entry
+        for old_path, entry in old_files
+        if old_path in new_by_url.get(entry["url"], {}) and old_path.exists()
+    }
+
+    # (url, path) of the new files that exist once the renames are done
+    present = {(entry["url"], old_path) for old_path, entry in kept.items()}
+    sources = set(kept)
+    deletes: Dict[Path, None] = {}
+    for old_path, entry in old_files:
+        url = entry["url"]
+        if old_path in kept or (url in new_by_url and not delete):
+            continue
+
+        missing = [
+            new_path
+            for new_path in new_by_url.get(url, {})
+            if (url, new_path) not in present
+        ]
+
+        if not missing:
+            # Removed from the list, or a duplicate of a song that has its files
+            if delete:
+                deletes[old_path] = None
+
+            continue
+
+        if not old_path.exists():
+            continue
+
+        new_path = missing[0]
+        song = new_by_url[url][new_path]
+        present.add((url, new_path))
+        sources.add(old_path)
+        plan.renames.append((old_path, new_path))
+
+        if any(entry.get(key) != getattr(song, key) for key in RETAG_FIELDS):
+            plan.retags.append((new_path, song))
+
+    # Deletes run first, so files can be renamed to the path of a deleted file
+    plan.deletes = [path for path in deletes if path not in sources]
+
+    for old_path, entry in kept.items():
+        song = new_by_url[entry["url"]][old_path]
+        if any(entry.get(key) != getattr(song, key) for key in RETAG_FIELDS):
+            plan.retags.append((old_path, song))
+
+    for new_path, song in new_files:
+        if (song.url, new_path) not in present:
+            present.add((song.url, new_path))
+            plan.downloads.append(song)
+
+    return plan
+
+
+def execute_sync_plan(plan: SyncPlan, downloader: Downloader) -> None:
+    """
+    Delete, rename and retag the files of a sync plan, in parallel.
+    The planned downloads are left to the caller.
+
+    ### Arguments
+    - plan: The sync plan.
+    - downloader: Already initialized downloader instance.
+    """
+
+    settings = downloader.settings
+    remove_lrc = settings["sync_remove_lrc"]
+    file_index = downloader.file_index
+
+    def run(action: Callable[..., None], items: List[Any]):
+        if items:
+            with ThreadPoolExecutor(max_workers=settings["threads"]) as executor:
+                list(executor.map(action, items))
+
+    def delete_file(file: Path):
+        if file.exists():
+            logger.info("Deleting %s", file)
+            try:
+                file.unlink()
+                file_index.discard(file)
+            except (PermissionError, OSError) as exc:
+                logger.debug("Could not remove temp file: %s, error: %s", file, exc)
+        else:
+            logger.debug("%s does not exist.", file)
+
+        if remove_lrc:
+            lrc_file = file.with_suffix(".lrc")
+            if lrc_file.exists():
+                logger.debug("Deleting lrc %s", lrc_file)
+                try:
+                    lrc_file.unlink()
+                except (PermissionError, OSError) as exc:
+                    logger.debug(
+                        "Could not remove lrc file: %s, error: %s", lrc_file, exc
+                    )
+            else:
+                logger.debug("%s does not exist.", lrc_file)
+
+    def rename_file(item: Tuple[Path, Path, Path]):
+        source, old_path, new_path = item
+        if source.exists():
+            logger.info("Renaming %s to %s", f"'{old_path}'", f"'{new_path}'")
+            if new_path.exists():
+                source.unlink()
+                file_index.discard(source)
+                return
+
+            try:
+                new_path.parent.mkdir(parents=True, exist_ok=True)
+                source.rename(new_path)
+                file_index.discard(source)
+                file_index.add(new_path)
+            except (PermissionError, OSError) as exc:
+                logger.debug("Could not rename temp file: %s, error: %s", source, exc)
+        else:
+            logger.debug("%s does not exist.", source)
+
+        if remove_lrc:
+            lrc_file = source.with_suffix(".lrc")
+            new_lrc_file = new_path.with_suffix(".lrc")
+            if lrc_file.exists():
+                logger.debug(
+                    "Renaming lrc %s to %s", f"'{lrc_file}'", f"'{new_lrc_file}'"
+                )
+                try:
+                    lrc_file.rename(new_lrc_file)
+                except (PermissionError, OSError) as exc:
+                    logger.debug(
+                        "Could not rename lrc file: %s, error: %s", lrc_file, exc
+                    )
+            else:
+                logger.debug("%s does not exist.", lrc_file)
+
+    def move_aside(item: Tuple[Path, Path]):
+        old_path, temp_path = item
+        try:
+            old_path.rename(temp_path)
+            file_index.discard(old_path)
+            file_index.add(temp_path)
+            if remove_lrc and old_path.with_suffix(".lrc").exists():
+                old_path.with_suffix(".lrc").rename(temp_path.with_suffix(".lrc"))
+        except (PermissionError, OSError) as exc:
+            logger.debug("Could not rename temp file: %s, error: %s", old_path, exc)
+
+    def retag_file(item: Tuple[Path, Song]):
+        file, song = item
+        if not file.exists():
+            return
+
+        try:
+            # Keep what was found when the song was downloaded
+            file_meta = get_file_metadata(file, settings["id3_separator"]) or {}
+            song.lyrics = song.lyrics or file_meta.get("lyrics")
+            song.download_url = song.download_url or file_meta.get("download_url")
+
+            embed_metadata(
+                file,
+                song,
+                id3_separator=settings["id3_separator"],
+                skip_album_art=settings["skip_album_art"],
+            )
+            logger.info("Updated metadata of %s", file)
+        except Exception as exc:  # pylint: disable=W0718
+            logger.debug("Could not update metadata: %s, error: %s", file, exc)
+
+    run(delete_file, plan.deletes)
+
+    # Renames run in parallel, so when a file is renamed to the old path
+    # of another file, all the files are first moved out of the way
+    sources = {old_path for old_path, _ in plan.renames}
+    renames = [(old_path, old_path, new_path) for old_path, new_path in plan.renames]
+    if any(new_path in sources for _, new_path in plan.renames):
+        renames = [
+            (old_path.with_name(old_path.name + ".sync"), old_path, new_path)
+            for old_path, new_path in plan.renames
+        ]
+        run(move_aside, [(old_path, source) for source, old_path, _ in renames])
+
+    run(rename_file, renames)
+    run(retag_file, plan.retags)
+
+    if len(plan.deletes) == 0:
+        logger.info("Nothing to delete...")
+    else:
+        logger.info("%s old songs were deleted.", len(plan.deletes))
+
+
+def load_sync_file(sync_path: str) -> Dict[str, Any]:
+    """
+    Load and verify a sync file.
+
+    ### Arguments
+    - sync_path: Path to the sync file.
+
+    ### Returns
+    - The sync data.
+    """
+
+    try:
+        header, songs = load_save_file(sync_path)
+    except SaveFormatError as exception:
+        raise ValueError("Sync file is not a valid sync file.") from exception
+
+    # Verify the sync file
+    if header.get("type") != "sync":
+        raise ValueError("Sync file is not a valid sync file.")
+
+    return {**header, "songs": songs}
+
+
+def update_sync(
+    sync_path: str,
+    sync_data: Dict[str, Any],
+    songs_playlist: List[Song],
+    downloader: Downloader,
+    m3u_file: Optional[str] = None,
+    sources: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> None:
+    """
+    Bring the files of a sync file in line with the new song list,
+    save the new sync file and download the missing songs.
+
+    ### Arguments
+    - sync_path: Path to the sync file.
+    - sync_data: The current sync data.
+    - songs_playlist: The new song list.
+    - downloader: Already initialized downloader instance.
+    - m3u_file: Name of the m3u file to generate.
+    - sources: Snapshot ids and song urls of each query, used by the watch mode.
+    """
+
+    settings = downloader.settings
+
+    def file_name(song: Song) -> Path:
+        return create_file_name(
+            song,
+            settings["output"],
+            settings["format"],
+            settings["restrict"],
+            file_name_length=settings["max_filename_length"],
+        )
+
+    # Get the names and URLs of previously downloaded songs from the sync file
+    old_files = [
+        (file_name(Song.from_dict(entry)), entry) for entry in sync_data["songs"]
+    ]
+    new_files = [(file_name(song), song) for song in songs_playlist]
+
+    # Songs that are no longer part of the latest playlist are deleted,
+    # songs that have "{list-length}", "{list-position}", "{list-name}",
+    # in the output path are renamed so that we don't have to download them again,
+    # and to avoid mangling the directory structure.
+    plan = plan_sync(old_files, new_files, delete=not settings["sync_without_deleting"])
+
+    if settings["overwrite"] != "skip":
+        # Existing files are overwritten by the downloader
+        plan.downloads = list(songs_playlist)
+        plan.retags = []
+
+    if settings["sync_dry_run"]:
+        for line in plan.describe():
+            logger.info(line)
+
+        return
+
+    execute_sync_plan(plan, downloader)
+
+    if m3u_file:
+        gen_m3u_files(
+            songs_playlist,
+            m3u_file,
+            settings["output"],
+            settings["format"],
+            settings["restrict"],
+            False,
+        )
+
+    # Write the new sync file, existing compact files stay compact
+    header: Dict[str, Any] = {"type": "sync", "query": sync_data["query"]}
+    if sources is not None:
+        header["sources"] = sources
+
+    write_save_file(
+        sync_path,
+        (song.json for song in songs_playlist),
+        header,
+        (
+            NDJSON_FORMAT
+            if sync_data.get("format") == NDJSON_FORMAT
+            else settings["save_format"]
+        ),
+    )
+
+    downloader.download_multiple_songs(plan.downloads)
+
+
+def refresh_songs(
+    sync_data: Dict[str, Any],
+    snapshot_ids: Dict[str, Optional[str]],
+    settings: DownloaderOptions,
+) -> Tuple[List[Song], Dict[str, Dict[str, Any]]]:
+    """
+    Build the new song list of a sync file, fetching only the queries that changed.
+
+    ### Arguments
+    - sync_data: The current sync data.
+    - snapshot_ids: The current snapshot id of each query.
+    - settings: The downloader settings.
+
+    ### Returns
+    - The new song list and the sources of the new sync data.
+
+    ### Notes
+    - Songs of unchanged queries are taken from the sync file. Songs that are
+        already in the sync file are not fetched again, only their position
+        in the list is updated.
+    """
+
+    old_entries = {entry["url"]: entry for entry in sync_data["songs"]}
+    old_sources: Dict[str, Dict[str, Any]] = sync_data.get("sources") or {}
+
+    songs: List[Song] = []
+    sources: Dict[str, Dict[str, Any]] = {}
+    for query in sync_data["query"]:
+        snapshot_id = snapshot_ids.get(query)
+        source = old_sources.get(query)
+        if (
+            snapshot_id is not None
+            and source is not None
+            and source.get("snapshot_id") == snapshot_id
+            and all(url in old_entries for url in source["urls"])
+        ):
+            query_songs = [Song.from_dict(old_entries[url]) for url in source["urls"]]
+        else:
+            logger.info("Fetching %s", query)
+            simple_songs = get_simple_songs(
+                [query],
+                use_ytm_data=settings["ytm_data"],
+                playlist_numbering=settings["playlist_numbering"],
+                album_type=settings["album_type"],
+                playlist_retain_track_cover=settings["playlist_retain_track_cover"],
+            )
+
+            new_songs = iter(
+                reinit_songs(
+                    [song for song in simple_songs if song.url not in old_entries]
+                )
+            )
+
+            query_songs = [
+                (
+                    merge_song_data(song.json, dict(old_entries[song.url]))
+                    if song.url in old_entries
+                    else next(new_songs)
+                )
+                for song in simple_songs
+            ]
+
+        sources[query] = {
+            "snapshot_id": snapshot_id,
+            "urls": [song.url for song in query_songs],
+        }
+        songs.extend(query_songs)
+
+    return songs, sources
+
+
+def watch_cycle(
+    sync_path: str, downloader: Downloader, m3u_file: Optional[str] = None
+) -> int:
+    """
+    Check the queries of a sync file for changes and sync the ones that changed.
+
+    ### Arguments
+    - sync_path: Path to the sync file.
+    - downloader: Already initialized downloader instance.
+    - m3u_file: Name of the m3u file to generate.
+
+    ### Returns
+    - Number of queries that changed.
+    """
+
+    settings = downloader.settings
+    sync_data = load_sync_file(sync_path)
+
+    # Drop the cached lists, so that the changes are visible
+    SpotifyClient().clear_cache()
+
+    snapshot_ids = get_snapshot_ids(sync_data["query"], settings["threads"])
+    old_sources: Dict[str, Dict[str, Any]] = sync_data.get("sources") or {}
+    changed = [
+        query
+        for query in sync_data["query"]
+        if snapshot_ids[query] is None
+        or old_sources.get(query, {}).get("snapshot_id") != snapshot_ids[query]
+    ]
+
+    if not changed:
+        logger.debug("No changes in %s", sync_path)
+        return 0
+
+    logger.info("%s of %s queries changed", len(changed), len(sync_data["query"]))
+
+    songs_playlist, sources = refresh_songs(sync_data, snapshot_ids, settings)
+    update_sync(sync_path, sync_data, songs_playlist, downloader, m3u_file, sources)
+
+    return len(changed)
+
+
+def watch(
+    sync_path: str, downloader: Downloader, m3u_file: Optional[str] = None
+) -> None:
+    """
+    Keep a sync file in sync, checking its queries for changes
+    every `watch_interval` seconds.
+
+    ### Arguments
+    - sync_path: Path to the sync file.
+    - downloader: Already initialized downloader instance.
+    - m3u_file: Name of the m3u file to generate.
+    """
+
+    interval = downloader.settings["watch_interval"]
+    logger.info("Watching %s, checking every %s seconds", sync_path, interval)
+
+    while True:
+        started = time.monotonic()
+        try:
+            # Requests of the web ui and the console are sent first
+            with request_priority(PRIORITY_BULK):
+                watch_cycle(sync_path, downloader, m3u_file)
+        except Exception as exception:  # pylint: disable=W0718
+            logger.error("Could not sync %s: %s", sync_path, exception)
+
+        if downloader.settings["sync_dry_run"]:
+            return
+
+        time.sleep(max(0, interval - (time.monotonic() - started)))
+
+
 def sync(
     query: List[str],
     downloader: Downloader,
@@ -61,18 +615,19 @@ def sync(
             ],
         )
 
+        if downloader.settings["sync_dry_run"]:
+            for line in SyncPlan(downloads=songs_list).describe():
+                logger.info(line)
+
+            return None
+
         # Create sync file
-        with open(save_path, "w", encoding="utf-8") as save_file:
-            json.dump(
-                {
-                    "type": "sync",
-                    "query": query,
-                    "songs": [song.json for song in songs_list],
-                },
-                save_file,
-                indent=4,
-                ensure_ascii=False,
-            )
+        write_save_file(
+            save_path,
+            (song.json for song in songs_list),
+            {"type": "sync", "query": query},
+            downloader.settings["save_format"],
+        )
 
         # Perform initial download
         downloader.download_multiple_songs(songs_list)
@@ -88,6 +643,9 @@ def sync(
                 False,
             )
 
+        if downloader.settings["watch"]:
+            watch(save_path, downloader, m3u_file)
+
         return None
 
     # If the query is a single file, download it
@@ -96,17 +654,11 @@ def sync(
         and query[0].endswith(".spotdl")  # pylint: disable=R1702
         and not save_path  # pylint: disable=R1702
     ):
-        # Load the sync file
-        with open(query[0], "r", encoding="utf-8") as sync_file:
-            sync_data = json.load(sync_file)
+        if downloader.settings["watch"]:
+            watch(query[0], downloader, m3u_file)
+            return None
 
-        # Verify the sync file
-        if (
-            not isinstance(sync_data, dict)
-            or sync_data.get("type") != "sync"
-            or sync_data.get("songs") is None
-        ):
-            raise ValueError("Sync file is not a valid sync file.")
+        sync_data = load_sync_file(query[0])
 
         # Parse the query
         songs_playlist = parse_query(
@@ -120,138 +672,7 @@ def sync(
             ],
         )
 
-        # Get the names and URLs of previously downloaded songs from the sync file
-        old_files = []
-        for entry in sync_data["songs"]:
-            file_name = create_file_name(
-                Song.from_dict(entry),
-                downloader.settings["output"],
-                downloader.settings["format"],
-                downloader.settings["restrict"],
-            )
-
-            old_files.append((file_name, entry["url"]))
-
-        new_urls = [song.url for song in songs_playlist]
-
-        # Delete all song files whose URL is no longer part of the latest playlist
-        if not downloader.settings["sync_without_deleting"]:
-            # Rename songs that have "{list-length}", "{list-position}", "{list-name}",
-            # in the output path so that we don't have to download them again,
-            # and to avoid mangling the directory structure.
-            to_rename: List[Tuple[Path, Path]] = []
-            to_delete = []
-            for path, url in old_files:
-                if url not in new_urls:
-                    to_delete.append(path)
-                else:
-                    new_song = songs_playlist[new_urls.index(url)]
-
-                    new_path = create_file_name(
-                        Song.from_dict(new_song.json),
-                        downloader.settings["output"],
-                        downloader.settings["format"],
-                        downloader.settings["restrict"],
-                    )
-
-                    if path != new_path:
-                        to_rename.append((path, new_path))
-
-            # fix later Downloading duplicate songs in the same playlist
-            # will trigger a re-download of the song. To fix this we have to copy the song
-            # to the new location without removing the old one.
-            for old_path, new_path in to_rename:
-                if old_path.exists():
-                    logger.info("Renaming %s to %s", f"'{old_path}'", f"'{new_path}'")
-                    if new_path.exists():
-                        old_path.unlink()
-                        continue
-
-                    try:
-                        old_path.rename(new_path)
-                    except (PermissionError, OSError) as exc:
-                        logger.debug(
-                            "Could not rename temp file: %s, error: %s", old_path, exc
-                        )
-                else:
-                    logger.debug("%s does not exist.", old_path)
-
-                if downloader.settings["sync_remove_lrc"]:
-                    lrc_file = old_path.with_suffix(".lrc")
-                    new_lrc_file = new_path.with_suffix(".lrc")
-                    if lrc_file.exists():
-                        logger.debug(
-                            "Renaming lrc %s to %s",
-                            f"'{lrc_file}'",
-                            f"'{new_lrc_file}'",
-                        )
-                        try:
-                            lrc_file.rename(new_lrc_file)
-                        except (PermissionError, OSError) as exc:
-                            logger.debug(
-                                "Could not rename lrc file: %s, error: %s",
-                                lrc_file,
-                                exc,
-                            )
-                    else:
-                        logger.debug("%s does not exist.", lrc_file)
-
-            for file in to_delete:
-                if file.exists():
-                    logger.info("Deleting %s", file)
-                    try:
-                        file.unlink()
-                    except (PermissionError, OSError) as exc:
-                        logger.debug(
-                            "Could not remove temp file: %s, error: %s", file, exc
-                        )
-                else:
-                    logger.debug("%s does not exist.", file)
-
-                if downloader.settings["sync_remove_lrc"]:
-                    lrc_file = file.with_suffix(".lrc")
-                    if lrc_file.exists():
-                        logger.debug("Deleting lrc %s", lrc_file)
-                        try:
-                            lrc_file.unlink()
-                        except (PermissionError, OSError) as exc:
-                            logger.debug(
-                                "Could not remove lrc file: %s, error: %s",
-                                lrc_file,
-                                exc,
-                            )
-                    else:
-                        logger.debug("%s does not exist.", lrc_file)
-
-            if len(to_delete) == 0:
-                logger.info("Nothing to delete...")
-            else:
-                logger.info("%s old songs were deleted.", len(to_delete))
-
-        if m3u_file:
-            gen_m3u_files(
-                songs_playlist,
-                m3u_file,
-                downloader.settings["output"],
-                downloader.settings["format"],
-                downloader.settings["restrict"],
-                False,
-            )
-
-        # Write the new sync file
-        with open(query[0], "w", encoding="utf-8") as save_file:
-            json.dump(
-                {
-                    "type": "sync",
-                    "query": sync_data["query"],
-                    "songs": [song.json for song in songs_playlist],
-                },
-                save_file,
-                indent=4,
-                ensure_ascii=False,
-            )
-
-        downloader.download_multiple_songs(songs_playlist)
+        update_sync(query[0], sync_data, songs_playlist, downloader, m3u_file)
 
         return None
 
@@ -26,6 +26,7 @@
     get_current_state,
     router,
 )
+from spotdl.utils.web_engine import DownloadEngine, batch_router
 
 __all__ = ["web"]
 
@@ -99,6 +100,7 @@ def web(web_settings: WebOptions, downloader_settings: DownloaderOptions):
     )
 
     app_state.api.include_router(router)
+    app_state.api.include_router(batch_router)
 
     # Add the CORS middleware
     app_state.api.add_middleware(
@@ -139,6 +141,11 @@ def web(web_settings: WebOptions, downloader_settings: DownloaderOptions):
 
     app_state.downloader_settings = downloader_settings
 
+    # Warm up the download engine shared by all the clients,
+    # `threads` is the concurrency budget for the whole server
+    app_state.engine = DownloadEngine(app_state.loop, downloader_settings["threads"])
+    app_state.engine.warm_up(downloader_settings)
+
     # Open the web browser
     webbrowser.open(f"{protocol}://{web_settings['host']}:{web_settings['port']}/")
 
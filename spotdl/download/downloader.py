@@ -4,29 +4,25 @@
 
 import asyncio
 import datetime
-import json
 import logging
 import re
 import shutil
 import sys
+import threading
 import traceback
 from argparse import Namespace
+from collections import Counter
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Type, Union
+from typing import Dict, List, Optional, Tuple, Union
 
 from yt_dlp.postprocessor.modify_chapters import ModifyChaptersPP
 from yt_dlp.postprocessor.sponsorblock import SponsorBlockPP
 
 from spotdl.download.progress_handler import ProgressHandler
-from spotdl.providers.audio import (
-    AudioProvider,
-    BandCamp,
-    Piped,
-    SoundCloud,
-    YouTube,
-    YouTubeMusic,
-)
-from spotdl.providers.lyrics import AzLyrics, Genius, LyricsProvider, MusixMatch, Synced
+from spotdl.providers import AUDIO_PROVIDERS, LYRICS_PROVIDERS
+from spotdl.providers.audio.base import AudioProvider
+from spotdl.providers.audio.piped import Piped
+from spotdl.providers.lyrics.base import LyricsProvider
 from spotdl.types.options import DownloaderOptionalOptions, DownloaderOptions
 from spotdl.types.song import Song
 from spotdl.utils.archive import Archive
@@ -38,12 +34,18 @@
     get_temp_path,
     modernize_settings,
 )
-from spotdl.utils.ffmpeg import FFmpegError, convert, get_ffmpeg_path
+from spotdl.utils.conversion import ConversionService
+from spotdl.utils.downloader import check_ytmusic_connection
+from spotdl.utils.ffmpeg import FFmpegError, can_copy_stream, find_ffmpeg, probe_audio
 from spotdl.utils.formatter import create_file_name
+from spotdl.utils.library import FileIndex, LibraryIndex, reuse_library_file
 from spotdl.utils.lrc import generate_lrc
+from spotdl.utils.lyrics import LyricsResolver, SongLyrics
 from spotdl.utils.m3u import gen_m3u_files
 from spotdl.utils.metadata import MetadataError, embed_metadata
-from spotdl.utils.search import gather_known_songs, reinit_song, songs_from_albums
+from spotdl.utils.save_format import write_save_file
+from spotdl.utils.search import gather_known_song_files, reinit_song, songs_from_albums
+from spotdl.utils.spotify import SpotifyClient, get_scheduler
 
 __all__ = [
     "AUDIO_PROVIDERS",
@@ -53,21 +55,6 @@
     "SPONSOR_BLOCK_CATEGORIES",
 ]
 
-AUDIO_PROVIDERS: Dict[str, Type[AudioProvider]] = {
-    "youtube": YouTube,
-    "youtube-music": YouTubeMusic,
-    "soundcloud": SoundCloud,
-    "bandcamp": BandCamp,
-    "piped": Piped,
-}
-
-LYRICS_PROVIDERS: Dict[str, Type[LyricsProvider]] = {
-    "genius": Genius,
-    "musixmatch": MusixMatch,
-    "azlyrics": AzLyrics,
-    "synced": Synced,
-}
-
 SPONSOR_BLOCK_CATEGORIES = {
     "sponsor": "Sponsor",
     "intro": "Intermission/Intro Animation",
@@ -135,17 +122,20 @@ def __init__(
             )
 
         # If ffmpeg is the default value and it's not installed
-        # try to use the spotdl's ffmpeg
+        # try to use the spotdl's ffmpeg, the lookup is cached between runs
         self.ffmpeg = self.settings["ffmpeg"]
-        if self.ffmpeg == "ffmpeg" and shutil.which("ffmpeg") is None:
-            ffmpeg_exec = get_ffmpeg_path()
+        if self.ffmpeg == "ffmpeg":
+            ffmpeg_exec = find_ffmpeg()
             if ffmpeg_exec is None:
                 raise DownloaderError("ffmpeg is not installed")
 
-            self.ffmpeg = str(ffmpeg_exec.absolute())
+            self.ffmpeg = str(ffmpeg_exec)
 
         logger.debug("FFmpeg path: %s", self.ffmpeg)
 
+        # Conversions are queued to a fixed pool of ffmpeg workers
+        self.converter = ConversionService(self.ffmpeg)
+
         self.loop = loop or (
             asyncio.new_event_loop()
             if sys.platform != "win32"
@@ -163,23 +153,26 @@ def __init__(
         # Gather already present songs
         self.scan_formats = self.settings["detect_formats"] or [self.settings["format"]]
         self.known_songs: Dict[str, List[Path]] = {}
+        self.file_index = FileIndex()
+        self.library = LibraryIndex()
         if self.settings["scan_for_songs"]:
             logger.info("Scanning for known songs, this might take a while...")
             for scan_format in self.scan_formats:
                 logger.debug("Scanning for %s files", scan_format)
 
-                found_files = gather_known_songs(self.settings["output"], scan_format)
+                found_files = gather_known_song_files(
+                    self.settings["output"], scan_format
+                )
 
                 logger.debug("Found %s %s files", len(found_files), scan_format)
 
-                for song_url, song_paths in found_files.items():
-                    known_paths = self.known_songs.get(song_url)
-                    if known_paths is None:
-                        self.known_songs[song_url] = song_paths
-                    else:
-                        self.known_songs[song_url].extend(song_paths)
+                for song, song_path in found_files:
+                    self.known_songs.setdefault(song.url, []).append(song_path)
+                    self.library.add(song, song_path)
 
-        logger.debug("Found %s known songs", len(self.known_songs))
+        logger.debug(
+            "Found %s known songs in %s files", len(self.known_songs), len(self.library)
+        )
 
         # Initialize lyrics providers
         self.lyrics_providers: List[LyricsProvider] = []
@@ -191,10 +184,16 @@ def __init__(
                 access_token = self.settings.get("genius_token")
                 if not access_token:
                     raise DownloaderError("Genius token not found in settings")
-                self.lyrics_providers.append(Genius(access_token))
+                self.lyrics_providers.append(lyrics_class(access_token))
             else:
                 self.lyrics_providers.append(lyrics_class())
 
+        # Lyrics are resolved once per song,
+        # for both the embedded lyrics and the lrc file
+        self.lyrics_resolver = LyricsResolver(
+            self.lyrics_providers, find_synced=self.settings["generate_lrc"]
+        )
+
         # Initialize audio providers
         self.audio_providers: List[AudioProvider] = []
         for audio_provider in self.settings["audio_providers"]:
@@ -212,9 +211,16 @@ def __init__(
                 )
             )
 
+        # Provider health is checked on first search, not up front
+        self.providers_checked = self.settings["no_preflight"]
+        self.providers_lock = threading.Lock()
+
         # Initialize list of errors
         self.errors: List[str] = []
 
+        # How many files were moved, stream copied or transcoded
+        self.conversion_stats: Counter = Counter()
+
         # Initialize proxy server
         proxy = self.settings["proxy"]
         proxies = None
@@ -285,6 +291,9 @@ def download_multiple_songs(
 
         logger.debug("Downloading %d songs", len(songs))
 
+        # Files might have been added or removed since the last run
+        self.file_index.clear()
+
         if self.settings["archive"]:
             songs = [song for song in songs if song.url not in self.url_archive]
             logger.debug("Filtered %d songs with archive", len(songs))
@@ -297,6 +306,10 @@ def download_multiple_songs(
         # Call all task asynchronously, and wait until all are finished
         results = list(self.loop.run_until_complete(asyncio.gather(*tasks)))
 
+        logger.debug("Conversions: %s", dict(self.conversion_stats))
+        logger.debug("Spotify requests: %s", get_scheduler().get_metrics())
+        logger.debug("Spotify cache: %s", SpotifyClient.get_cache_metrics())
+
         # Print errors
         if self.settings["print_errors"]:
             for error in self.errors:
@@ -348,8 +361,11 @@ def download_multiple_songs(
 
         # Save results to a file
         if self.settings["save_file"]:
-            with open(self.settings["save_file"], "w", encoding="utf-8") as save_file:
-                json.dump([song.json for song, _ in results], save_file, indent=4)
+            write_save_file(
+                self.settings["save_file"],
+                (song.json for song, _ in results),
+                save_format=self.settings["save_format"],
+            )
 
             logger.info("Saved results to %s", self.settings["save_file"])
 
@@ -385,6 +401,9 @@ def search(self, song: Song) -> str:
         - tuple with download url and audio provider if successful.
         """
 
+        if not self.providers_checked:
+            self.check_providers()
+
         for audio_provider in self.audio_providers:
             url = audio_provider.search(song, self.settings["only_verified_results"])
             if url:
@@ -394,6 +413,55 @@ def search(self, song: Song) -> str:
 
         raise LookupError(f"No results found for song: {song.display_name}")
 
+    def check_providers(self):
+        """
+        Check that the audio providers are usable, replacing
+        YouTube Music with Piped if we are blocked by it.
+        Only the first call does the (cached) check.
+        """
+
+        with self.providers_lock:
+            if self.providers_checked:
+                return
+
+            self.providers_checked = True
+            if "youtube-music" not in self.settings["audio_providers"]:
+                return
+
+            try:
+                reachable = check_ytmusic_connection()
+            except Exception as exception:  # pylint: disable=W0718
+                logger.debug("YouTube Music check failed: %s", exception)
+                reachable = False
+
+            if reachable:
+                return
+
+            logger.warning(
+                "You are blocked by YouTube Music, falling back to piped. "
+                "Use a VPN or other audio providers to avoid this"
+            )
+
+            # Build new lists, they might be shared with copies of this downloader
+            providers = list(self.settings["audio_providers"])
+            audio_providers = list(self.audio_providers)
+            index = providers.index("youtube-music")
+            if "piped" in providers:
+                del providers[index]
+                del audio_providers[index]
+            else:
+                providers[index] = "piped"
+                audio_providers[index] = Piped(
+                    output_format=self.settings["format"],
+                    cookie_file=self.settings["cookie_file"],
+                    search_query=self.settings["search_query"],
+                    filter_results=self.settings["filter_results"],
+                    yt_dlp_args=self.settings["yt_dlp_args"],
+                )
+
+            self.settings["audio_providers"] = providers
+            self.audio_providers = audio_providers
+
     def search_lyrics(self, song: Song) -> Optional[str]:
         """
         Search for lyrics using all available providers.
@@ -405,22 +473,7 @@ def search_lyrics(self, song: Song) -> Optional[str]:
         - lyrics if successful else None.
         """
 
-        for lyrics_provider in self.lyrics_providers:
-            lyrics = lyrics_provider.get_lyrics(song.name, song.artists)
-            if lyrics:
-                logger.debug(
-                    "Found lyrics for %s on %s", song.display_name, lyrics_provider.name
-                )
-
-                return lyrics
-
-            logger.debug(
-                "%s failed to find lyrics for %s",
-                lyrics_provider.name,
-                song.display_name,
-            )
-
-        return None
+        return self.lyrics_resolver.resolve(song).lyrics
 
     def search_and_download(  # pylint: disable=R0911
         self, song: Song
@@ -494,15 +547,15 @@ def search_and_download(  # pylint: disable=R0911
                 dup_song_path
                 for dup_song_path in dup_song_paths
                 if (dup_song_path.absolute() != output_file.absolute())
-                and dup_song_path.exists()
+                and self.file_index.exists(dup_song_path)
             ]
 
             # Checking if file already exists in all subfolders of output directory
-            file_exists = output_file.exists() or dup_song_paths
+            file_exists = self.file_index.exists(output_file) or dup_song_paths
             if not self.settings["scan_for_songs"]:
                 for file_extension in self.scan_formats:
                     ext_path = output_file.with_suffix(f".{file_extension}")
-                    if ext_path.exists():
+                    if self.file_index.exists(ext_path):
                         dup_song_paths.append(ext_path)
 
             if dup_song_paths:
@@ -538,6 +591,26 @@ def search_and_download(  # pylint: disable=R0911
                 display_progress_tracker.notify_download_skip()
                 return song, output_file
 
+            elif (
+                not file_exists
+                and self.settings["overwrite"] == "skip"
+                and self.settings["library_dedup"]
+            ):
+                library_file = reuse_library_file(
+                    self.library,
+                    self.file_index,
+                    song,
+                    output_file,
+                    self.settings["library_dedup"],
+                )
+                if library_file is not None:
+                    display_progress_tracker.notify_download_skip(
+                        "Linked"
+                        if self.settings["library_dedup"] == "link"
+                        else "Skipped"
+                    )
+                    return song, library_file
+
             # Don't skip if the file exists and overwrite is set to force
             if file_exists and self.settings["overwrite"] == "force":
                 logger.info(
@@ -552,6 +625,7 @@ def search_and_download(  # pylint: disable=R0911
                         logger.info("Removing duplicate file: %s", dup_song_path)
 
                         dup_song_path.unlink()
+                        self.file_index.discard(dup_song_path)
                     except (PermissionError, OSError, Exception) as exc:
                         logger.debug(
                             "Could not remove duplicate file: %s, error: %s",
@@ -560,8 +634,10 @@ def search_and_download(  # pylint: disable=R0911
                         )
 
             # Find song lyrics and add them to the song object
+            song_lyrics: Optional[SongLyrics] = None
             try:
-                lyrics = self.search_lyrics(song)
+                song_lyrics = self.lyrics_resolver.resolve(song)
+                lyrics = song_lyrics.lyrics or song_lyrics.synced
                 if lyrics is None:
                     logger.debug(
                         "No lyrics found for %s, lyrics providers: %s",
@@ -595,6 +671,7 @@ def search_and_download(  # pylint: disable=R0911
                         try:
                             logger.info("Removing duplicate file: %s", old_song_path)
                             old_song_path.unlink()
+                            self.file_index.discard(old_song_path)
                         except (PermissionError, OSError) as exc:
                             logger.debug(
                                 "Could not remove duplicate file: %s, error: %s",
@@ -610,6 +687,10 @@ def search_and_download(  # pylint: disable=R0911
                         most_recent_duplicate.replace(
                             output_file.with_suffix(f".{self.settings['format']}")
                         )
+                        self.file_index.discard(most_recent_duplicate)
+                        self.file_index.add(
+                            output_file.with_suffix(f".{self.settings['format']}")
+                        )
 
                 if (
                     most_recent_duplicate
@@ -709,6 +790,7 @@ def search_and_download(  # pylint: disable=R0911
                 and self.settings["bitrate"] != "disable"
             ):
                 shutil.move(str(temp_file), output_file)
+                self.conversion_stats["move"] += 1
                 success = True
                 result = None
             else:
@@ -725,16 +807,41 @@ def search_and_download(  # pylint: disable=R0911
                 else:
                     bitrate = str(self.settings["bitrate"])
 
+                # Copy the audio stream if the output format can hold it
+                # at the requested quality, transcoding is the expensive path
+                codec, source_bitrate = probe_audio(temp_file, download_info)
+                stream_copy = can_copy_stream(
+                    codec,
+                    source_bitrate,
+                    self.settings["format"],
+                    (
+                        str(self.settings["bitrate"])
+                        if self.settings["bitrate"] is not None
+                        else None
+                    ),
+                    self.settings["ffmpeg_args"],
+                )
+
+                logger.debug(
+                    "Source codec: %s, bitrate: %s, %s",
+                    codec,
+                    source_bitrate,
+                    "copying stream" if stream_copy else "transcoding",
+                )
+
+                self.conversion_stats["copy" if stream_copy else "transcode"] += 1
+
                 # Convert the downloaded file to the output format
-                success, result = convert(
+                success, result = self.converter.submit(
                     input_file=temp_file,
                     output_file=output_file,
-                    ffmpeg=self.ffmpeg,
                     output_format=self.settings["format"],
                     bitrate=bitrate,
                     ffmpeg_args=self.settings["ffmpeg_args"],
                     progress_handler=display_progress_tracker.ffmpeg_progress_hook,
-                )
+                    duration=song.duration,
+                    stream_copy=stream_copy,
+                ).result()
 
                 if self.settings["create_skip_file"]:
                     with open(
@@ -775,6 +882,7 @@ def search_and_download(  # pylint: disable=R0911
                 # Remove the file that failed to convert
                 if output_file.exists():
                     output_file.unlink()
+                    self.file_index.discard(output_file)
 
                 raise FFmpegError(
                     f"Failed to convert {song.display_name}, "
@@ -821,6 +929,7 @@ def search_and_download(  # pylint: disable=R0911
                     # Delete the files that were created by the post processor
                     for file_to_delete in files_to_delete:
                         Path(file_to_delete).unlink()
+                        self.file_index.discard(Path(file_to_delete))
 
             try:
                 embed_metadata(
@@ -835,12 +944,14 @@ def search_and_download(  # pylint: disable=R0911
                 ) from exception
 
             if self.settings["generate_lrc"]:
-                generate_lrc(song, output_file)
+                generate_lrc(song, output_file, song_lyrics)
 
             display_progress_tracker.notify_complete()
 
             # Add the song to the known songs
-            self.known_songs.get(song.url, []).append(output_file)
+            self.known_songs.setdefault(song.url, []).append(output_file)
+            self.file_index.add(output_file)
+            self.library.add(song, output_file)
 
             logger.info('Downloaded "%s": %s', song.display_name, song.download_url)
 
@@ -861,3 +972,14 @@ def search_and_download(  # pylint: disable=R0911
                 f"{song.url} - {exception.__class__.__name__}: {exception}"
             )
             return song, None
+
+    def close(self, wait: bool = True):
+        """
+        Stop the conversion workers once the queued files are converted.
+        The downloader can't convert files afterwards.
+
+        ### Arguments
+        - wait: Whether to wait for the queued files to be converted.
+        """
+
+        self.converter.close(wait)
@@ -1,3 +1,27 @@
 """
 Different types of data providers for spotdl.
 """
+
+from spotdl.utils.lazy import LazyImportDict
+
+__all__ = ["AUDIO_PROVIDERS", "LYRICS_PROVIDERS"]
+
+# Providers are looked up by name, and imported only when they are used
+AUDIO_PROVIDERS = LazyImportDict(
+    {
+        "youtube": "spotdl.providers.audio.youtube:YouTube",
+        "youtube-music": "spotdl.providers.audio.ytmusic:YouTubeMusic",
+        "soundcloud": "spotdl.providers.audio.soundcloud:SoundCloud",
+        "bandcamp": "spotdl.providers.audio.bandcamp:BandCamp",
+        "piped": "spotdl.providers.audio.piped:Piped",
+    }
+)
+
+LYRICS_PROVIDERS = LazyImportDict(
+    {
+        "genius": "spotdl.providers.lyrics.genius:Genius",
+        "musixmatch": "spotdl.providers.lyrics.musixmatch:MusixMatch",
+        "azlyrics": "spotdl.providers.lyrics.azlyrics:AzLyrics",
+        "synced": "spotdl.providers.lyrics.synced:Synced",
+    }
+)
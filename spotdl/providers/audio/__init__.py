@@ -1,18 +1,24 @@
 """
 Audio providers for spotdl.
+Providers are imported on first access, so that only the selected ones are loaded.
 """
 
-from spotdl.providers.audio.bandcamp import BandCamp
-from spotdl.providers.audio.base import (
-    ISRC_REGEX,
-    AudioProvider,
-    AudioProviderError,
-    YTDLLogger,
-)
-from spotdl.providers.audio.piped import Piped
-from spotdl.providers.audio.soundcloud import SoundCloud
-from spotdl.providers.audio.youtube import YouTube
-from spotdl.providers.audio.ytmusic import YouTubeMusic
+from typing import TYPE_CHECKING
+
+from spotdl.utils.lazy import lazy_getattr
+
+if TYPE_CHECKING:
+    from spotdl.providers.audio.bandcamp import BandCamp
+    from spotdl.providers.audio.base import (
+        ISRC_REGEX,
+        AudioProvider,
+        AudioProviderError,
+        YTDLLogger,
+    )
+    from spotdl.providers.audio.piped import Piped
+    from spotdl.providers.audio.soundcloud import SoundCloud
+    from spotdl.providers.audio.youtube import YouTube
+    from spotdl.providers.audio.ytmusic import YouTubeMusic
 
 __all__ = [
     "YouTube",
@@ -25,3 +31,18 @@
     "YTDLLogger",
     "ISRC_REGEX",
 ]
+
+__getattr__ = lazy_getattr(
+    __name__,
+    {
+        "YouTube": "spotdl.providers.audio.youtube:YouTube",
+        "YouTubeMusic": "spotdl.providers.audio.ytmusic:YouTubeMusic",
+        "SoundCloud": "spotdl.providers.audio.soundcloud:SoundCloud",
+        "BandCamp": "spotdl.providers.audio.bandcamp:BandCamp",
+        "Piped": "spotdl.providers.audio.piped:Piped",
+        "AudioProvider": "spotdl.providers.audio.base:AudioProvider",
+        "AudioProviderError": "spotdl.providers.audio.base:AudioProviderError",
+        "YTDLLogger": "spotdl.providers.audio.base:YTDLLogger",
+        "ISRC_REGEX": "spotdl.providers.audio.base:ISRC_REGEX",
+    },
+)
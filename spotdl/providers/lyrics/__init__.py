@@ -1,11 +1,28 @@
 """
 Lyrics providers for spotdl.
+Providers are imported on first access, so that only the selected ones are loaded.
 """
 
-from spotdl.providers.lyrics.azlyrics import AzLyrics
-from spotdl.providers.lyrics.base import LyricsProvider
-from spotdl.providers.lyrics.genius import Genius
-from spotdl.providers.lyrics.musixmatch import MusixMatch
-from spotdl.providers.lyrics.synced import Synced
+from typing import TYPE_CHECKING
+
+from spotdl.utils.lazy import lazy_getattr
+
+if TYPE_CHECKING:
+    from spotdl.providers.lyrics.azlyrics import AzLyrics
+    from spotdl.providers.lyrics.base import LyricsProvider
+    from spotdl.providers.lyrics.genius import Genius
+    from spotdl.providers.lyrics.musixmatch import MusixMatch
+    from spotdl.providers.lyrics.synced import Synced
 
 __all__ = ["AzLyrics", "Genius", "MusixMatch", "Synced", "LyricsProvider"]
+
+__getattr__ = lazy_getattr(
+    __name__,
+    {
+        "AzLyrics": "spotdl.providers.lyrics.azlyrics:AzLyrics",
+        "Genius": "spotdl.providers.lyrics.genius:Genius",
+        "MusixMatch": "spotdl.providers.lyrics.musixmatch:MusixMatch",
+        "Synced": "spotdl.providers.lyrics.synced:Synced",
+        "LyricsProvider": "spotdl.providers.lyrics.base:LyricsProvider",
+    },
+)
@@ -2,10 +2,12 @@
 Artist module for retrieving artist data from Spotify.
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 from spotdl.types.song import Song, SongList
+from spotdl.utils.pagination import get_all_items
 from spotdl.utils.spotify import SpotifyClient
 
 __all__ = ["Album", "AlbumError"]
@@ -51,26 +53,106 @@ def get_metadata(url: str) -> Tuple[Dict[str, Any], List[Song]]:
             "url": url,
         }
 
-        album_response = spotify_client.album_tracks(url)
-        if album_response is None:
-            raise AlbumError(
-                "Couldn't get metadata, check if you have passed correct album id"
-            )
+        # The first page of tracks is part of the album object
+        tracks = Album.get_all_tracks(album_metadata)
+        songs = Album.songs_from_metadata(album_metadata, tracks)
+
+        return metadata, songs
+
+    @classmethod
+    def from_raw_metadata(
+        cls, album_metadata: Dict[str, Any], url: Optional[str] = None
+    ) -> "Album":
+        """
+        Creates an Album object from a raw Spotify album object,
+        only albums with more than 50 tracks need more calls.
+
+        ### Arguments
+        - album_metadata: The album object.
+        - url: The URL of the album, defaults to the Spotify URL of the album.
+
+        ### Returns
+        - The Album object.
+        """
+
+        songs = cls.songs_from_metadata(
+            album_metadata, cls.get_all_tracks(album_metadata)
+        )
+
+        return cls(
+            name=album_metadata["name"],
+            artist=album_metadata["artists"][0],
+            url=url or album_metadata["external_urls"]["spotify"],
+            urls=[song.url for song in songs],
+            songs=songs,
+        )
+
+    @classmethod
+    def list_from_urls(cls, urls: List[str], threads: int = 4) -> List["Album"]:
+        """
+        Creates a list of Album objects using the bulk albums endpoint,
+        20 albums per call, with the calls made in parallel.
+        The first page of tracks is part of the album object,
+        so only albums with more than 50 tracks need more calls.
+
+        ### Arguments
+        - urls: The URLs of the albums.
+        - threads: Number of concurrent calls.
+
+        ### Returns
+        - The list of Album objects, in the same order as the URLs.
+            Albums that no longer exist are skipped.
+        """
+
+        spotify_client = SpotifyClient()
+
+        def fetch_albums(chunk: List[str]) -> List[Optional[Album]]:
+            response = spotify_client.albums(chunk)
+            return [
+                cls.from_raw_metadata(raw_album, url) if raw_album else None
+                for url, raw_album in zip(chunk, (response or {}).get("albums", []))
+            ]
+
+        chunks = [urls[index : index + 20] for index in range(0, len(urls), 20)]
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            results = list(executor.map(fetch_albums, chunks))
+
+        return [album for chunk in results for album in chunk if album is not None]
+
+    @staticmethod
+    def get_all_tracks(album_metadata: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Get all tracks of an album, starting from the page of tracks
+        that is part of the album object.
+
+        ### Arguments
+        - album_metadata: The album object.
 
-        tracks = album_response["items"]
+        ### Returns
+        - The list of tracks.
+        """
 
-        # Get all tracks from album
-        while album_response["next"]:
-            album_response = spotify_client.next(album_response)
+        # Get the remaining tracks of the album
+        tracks = get_all_items(album_metadata["tracks"])
+        if len(tracks) < album_metadata["tracks"].get("total", 0):
+            raise AlbumError(f"Failed to get album response: {album_metadata['id']}")
 
-            # Failed to get response, break the loop
-            if album_response is None:
-                break
+        return tracks
+
+    @staticmethod
+    def songs_from_metadata(
+        album_metadata: Dict[str, Any], tracks: List[Dict[str, Any]]
+    ) -> List[Song]:
+        """
+        Create the songs of an album.
 
-            tracks.extend(album_response["items"])
+        ### Arguments
+        - album_metadata: The album object.
+        - tracks: All tracks of the album.
 
-        if album_response is None:
-            raise AlbumError(f"Failed to get album response: {url}")
+        ### Returns
+        - The list of songs, local tracks are skipped.
+        """
 
         songs = []
         for track in tracks:
@@ -78,7 +160,7 @@ def get_metadata(url: str) -> Tuple[Dict[str, Any], List[Song]]:
                 continue
 
             release_date = album_metadata["release_date"]
-            artists = artists = [artist["name"] for artist in track["artists"]]
+            artists = [artist["name"] for artist in track["artists"]]
 
             song = Song.from_missing_data(
                 name=track["name"],
@@ -115,4 +197,4 @@ def get_metadata(url: str) -> Tuple[Dict[str, Any], List[Song]]:
 
             songs.append(song)
 
-        return metadata, songs
+        return songs
@@ -8,6 +8,7 @@
 from spotdl.types.album import Album
 from spotdl.types.song import Song, SongList
 from spotdl.utils.formatter import slugify
+from spotdl.utils.pagination import get_all_items
 from spotdl.utils.spotify import SpotifyClient
 
 __all__ = ["Artist", "ArtistError"]
@@ -55,7 +56,7 @@ def get_metadata(url: str) -> Tuple[Dict[str, Any], List[Song]]:
 
         # include_groups used to be called album_type
         artist_albums = spotify_client.artist_albums(
-            url, include_groups="album,single,compilation"
+            url, include_groups="album,single,compilation", limit=50
         )
         # check if there is response
         if not artist_albums:
@@ -68,36 +69,22 @@ def get_metadata(url: str) -> Tuple[Dict[str, Any], List[Song]]:
         # different countries
         albums: List[str] = []
         known_albums: Set[str] = set()
-        for album in artist_albums["items"]:
-            albums.append(album["external_urls"]["spotify"])
-            known_albums.add(slugify(album["name"]))
+        for album in get_all_items(artist_albums):
+            album_name = slugify(album["name"])
 
-        # Fetch all artist albums
-        while artist_albums and artist_albums["next"]:
-            artist_albums = spotify_client.next(artist_albums)
-            if artist_albums is None:
-                break
-
-            for album in artist_albums["items"]:
-                album_name = slugify(album["name"])
-
-                if album_name not in known_albums:
-                    albums.append(album["external_urls"]["spotify"])
-                    known_albums.add(album_name)
-
-        songs = []
-        for album in albums:
-            album_obj = Album.from_url(album, fetch_songs=False)
-            songs.extend(album_obj.songs)
+            if album_name not in known_albums:
+                albums.append(album["external_urls"]["spotify"])
+                known_albums.add(album_name)
 
         # Very aggressive deduplication
         songs_list = []
-        songs_names = set()
-        for song in songs:
-            slug_name = slugify(song.name)
-            if song.name not in songs_names:
-                songs_list.append(song)
-                songs_names.add(slug_name)
+        songs_names: Set[str] = set()
+        for album_obj in Album.list_from_urls(albums):
+            for song in album_obj.songs:
+                slug_name = slugify(song.name)
+                if slug_name not in songs_names:
+                    songs_list.append(song)
+                    songs_names.add(slug_name)
 
         metadata = {
             "name": raw_artist_meta["name"],
@@ -47,6 +47,7 @@ class DownloaderOptions(TypedDict):
     playlist_numbering: bool
     playlist_retain_track_cover: bool
     scan_for_songs: bool
+    library_dedup: Optional[str]
     m3u: Optional[str]
     output: str
     overwrite: str
@@ -56,6 +57,7 @@ class DownloaderOptions(TypedDict):
     ffmpeg_args: Optional[str]
     format: str
     save_file: Optional[str]
+    save_format: str
     filter_results: bool
     album_type: Optional[str]
     threads: int
@@ -89,6 +91,10 @@ class DownloaderOptions(TypedDict):
     create_skip_file: Optional[bool]
     respect_skip_file: Optional[bool]
     sync_remove_lrc: Optional[bool]
+    sync_dry_run: Optional[bool]
+    watch: Optional[bool]
+    watch_interval: int
+    no_preflight: Optional[bool]
 
 
 class WebOptions(TypedDict):
@@ -144,6 +150,7 @@ class DownloaderOptionalOptions(TypedDict, total=False):
     playlist_numbering: bool
     playlist_retain_track_cover: bool
     scan_for_songs: bool
+    library_dedup: Optional[str]
     m3u: Optional[str]
     output: str
     overwrite: str
@@ -153,6 +160,7 @@ class DownloaderOptionalOptions(TypedDict, total=False):
     ffmpeg_args: Optional[str]
     format: str
     save_file: Optional[str]
+    save_format: str
     filter_results: bool
     album_type: Optional[str]
     threads: int
@@ -185,6 +193,10 @@ class DownloaderOptionalOptions(TypedDict, total=False):
     create_skip_file: Optional[bool]
     respect_skip_file: Optional[bool]
     sync_remove_lrc: Optional[bool]
+    sync_dry_run: Optional[bool]
+    watch: Optional[bool]
+    watch_interval: int
+    no_preflight: Optional[bool]
 
 
 class WebOptionalOptions(TypedDict, total=False):
@@ -7,6 +7,7 @@
 from typing import Any, Dict, List, Tuple
 
 from spotdl.types.song import Song, SongList
+from spotdl.utils.pagination import get_all_items
 from spotdl.utils.spotify import SpotifyClient
 
 __all__ = ["Playlist", "PlaylistError"]
@@ -74,16 +75,7 @@ def get_metadata(url: str) -> Tuple[Dict[str, Any], List[Song]]:
             raise PlaylistError(f"Wrong playlist id: {url}")
 
         # Get all tracks from playlist
-        tracks = playlist_response["items"]
-        while playlist_response["next"]:
-            playlist_response = spotify_client.next(playlist_response)
-
-            # Failed to get response, break the loop
-            if playlist_response is None:
-                break
-
-            # Add tracks to the list
-            tracks.extend(playlist_response["items"])
+        tracks = get_all_items(playlist_response)
 
         songs = []
         for track_no, track in enumerate(tracks):
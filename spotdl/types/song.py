@@ -3,14 +3,46 @@
 """
 
 import json
-from dataclasses import asdict, dataclass
+import sys
+from dataclasses import asdict, dataclass, fields
 from typing import Any, Dict, List, Optional, Tuple
 
 from rapidfuzz import fuzz
 
 from spotdl.utils.spotify import SpotifyClient
 
-__all__ = ["Song", "SongList", "SongError"]
+__all__ = ["INTERNED_FIELDS", "Song", "SongList", "SongError", "intern_value"]
+
+# Fields shared by many songs (same artist, album or list),
+# interned so that songs loaded from different responses share the strings
+INTERNED_FIELDS = (
+    "artist",
+    "album_name",
+    "album_artist",
+    "date",
+    "publisher",
+    "copyright_text",
+    "album_id",
+    "artist_id",
+    "album_type",
+    "list_name",
+    "list_url",
+)
+
+
+def intern_value(value: Any) -> Any:
+    """
+    Intern a string, other values are returned as is.
+
+    ### Arguments
+    - value: The value to intern.
+
+    ### Returns
+    - The interned string or the value.
+    """
+
+    # `sys.intern` only accepts exact strings
+    return sys.intern(value) if type(value) is str else value  # pylint: disable=C0123
 
 
 class SongError(Exception):
@@ -25,10 +57,11 @@ class SongListError(Exception):
     """
 
 
-@dataclass
+@dataclass(slots=True)
 class Song:
     """
     Song class. Contains all the information about a song.
+    Slotted to keep large libraries compact in memory.
     """
 
     name: str
@@ -62,6 +95,20 @@ class Song:
     artist_id: Optional[str] = None
     album_type: Optional[str] = None
 
+    def __post_init__(self):
+        """
+        Intern the strings that are repeated across songs.
+        """
+
+        for key in INTERNED_FIELDS:
+            setattr(self, key, intern_value(getattr(self, key)))
+
+        if self.artists:
+            self.artists = list(map(intern_value, self.artists))
+
+        if self.genres:
+            self.genres = list(map(intern_value, self.genres))
+
     @classmethod
     def from_url(cls, url: str) -> "Song":
         """
@@ -99,6 +146,92 @@ def from_url(cls, url: str) -> "Song":
         album_id = raw_track_meta["album"]["id"]
         raw_album_meta: Dict[str, Any] = spotify_client.album(album_id)  # type: ignore
 
+        return cls.from_raw_metadata(raw_track_meta, raw_artist_meta, raw_album_meta)
+
+    @classmethod
+    def list_from_urls(cls, urls: List[str]) -> List["Song"]:
+        """
+        Creates a list of Song objects from track URLs using bulk requests:
+        one call per 50 tracks, per 50 artists and per 20 albums
+        instead of three calls per song.
+
+        ### Arguments
+        - urls: The URLs of the songs.
+
+        ### Returns
+        - The list of Song objects, in the same order as the URLs.
+            Tracks that no longer exist are skipped.
+        """
+
+        for url in urls:
+            if "open.spotify.com" not in url or "track" not in url:
+                raise SongError(f"Invalid URL: {url}")
+
+        spotify_client = SpotifyClient()
+
+        track_ids = [url.split("/")[-1].split("?")[0] for url in urls]
+        raw_tracks: List[Dict[str, Any]] = []
+        for index in range(0, len(track_ids), 50):
+            response = spotify_client.tracks(track_ids[index : index + 50])
+            raw_tracks.extend(
+                track
+                for track in (response or {}).get("tracks", [])
+                if track is not None
+                and track["duration_ms"] != 0
+                and track["name"].strip() != ""
+            )
+
+        artist_ids = list(
+            dict.fromkeys(track["artists"][0]["id"] for track in raw_tracks)
+        )
+        raw_artists: Dict[str, Dict[str, Any]] = {}
+        for index in range(0, len(artist_ids), 50):
+            response = spotify_client.artists(artist_ids[index : index + 50])
+            for artist in (response or {}).get("artists", []):
+                if artist is not None:
+                    raw_artists[artist["id"]] = artist
+
+        album_ids = list(dict.fromkeys(track["album"]["id"] for track in raw_tracks))
+        raw_albums: Dict[str, Dict[str, Any]] = {}
+        for index in range(0, len(album_ids), 20):
+            response = spotify_client.albums(album_ids[index : index + 20])
+            for album in (response or {}).get("albums", []):
+                if album is not None:
+                    raw_albums[album["id"]] = album
+
+        return [
+            cls.from_raw_metadata(
+                track,
+                raw_artists[track["artists"][0]["id"]],
+                raw_albums[track["album"]["id"]],
+            )
+            for track in raw_tracks
+            if track["artists"][0]["id"] in raw_artists
+            and track["album"]["id"] in raw_albums
+        ]
+
+    @classmethod
+    def from_raw_metadata(
+        cls,
+        raw_track_meta: Dict[str, Any],
+        raw_artist_meta: Dict[str, Any],
+        raw_album_meta: Dict[str, Any],
+    ) -> "Song":
+        """
+        Creates a Song object from the raw Spotify track, artist and album objects.
+
+        ### Arguments
+        - raw_track_meta: The track object.
+        - raw_artist_meta: The object of the track's primary artist.
+        - raw_album_meta: The album object.
+
+        ### Returns
+        - The Song object.
+        """
+
+        primary_artist_id = raw_track_meta["artists"][0]["id"]
+        album_id = raw_track_meta["album"]["id"]
+
         # create song object
         return cls(
             name=raw_track_meta["name"],
@@ -274,9 +407,18 @@ def json(self) -> Dict[str, Any]:
 
         ### Returns
         - The dictionary.
+
+        ### Notes
+        - Only the lists are copied, the other values are immutable.
         """
 
-        return asdict(self)
+        return {
+            key: list(value) if isinstance(value, list) else value
+            for key, value in zip(SONG_FIELDS, map(self.__getattribute__, SONG_FIELDS))
+        }
+
+
+SONG_FIELDS = tuple(field.name for field in fields(Song))
 
 
 @dataclass(frozen=True)
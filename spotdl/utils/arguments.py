@@ -9,10 +9,11 @@
 from typing import List
 
 from spotdl import _version
-from spotdl.download.downloader import AUDIO_PROVIDERS, LYRICS_PROVIDERS
+from spotdl.providers import AUDIO_PROVIDERS, LYRICS_PROVIDERS
 from spotdl.utils.ffmpeg import FFMPEG_FORMATS
 from spotdl.utils.formatter import VARS
 from spotdl.utils.logging import NAME_TO_LEVEL
+from spotdl.utils.save_format import SAVE_FORMATS
 
 __all__ = ["OPERATIONS", "SmartFormatter", "parse_arguments"]
 
@@ -354,6 +355,17 @@ def parse_output_options(parser: _ArgumentGroup):
         required=len(sys.argv) > 1 and sys.argv[1] in ["save"],
     )
 
+    # Add save format argument
+    parser.add_argument(
+        "--save-format",
+        choices=SAVE_FORMATS,
+        help=(
+            "The format of new save/sync files. "
+            "ndjson stores one song per line, which is faster for large libraries. "
+            "Both formats can be read, existing sync files keep their format."
+        ),
+    )
+
     # Add preload argument
     parser.add_argument(
         "--preload",
@@ -480,6 +492,19 @@ def parse_output_options(parser: _ArgumentGroup):
         ),
     )
 
+    # Option to reuse files of the same recording from other releases
+    parser.add_argument(
+        "--library-dedup",
+        choices={"skip", "link"},
+        help=(
+            "Reuse files of the same recording (same url, ISRC, or artist and title "
+            "within 2 seconds) that are already in the library instead of downloading "
+            "them again. skip will not create a new file, link will hard link "
+            "the existing file to the output path. "
+            "(Best combined with --scan-for-songs)"
+        ),
+    )
+
     # Option to fetch all albums from songs in query
     parser.add_argument(
         "--fetch-albums",
@@ -627,6 +652,32 @@ def parse_output_options(parser: _ArgumentGroup):
         help="Remove lrc files when using sync operation when downloading songs",
     )
 
+    # Sync dry run
+    parser.add_argument(
+        "--sync-dry-run",
+        action="store_const",
+        const=True,
+        help="Print the actions of the sync operation without changing any files",
+    )
+
+    # Sync watch mode
+    parser.add_argument(
+        "--watch",
+        action="store_const",
+        const=True,
+        help=(
+            "Keep running the sync operation, only the playlists, albums "
+            "and artists that changed are fetched and synced again."
+        ),
+    )
+
+    # Sync watch interval
+    parser.add_argument(
+        "--watch-interval",
+        type=int,
+        help="Number of seconds between checks for changes in watch mode.",
+    )
+
 
 def parse_web_options(parser: _ArgumentGroup):
     """
@@ -768,6 +819,17 @@ def parse_misc_options(parser: _ArgumentGroup):
         ),
     )
 
+    # Add no preflight argument
+    parser.add_argument(
+        "--no-preflight",
+        action="store_const",
+        const=True,
+        help=(
+            "Skip the startup checks for ffmpeg and YouTube Music availability. "
+            "Problems are reported when the songs are downloaded."
+        ),
+    )
+
 
 def parse_other_options(parser: _ArgumentGroup):
     """
@@ -0,0 +1,148 @@
+"""
+Module for caching the results of environment probes (ffmpeg path and version,
+YouTube Music reachability...) between runs, so that short jobs don't pay
+for the same checks on every invocation.
+"""
+
+import json
+import logging
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from spotdl.utils.config import get_capabilities_path
+
+__all__ = [
+    "FFMPEG_TTL",
+    "YTMUSIC_TTL",
+    "YTMUSIC_BLOCKED_TTL",
+    "CapabilityCache",
+    "get_capabilities",
+]
+
+# Time to live of the cached probes, in seconds
+FFMPEG_TTL = 24 * 60 * 60
+YTMUSIC_TTL = 15 * 60
+YTMUSIC_BLOCKED_TTL = 60
+
+logger = logging.getLogger(__name__)
+
+
+class CapabilityCache:
+    """
+    Small key-value store with per entry expiry, persisted as json.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Initialize the cache.
+
+        ### Arguments
+        - path: Path to the json file, defaults to the capabilities file
+            in the spotdl directory.
+        """
+
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.loaded = False
+        self.lock = threading.Lock()
+
+    def load(self):
+        """
+        Load the entries from the cache file, ignoring a missing or broken file.
+        """
+
+        if self.path is None:
+            self.path = get_capabilities_path()
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as cache_file:
+                entries = json.load(cache_file)
+        except (OSError, ValueError):
+            entries = {}
+
+        self.entries = entries if isinstance(entries, dict) else {}
+        self.loaded = True
+
+    def save(self):
+        """
+        Save the entries to the cache file.
+        Failing to write the cache is not an error, the probes will just run again.
+        """
+
+        if self.path is None:
+            self.path = get_capabilities_path()
+
+        try:
+            with open(self.path, "w", encoding="utf-8") as cache_file:
+                json.dump(self.entries, cache_file)
+        except OSError as exception:
+            logger.debug("Could not save capabilities cache: %s", exception)
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Get a cached value.
+
+        ### Arguments
+        - key: The key of the value.
+
+        ### Returns
+        - The value, or None if it's missing or expired.
+        """
+
+        with self.lock:
+            if not self.loaded:
+                self.load()
+
+            entry = self.entries.get(key)
+
+        if not isinstance(entry, dict) or entry.get("expires", 0) < time.time():
+            return None
+
+        return entry.get("value")
+
+    def set(self, key: str, value: Any, ttl: float):
+        """
+        Cache a value and save the cache file.
+
+        ### Arguments
+        - key: The key of the value.
+        - value: The json serializable value.
+        - ttl: Number of seconds after which the value expires.
+        """
+
+        with self.lock:
+            if not self.loaded:
+                self.load()
+
+            self.entries[key] = {"value": value, "expires": time.time() + ttl}
+            self.save()
+
+    def delete(self, key: str):
+        """
+        Remove a value from the cache.
+
+        ### Arguments
+        - key: The key of the value.
+        """
+
+        with self.lock:
+            if not self.loaded:
+                self.load()
+
+            if self.entries.pop(key, None) is not None:
+                self.save()
+
+
+@lru_cache(maxsize=None)
+def get_capabilities() -> CapabilityCache:
+    """
+    Get the capability cache shared by the whole process.
+
+    ### Returns
+    - The capability cache.
+    """
+
+    return CapabilityCache()
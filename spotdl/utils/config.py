@@ -24,6 +24,8 @@
     "get_spotdl_path",
     "get_config_file",
     "get_cache_path",
+    "get_capabilities_path",
+    "get_meta_index_path",
     "get_temp_path",
     "get_errors_path",
     "get_web_ui_path",
@@ -117,6 +119,28 @@ def get_spotify_cache_path() -> Path:
     return get_spotdl_path() / ".spotify_cache"
 
 
+def get_capabilities_path() -> Path:
+    """
+    Get the path to the capabilities cache file.
+
+    ### Returns
+    - The path to the capabilities cache file.
+    """
+
+    return get_spotdl_path() / "capabilities.json"
+
+
+def get_meta_index_path() -> Path:
+    """
+    Get the path to the index of files processed by `spotdl meta`.
+
+    ### Returns
+    - The path to the meta index file.
+    """
+
+    return get_spotdl_path() / "meta_index.json"
+
+
 def get_temp_path() -> Path:
     """
     Get the path to the temp folder.
@@ -323,6 +347,7 @@ def get_parameter(cls, key):
     "playlist_numbering": False,
     "playlist_retain_track_cover": False,
     "scan_for_songs": False,
+    "library_dedup": None,
     "m3u": None,
     "output": "{artists} - {title}.{output-ext}",
     "overwrite": "skip",
@@ -332,6 +357,7 @@ def get_parameter(cls, key):
     "ffmpeg_args": None,
     "format": "mp3",
     "save_file": None,
+    "save_format": "json",
     "filter_results": True,
     "album_type": None,
     "threads": 4,
@@ -365,6 +391,10 @@ def get_parameter(cls, key):
     "create_skip_file": False,
     "respect_skip_file": False,
     "sync_remove_lrc": False,
+    "sync_dry_run": False,
+    "watch": False,
+    "watch_interval": 300,
+    "no_preflight": False,
 }
 
 WEB_OPTIONS: WebOptions = {
@@ -0,0 +1,335 @@
+"""
+Module for converting queued audio files with a fixed number
+of ffmpeg workers, batching the files that pile up.
+"""
+
+import os
+import subprocess
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+from pathlib import Path
+from queue import Empty, Queue
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from spotdl.utils.ffmpeg import (
+    STDERR_BUFFER_SIZE,
+    FFmpegError,
+    convert,
+    get_output_arguments,
+)
+
+__all__ = [
+    "ConversionJob",
+    "convert_batch",
+    "ConversionService",
+]
+
+
+@dataclass
+class ConversionJob:
+    """
+    A file waiting to be converted by the conversion service.
+    """
+
+    input_file: Path
+    output_file: Path
+    output_format: str
+    bitrate: Optional[str]
+    ffmpeg_args: Optional[str]
+    progress_handler: Optional[Callable[[int], None]]
+    duration: Optional[float]
+    stream_copy: bool
+    future: "Future[Tuple[bool, Optional[Dict[str, Any]]]]"
+
+
+def convert_batch(
+    jobs: List[ConversionJob], ffmpeg: str = "ffmpeg"
+) -> Tuple[bool, Optional[Dict[str, Any]]]:
+    """
+    Convert several files with a single ffmpeg process.
+    Each input is mapped to its own output, this saves the process
+    startup and initialization for every file but the first.
+
+    ### Arguments
+    - jobs: The conversion jobs.
+    - ffmpeg: ffmpeg executable to use.
+
+    ### Returns
+    - Tuple of conversion status and error dictionary.
+    """
+
+    arguments: List[str] = ["-nostdin", "-hide_banner", "-y"]
+    for job in jobs:
+        arguments.extend(["-i", str(job.input_file.resolve())])
+
+    for index, job in enumerate(jobs):
+        # By default every output gets the tags and chapters of the first input,
+        # keep the ones of its own input like `convert` does
+        arguments.extend(["-map", f"{index}:a:0"])
+        arguments.extend(["-map_metadata", str(index), "-map_chapters", str(index)])
+        arguments.extend(
+            get_output_arguments(
+                job.input_file.suffix[1:],
+                job.output_file,
+                job.output_format,
+                job.bitrate,
+                job.ffmpeg_args,
+                job.stream_copy,
+            )
+        )
+
+    with subprocess.Popen(
+        [ffmpeg, *arguments],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=False,
+    ) as process:
+        _, proc_err = process.communicate()
+
+    if process.returncode != 0:
+        message = (proc_err or b"").decode("utf-8", errors="replace")
+        return False, {
+            "return_code": process.returncode,
+            "arguments": arguments,
+            "ffmpeg": ffmpeg,
+            "error": "\n".join(message.splitlines()[-STDERR_BUFFER_SIZE:]),
+        }
+
+    return True, None
+
+
+class ConversionService:
+    """
+    Converts queued files with a fixed number of ffmpeg workers.
+    When files pile up, a worker converts up to `max_batch` of them
+    with a single ffmpeg process.
+    """
+
+    def __init__(
+        self,
+        ffmpeg: str = "ffmpeg",
+        workers: Optional[int] = None,
+        max_batch: int = 8,
+    ):
+        """
+        Initialize the conversion service.
+
+        ### Arguments
+        - ffmpeg: ffmpeg executable to use.
+        - workers: Number of ffmpeg processes running at the same time,
+            defaults to the number of cpus.
+        - max_batch: Maximum number of files converted by one ffmpeg process.
+        """
+
+        self.ffmpeg = ffmpeg
+        self.workers = workers or os.cpu_count() or 1
+        self.max_batch = max(1, max_batch)
+        self.queue: "Queue[Optional[ConversionJob]]" = Queue()
+        self.threads: List[threading.Thread] = []
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def submit(
+        self,
+        input_file: Path,
+        output_file: Path,
+        output_format: str = "mp3",
+        bitrate: Optional[str] = None,
+        ffmpeg_args: Optional[str] = None,
+        progress_handler: Optional[Callable[[int], None]] = None,
+        duration: Optional[float] = None,
+        stream_copy: bool = False,
+    ) -> "Future[Tuple[bool, Optional[Dict[str, Any]]]]":
+        """
+        Queue a file for conversion.
+
+        ### Arguments
+        - input_file: Path to input file.
+        - output_file: Path to output file.
+        - output_format: output format.
+        - bitrate: constant/variable bitrate.
+        - ffmpeg_args: ffmpeg arguments.
+        - progress_handler: progress handler, has to accept an integer as argument.
+        - duration: duration of the input in seconds, used for the progress.
+        - stream_copy: copy the audio stream instead of transcoding it.
+
+        ### Returns
+        - Future with the conversion status and error dictionary, see `convert`.
+        """
+
+        future: "Future[Tuple[bool, Optional[Dict[str, Any]]]]" = Future()
+        job = ConversionJob(
+            input_file,
+            output_file,
+            output_format,
+            bitrate,
+            ffmpeg_args,
+            progress_handler,
+            duration,
+            stream_copy,
+            future,
+        )
+
+        with self.lock:
+            if self.closed:
+                raise FFmpegError("Conversion service is closed")
+
+            # Workers are started on first use
+            if not self.threads:
+                for _ in range(self.workers):
+                    thread = threading.Thread(target=self.work, daemon=True)
+                    thread.start()
+                    self.threads.append(thread)
+
+            self.queue.put(job)
+
+        return future
+
+    def next_jobs(self) -> List[ConversionJob]:
+        """
+        Wait for a job, and take the jobs that can be batched with it.
+
+        ### Returns
+        - List of jobs, empty if the service is closing.
+        """
+
+        job = self.queue.get()
+        if job is None:
+            # Put the sentinel back for the other workers
+            self.queue.put(None)
+            return []
+
+        jobs = [job]
+        while len(jobs) < self.max_batch:
+            try:
+                job = self.queue.get_nowait()
+            except Empty:
+                break
+
+            # The service is closing, leave the sentinel for the other workers
+            if job is None:
+                self.queue.put(None)
+                break
+
+            jobs.append(job)
+
+        return jobs
+
+    def work(self):
+        """
+        Worker loop, converts jobs until the service is closed.
+        """
+
+        while True:
+            jobs = self.next_jobs()
+            if not jobs:
+                return
+
+            # Custom ffmpeg arguments might not apply to a single output
+            single_jobs = [job for job in jobs if job.ffmpeg_args]
+            batch_jobs = [job for job in jobs if not job.ffmpeg_args]
+
+            if len(batch_jobs) > 1:
+                self.run_batch(batch_jobs)
+            else:
+                single_jobs.extend(batch_jobs)
+
+            for job in single_jobs:
+                self.run_single(job)
+
+    def run_single(self, job: ConversionJob):
+        """
+        Convert a single file, with progress.
+
+        ### Arguments
+        - job: The conversion job.
+        """
+
+        if not job.future.set_running_or_notify_cancel():
+            return
+
+        try:
+            result = convert(
+                input_file=job.input_file,
+                output_file=job.output_file,
+                ffmpeg=self.ffmpeg,
+                output_format=job.output_format,
+                bitrate=job.bitrate,
+                ffmpeg_args=job.ffmpeg_args,
+                progress_handler=job.progress_handler,
+                duration=job.duration,
+                stream_copy=job.stream_copy,
+            )
+        except Exception as exception:  # pylint: disable=W0718
+            job.future.set_exception(exception)
+        else:
+            job.future.set_result(result)
+
+    def run_batch(self, jobs: List[ConversionJob]):
+        """
+        Convert several files with one ffmpeg process. If the process fails,
+        the files are converted one by one, so that every file gets its own error.
+
+        ### Arguments
+        - jobs: The conversion jobs.
+        """
+
+        jobs = [job for job in jobs if job.future.set_running_or_notify_cancel()]
+        if not jobs:
+            return
+
+        for job in jobs:
+            if job.progress_handler:
+                job.progress_handler(0)
+
+        try:
+            success, _ = convert_batch(jobs, self.ffmpeg)
+        except Exception:  # pylint: disable=W0718
+            success = False
+
+        for job in jobs:
+            if not success:
+                # The future is already running, convert directly
+                try:
+                    job.future.set_result(
+                        convert(
+                            input_file=job.input_file,
+                            output_file=job.output_file,
+                            ffmpeg=self.ffmpeg,
+                            output_format=job.output_format,
+                            bitrate=job.bitrate,
+                            progress_handler=job.progress_handler,
+                            duration=job.duration,
+                            stream_copy=job.stream_copy,
+                        )
+                    )
+                except Exception as exception:  # pylint: disable=W0718
+                    job.future.set_exception(exception)
+
+                continue
+
+            if job.progress_handler:
+                job.progress_handler(100)
+
+            job.future.set_result((True, None))
+
+    def close(self, wait: bool = True):
+        """
+        Stop the workers once the queued files are converted.
+
+        ### Arguments
+        - wait: Whether to wait for the workers to finish.
+        """
+
+        with self.lock:
+            if self.closed:
+                return
+
+            self.closed = True
+            self.queue.put(None)
+
+        if wait:
+            for thread in self.threads:
+                thread.join()
@@ -2,24 +2,40 @@
 Module for functions related to downloading songs.
 """
 
-from spotdl.providers.audio import YouTubeMusic
+from spotdl.providers import AUDIO_PROVIDERS
+from spotdl.utils.capabilities import YTMUSIC_BLOCKED_TTL, YTMUSIC_TTL, get_capabilities
 
 __all__ = ["check_ytmusic_connection"]
 
 
-def check_ytmusic_connection() -> bool:
+def check_ytmusic_connection(use_cache: bool = True) -> bool:
     """
-    Check if we can connect to YouTube Music API
+    Check if we can connect to YouTube Music API.
+    The result is cached for a few minutes, failures for a shorter time.
+
+    ### Arguments
+    - use_cache: Whether to use the cached result.
 
     ### Returns
     - `True` if we can connect to YouTube Music API
     - `False` if we can't connect to YouTube Music API
     """
 
+    capabilities = get_capabilities()
+    if use_cache:
+        reachable = capabilities.get("ytmusic-reachable")
+        if reachable is not None:
+            return reachable
+
     # Check if we are getting results from YouTube Music
-    ytm = YouTubeMusic()
+    ytm = AUDIO_PROVIDERS["youtube-music"]()
     test_results = ytm.get_results("a")
-    if len(test_results) == 0:
-        return False
+    reachable = len(test_results) != 0
+
+    capabilities.set(
+        "ytmusic-reachable",
+        reachable,
+        YTMUSIC_TTL if reachable else YTMUSIC_BLOCKED_TTL,
+    )
 
-    return True
+    return reachable
@@ -10,11 +10,16 @@
 import shutil
 import stat
 import subprocess
+import threading
+from collections import deque
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from typing import IO, Any, Callable, Deque, Dict, List, Optional, Tuple, Union
 
 import requests
+from mutagen import File as MutagenFile
+from mutagen import MutagenError
 
+from spotdl.utils.capabilities import FFMPEG_TTL, get_capabilities
 from spotdl.utils.config import get_spotdl_path
 from spotdl.utils.formatter import to_ms
 
@@ -25,12 +30,22 @@
     "TIME_REGEX",
     "VERSION_REGEX",
     "YEAR_REGEX",
+    "STDERR_BUFFER_SIZE",
+    "FORMAT_CODECS",
+    "MUTAGEN_CODECS",
     "FFmpegError",
     "is_ffmpeg_installed",
     "get_ffmpeg_path",
     "get_ffmpeg_version",
+    "get_binary_signature",
+    "find_ffmpeg",
+    "get_cached_ffmpeg_version",
     "get_local_ffmpeg",
     "download_ffmpeg",
+    "probe_audio",
+    "normalize_codec",
+    "can_copy_stream",
+    "get_output_arguments",
     "convert",
 ]
 
@@ -69,6 +84,28 @@
 VERSION_REGEX = re.compile(r"ffmpeg version \w?(\d+\.)?(\d+)")
 YEAR_REGEX = re.compile(r"Copyright \(c\) \d\d\d\d\-\d\d\d\d")
 
+# Number of stderr lines kept for error reports
+STDERR_BUFFER_SIZE = 100
+
+# Codecs that each output format can hold without re-encoding
+FORMAT_CODECS = {
+    "mp3": ["mp3"],
+    "flac": ["flac"],
+    "ogg": ["vorbis"],
+    "opus": ["opus"],
+    "m4a": ["aac"],
+    "wav": ["pcm_s16le"],
+}
+
+# Codecs of the file types that mutagen reads
+MUTAGEN_CODECS = {
+    "MP3": "mp3",
+    "FLAC": "flac",
+    "OggVorbis": "vorbis",
+    "OggOpus": "opus",
+    "WAVE": "pcm_s16le",
+}
+
 
 class FFmpegError(Exception):
     """
@@ -182,6 +219,100 @@ def get_ffmpeg_version(ffmpeg: str = "ffmpeg") -> Tuple[Optional[float], Optiona
     return (version, build_year)
 
 
+def get_binary_signature(path: Path) -> Optional[List[float]]:
+    """
+    Get a cheap signature of a binary, used to notice that it was replaced.
+
+    ### Arguments
+    - path: Path to the binary.
+
+    ### Returns
+    - List with the modification time and size of the binary, None if it doesn't exist.
+    """
+
+    try:
+        stat_result = path.stat()
+    except OSError:
+        return None
+
+    return [stat_result.st_mtime, stat_result.st_size]
+
+
+def find_ffmpeg(ffmpeg: str = "ffmpeg", use_cache: bool = True) -> Optional[Path]:
+    """
+    Find the ffmpeg executable, remembering the result in the capability cache.
+    A cached path is reused as long as the binary wasn't changed.
+
+    ### Arguments
+    - ffmpeg: ffmpeg executable to look for, `ffmpeg` looks in PATH
+        and then in the spotdl directory.
+    - use_cache: Whether to use the cached result.
+
+    ### Returns
+    - Path to the ffmpeg executable or None if it's not installed.
+    """
+
+    capabilities = get_capabilities()
+    key = f"ffmpeg-path:{ffmpeg}"
+
+    if use_cache:
+        cached = capabilities.get(key)
+        if cached is not None:
+            cached_path = Path(cached["path"])
+            if get_binary_signature(cached_path) == cached["signature"]:
+                return cached_path
+
+    if ffmpeg == "ffmpeg":
+        ffmpeg_path = get_ffmpeg_path()
+    else:
+        ffmpeg_path = Path(ffmpeg)
+
+    if ffmpeg_path is None or not is_ffmpeg_installed(str(ffmpeg_path)):
+        return None
+
+    ffmpeg_path = ffmpeg_path.absolute()
+    capabilities.set(
+        key,
+        {"path": str(ffmpeg_path), "signature": get_binary_signature(ffmpeg_path)},
+        FFMPEG_TTL,
+    )
+
+    return ffmpeg_path
+
+
+def get_cached_ffmpeg_version(
+    ffmpeg: str = "ffmpeg",
+) -> Tuple[Optional[float], Optional[int]]:
+    """
+    Get ffmpeg version, remembering the result in the capability cache.
+
+    ### Arguments
+    - ffmpeg: ffmpeg executable to check
+
+    ### Returns
+    - Tuple of optional version and optional year.
+
+    ### Errors
+    - FFmpegError if ffmpeg is not installed.
+    """
+
+    capabilities = get_capabilities()
+    key = f"ffmpeg-version:{ffmpeg}"
+    signature = get_binary_signature(Path(shutil.which(ffmpeg) or ffmpeg))
+
+    cached = capabilities.get(key)
+    if cached is not None and cached["signature"] == signature:
+        return cached["version"][0], cached["version"][1]
+
+    version = get_ffmpeg_version(ffmpeg)
+    if signature is not None:
+        capabilities.set(
+            key, {"version": list(version), "signature": signature}, FFMPEG_TTL
+        )
+
+    return version
+
+
 def get_local_ffmpeg() -> Optional[Path]:
     """
     Get local ffmpeg binary path.
@@ -248,61 +379,168 @@ def download_ffmpeg() -> Path:
     return ffmpeg_path
 
 
-def convert(
-    input_file: Union[Path, Tuple[str, str]],
+def normalize_codec(codec: Optional[str]) -> Optional[str]:
+    """
+    Normalize a codec name reported by yt-dlp, mutagen or ffmpeg.
+
+    ### Arguments
+    - codec: The codec name, e.g. `mp4a.40.2` or `Opus`.
+
+    ### Returns
+    - The ffmpeg name of the codec, e.g. `aac` or `opus`, None if unknown.
+    """
+
+    if not codec or codec == "none":
+        return None
+
+    codec = codec.lower()
+    if codec.startswith("mp4a") or codec.startswith("aac"):
+        return "aac"
+
+    return codec
+
+
+def probe_audio(
+    input_file: Path, download_info: Optional[Dict[str, Any]] = None
+) -> Tuple[Optional[str], Optional[int]]:
+    """
+    Get the codec and bitrate of an audio file. The file headers are read
+    with mutagen, containers that mutagen can't read (e.g. webm) fall back
+    to the info reported by yt-dlp.
+
+    ### Arguments
+    - input_file: Path to the audio file.
+    - download_info: yt-dlp info dictionary of the download.
+
+    ### Returns
+    - Tuple of the codec and the bitrate in kbps, both None if unknown.
+    """
+
+    codec = None
+    bitrate = None
+
+    try:
+        audio_file = MutagenFile(input_file)
+    except (MutagenError, OSError):
+        audio_file = None
+
+    if audio_file is not None:
+        codec = getattr(audio_file.info, "codec", None) or MUTAGEN_CODECS.get(
+            type(audio_file).__name__
+        )
+
+        # Only 16 bit wav files can be copied as is
+        if codec == "pcm_s16le" and audio_file.info.bits_per_sample != 16:
+            codec = None
+
+        info_bitrate = getattr(audio_file.info, "bitrate", 0)
+        bitrate = round(info_bitrate / 1000) if info_bitrate else None
+
+    if codec is None and download_info:
+        codec = download_info.get("acodec")
+
+    if bitrate is None and download_info and download_info.get("abr"):
+        bitrate = round(float(download_info["abr"]))
+
+    return normalize_codec(codec), bitrate
+
+
+def can_copy_stream(
+    codec: Optional[str],
+    source_bitrate: Optional[int],
+    output_format: str,
+    bitrate: Optional[str] = None,
+    ffmpeg_args: Optional[str] = None,
+) -> bool:
+    """
+    Check if the audio stream can be copied to the output format instead
+    of being transcoded, without losing quality compared to a transcode.
+
+    ### Arguments
+    - codec: The codec of the source.
+    - source_bitrate: The bitrate of the source in kbps.
+    - output_format: The output format.
+    - bitrate: The requested bitrate, `auto`, `disable` or None.
+    - ffmpeg_args: Extra ffmpeg arguments, they might need a transcode.
+
+    ### Returns
+    - True if the audio stream can be copied.
+    """
+
+    if ffmpeg_args or codec not in FORMAT_CODECS.get(output_format, []):
+        return False
+
+    if bitrate is None or bitrate in ["auto", "disable"]:
+        return True
+
+    # Variable bitrate quality levels can't be compared with the source
+    if bitrate.isdigit() or source_bitrate is None:
+        return False
+
+    try:
+        requested_bitrate = int(bitrate.lower().rstrip("k"))
+    except ValueError:
+        return False
+
+    # Re-encoding at a higher bitrate doesn't make the audio better
+    return source_bitrate <= requested_bitrate
+
+
+def read_stderr(
+    stream: IO[bytes], buffer: Deque[str], info: Dict[str, Optional[int]]
+) -> None:
+    """
+    Read ffmpeg's stderr into a bounded buffer, used for error reports.
+    The input duration is taken from the stream info if found.
+
+    ### Arguments
+    - stream: stderr of the ffmpeg process.
+    - buffer: ring buffer that holds the last lines.
+    - info: dictionary where the duration (in ms) is stored.
+    """
+
+    for raw_line in iter(stream.readline, b""):
+        line = raw_line.decode("utf-8", errors="replace").strip()
+        buffer.append(line)
+
+        if info.get("duration") is None:
+            duration_match = DUR_REGEX.search(line)
+            if duration_match:
+                info["duration"] = to_ms(**duration_match.groupdict())  # type: ignore
+
+
+def get_output_arguments(
+    file_format: str,
     output_file: Path,
-    ffmpeg: str = "ffmpeg",
     output_format: str = "mp3",
     bitrate: Optional[str] = None,
     ffmpeg_args: Optional[str] = None,
-    progress_handler: Optional[Callable[[int], None]] = None,
-) -> Tuple[bool, Optional[Dict[str, Any]]]:
+    stream_copy: bool = False,
+) -> List[str]:
     """
-    Convert the input file to the output file synchronously with progress handler.
+    Get the ffmpeg arguments for one output file.
 
     ### Arguments
-    - input_file: Path to input file or tuple of (url, file_format).
+    - file_format: format of the input file.
     - output_file: Path to output file.
-    - ffmpeg: ffmpeg executable to use.
     - output_format: output format.
     - bitrate: constant/variable bitrate.
     - ffmpeg_args: ffmpeg arguments.
-    - progress_handler: progress handler, has to accept an integer as argument.
+    - stream_copy: copy the audio stream instead of transcoding it.
 
     ### Returns
-    - Tuple of conversion status and error dictionary.
-
-    ### Notes
-    - Make sure to check if ffmpeg is installed before calling this function.
+    - List of arguments, ending with the output file.
     """
 
-    # Initialize ffmpeg command
-    # -i is the input file
-    arguments: List[str] = [
-        "-nostdin",
-        "-y",
-        "-i",
-        str(input_file.resolve()) if isinstance(input_file, Path) else input_file[0],
-        "-movflags",
-        "+faststart",
-        "-v",
-        "debug",
-        "-progress",
-        "-",
-        "-nostats",
-    ]
-
-    file_format = (
-        str(input_file.suffix).split(".")[1]
-        if isinstance(input_file, Path)
-        else input_file[1]
-    )
+    arguments: List[str] = ["-movflags", "+faststart"]
 
     # Add output format to command
     # -c:a is used if the file is not an matroska container
     # and we want to convert to opus
     # otherwise we use arguments from FFMPEG_FORMATS
-    if output_format == "opus" and file_format != "webm":
+    if stream_copy:
+        arguments.extend(["-vn", "-c:a", "copy"])
+    elif output_format == "opus" and file_format != "webm":
         arguments.extend(["-c:a", "libopus"])
     else:
         if (
@@ -316,7 +554,7 @@ def convert(
             arguments.extend(FFMPEG_FORMATS[output_format])
 
     # Add bitrate if specified
-    if bitrate:
+    if bitrate and not stream_copy:
         # Check if bitrate is an integer
         # if it is then use it as variable bitrate
         if bitrate.isdigit():
@@ -331,24 +569,90 @@ def convert(
     # Add output file at the end
     arguments.append(str(output_file.resolve()))
 
+    return arguments
+
+
+def convert(
+    input_file: Union[Path, Tuple[str, str]],
+    output_file: Path,
+    ffmpeg: str = "ffmpeg",
+    output_format: str = "mp3",
+    bitrate: Optional[str] = None,
+    ffmpeg_args: Optional[str] = None,
+    progress_handler: Optional[Callable[[int], None]] = None,
+    duration: Optional[float] = None,
+    stream_copy: bool = False,
+) -> Tuple[bool, Optional[Dict[str, Any]]]:
+    """
+    Convert the input file to the output file synchronously with progress handler.
+
+    ### Arguments
+    - input_file: Path to input file or tuple of (url, file_format).
+    - output_file: Path to output file.
+    - ffmpeg: ffmpeg executable to use.
+    - output_format: output format.
+    - bitrate: constant/variable bitrate.
+    - ffmpeg_args: ffmpeg arguments.
+    - progress_handler: progress handler, has to accept an integer as argument.
+    - duration: duration of the input in seconds, used for the progress.
+        If not provided, the duration is read from ffmpeg's output.
+    - stream_copy: copy the audio stream to the output container instead
+        of transcoding it, see `can_copy_stream`.
+
+    ### Returns
+    - Tuple of conversion status and error dictionary.
+
+    ### Notes
+    - Make sure to check if ffmpeg is installed before calling this function.
+    - Progress is read from the `-progress` stream on stdout, only the last
+        `STDERR_BUFFER_SIZE` lines of stderr are kept for the error report.
+    """
+
+    # Initialize ffmpeg command
+    # -i is the input file
+    arguments: List[str] = [
+        "-nostdin",
+        "-hide_banner",
+        "-y",
+        "-i",
+        str(input_file.resolve()) if isinstance(input_file, Path) else input_file[0],
+    ]
+
+    # Machine readable progress is written to stdout
+    if progress_handler:
+        arguments.extend(["-progress", "pipe:1", "-nostats"])
+
+    file_format = (
+        str(input_file.suffix).split(".")[1]
+        if isinstance(input_file, Path)
+        else input_file[1]
+    )
+
+    arguments.extend(
+        get_output_arguments(
+            file_format, output_file, output_format, bitrate, ffmpeg_args, stream_copy
+        )
+    )
+
     # Run ffmpeg
     with subprocess.Popen(
         [ffmpeg, *arguments],
         stdin=subprocess.PIPE,
         stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
+        stderr=subprocess.PIPE,
         universal_newlines=False,
     ) as process:
         if not progress_handler:
             # Wait for process to finish
-            proc_out = process.communicate()
+            _, proc_err = process.communicate()
 
             if process.returncode != 0:
                 # get version and build year
-                version = get_ffmpeg_version(ffmpeg)
+                version = get_cached_ffmpeg_version(ffmpeg)
 
-                # join stdout and stderr and decode to utf-8
-                message = b"".join([out for out in proc_out if out]).decode("utf-8")
+                # keep only the end of stderr
+                message = (proc_err or b"").decode("utf-8", errors="replace")
+                message = "\n".join(message.splitlines()[-STDERR_BUFFER_SIZE:])
 
                 # return error dictionary
                 return False, {
@@ -364,34 +668,40 @@ def convert(
 
         progress_handler(0)
 
-        out_buffer = []
-        total_dur = None
-        while True:
-            if process.stdout is None:
-                continue
-
-            out_line = (
-                process.stdout.readline().decode("utf-8", errors="replace").strip()
-            )
+        # Read stderr on a separate thread, so that neither pipe fills up
+        err_buffer: Deque[str] = deque(maxlen=STDERR_BUFFER_SIZE)
+        info: Dict[str, Optional[int]] = {
+            "duration": int(duration * 1000) if duration else None
+        }
+        err_reader = threading.Thread(
+            target=read_stderr, args=(process.stderr, err_buffer, info), daemon=True
+        )
+        err_reader.start()
 
-            if out_line == "" and process.poll() is not None:
-                break
+        last_progress = 0
+        for raw_line in iter(process.stdout.readline, b""):  # type: ignore
+            key, _, value = raw_line.decode("utf-8", errors="replace").partition("=")
 
-            out_buffer.append(out_line.strip())
+            # out_time_ms is in microseconds as well, it's kept for older versions
+            if key not in ("out_time_us", "out_time_ms") or not info["duration"]:
+                continue
 
-            total_dur_match = DUR_REGEX.search(out_line)
-            if total_dur is None and total_dur_match:
-                total_dur = to_ms(**total_dur_match.groupdict())  # type: ignore
+            try:
+                elapsed_time = int(value) / 1000
+            except ValueError:
                 continue
-            if total_dur:
-                progress_time = TIME_REGEX.search(out_line)
-                if progress_time:
-                    elapsed_time = to_ms(**progress_time.groupdict())  # type: ignore
-                    progress_handler(int(elapsed_time / total_dur * 100))  # type: ignore
+
+            progress = min(int(elapsed_time / info["duration"] * 100), 100)
+            if progress > last_progress:
+                last_progress = progress
+                progress_handler(progress)
+
+        process.wait()
+        err_reader.join()
 
         if process.returncode != 0:
             # get version and build year
-            version = get_ffmpeg_version(ffmpeg)
+            version = get_cached_ffmpeg_version(ffmpeg)
 
             return False, {
                 "return_code": process.returncode,
@@ -399,9 +709,10 @@ def convert(
                 "ffmpeg": ffmpeg,
                 "version": version[0],
                 "build_year": version[1],
-                "error": "\n".join(out_buffer),
+                "error": "\n".join(err_buffer),
             }
 
-        progress_handler(100)
+        if last_progress < 100:
+            progress_handler(100)
 
         return True, None
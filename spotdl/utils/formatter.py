@@ -4,19 +4,16 @@
 and file names.
 """
 
-import copy
+import dataclasses
 import logging
 import re
 from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from unicodedata import normalize
 
-import pykakasi
 from rapidfuzz import fuzz
 from slugify import slugify as py_slugify
-from yt_dlp import parse_options
-from yt_dlp.utils import sanitize_filename
 
 from spotdl.types.song import Song
 
@@ -26,9 +23,12 @@
     "DISALLOWED_REGEX",
     "create_song_title",
     "sanitize_string",
+    "get_kakasi",
     "slugify",
     "format_query",
     "create_search_query",
+    "OutputTemplate",
+    "compile_template",
     "create_file_name",
     "parse_duration",
     "to_ms",
@@ -62,7 +62,6 @@
     "{output-ext}",
 ]
 
-KKS = pykakasi.kakasi()
 
 JAP_REGEX = re.compile(
     "[\u3000-\u303f\u3040-\u309f\u30a0-\u30ff\uff00-\uff9f\u4e00-\u9faf\u3400-\u4dbf]"
@@ -70,6 +69,55 @@
 
 DISALLOWED_REGEX = re.compile(r"[^-a-zA-Z0-9\!\@\$]+")
 
+# this is windows specific (disallowed chars), double quotes (") and
+# semi-colons (:) are also disallowed but we would like to retain their equivalents
+SANITIZE_TABLE = str.maketrans({**dict.fromkeys("/?\\*|<>"), '"': "'", ":": "-"})
+UNSAFE_REGEX = re.compile(r'[/?\\*|<>":]')
+
+PATH_PART_REGEX = re.compile(r"[^\.*](.*)[^\.*$]")
+
+TEMPLATE_REGEX = re.compile("(" + "|".join(re.escape(var) for var in VARS) + ")")
+
+# Maximum number of file names kept by the output templates
+RENDER_CACHE_SIZE = 2**17
+
+# Values of the template variables, without sanitization
+TEMPLATE_VALUES: Dict[str, Callable[[Song], Any]] = {
+    "{title}": lambda song: song.name,
+    "{artists}": lambda song: ", ".join(song.artists),
+    "{artist}": lambda song: song.artists[0],
+    "{album}": lambda song: song.album_name,
+    "{album-artist}": lambda song: song.album_artist,
+    "{genre}": lambda song: song.genres[0] if song.genres else "",
+    "{disc-number}": lambda song: song.disc_number,
+    "{disc-count}": lambda song: song.disc_count,
+    "{duration}": lambda song: song.duration,
+    "{year}": lambda song: song.year,
+    "{original-date}": lambda song: song.date,
+    "{track-number}": lambda song: (
+        f"{int(song.track_number):02d}" if song.track_number else ""
+    ),
+    "{tracks-count}": lambda song: song.tracks_count,
+    "{isrc}": lambda song: song.isrc,
+    "{track-id}": lambda song: song.song_id,
+    "{publisher}": lambda song: song.publisher,
+    "{list-length}": lambda song: song.list_length,
+    "{list-position}": lambda song: str(song.list_position).zfill(
+        len(str(song.list_length))
+    ),
+    "{list-name}": lambda song: song.list_name,
+}
+
+# Value of {artists} in the short version of the template
+SHORT_ARTISTS: Callable[[Song], Any] = lambda song: song.artists[0]
+
+# Template variables removed from the template when the song has no value
+LIST_VARS = {
+    "{list-length}": "list_length",
+    "{list-position}": "list_position",
+    "{list-name}": "list_name",
+}
+
 logger = logging.getLogger(__name__)
 
 
@@ -107,16 +155,27 @@ def sanitize_string(string: str) -> str:
     - the sanitized string
     """
 
-    output = string
+    # Most strings have nothing to replace, and searching is faster than translating
+    if UNSAFE_REGEX.search(string) is None:
+        return string
+
+    return string.translate(SANITIZE_TABLE)
+
+
+@lru_cache(maxsize=None)
+def get_kakasi():
+    """
+    Get the shared pykakasi converter.
+    It's created on first use, because building it is slow
+    and only needed for strings with japanese characters.
 
-    # this is windows specific (disallowed chars)
-    output = "".join(char for char in output if char not in "/?\\*|<>")
+    ### Returns
+    - the pykakasi converter
+    """
 
-    # double quotes (") and semi-colons (:) are also disallowed characters but we would
-    # like to retain their equivalents, so they aren't removed in the prior loop
-    output = output.replace('"', "'").replace(":", "-")
+    import pykakasi  # pylint: disable=import-outside-toplevel
 
-    return output
+    return pykakasi.kakasi()
 
 
 @lru_cache()
@@ -145,7 +204,7 @@ def slugify(string: str) -> str:
         regex_pattern=JAP_REGEX.pattern,
     )
 
-    results = KKS.convert(normal_slug)
+    results = get_kakasi().convert(normal_slug)
 
     result = ""
     for index, item in enumerate(results):
@@ -291,30 +350,148 @@ def create_search_query(
     return format_query(song, template, santitize, file_extension, short=short)
 
 
-def create_file_name(
-    song: Song,
-    template: str,
-    file_extension: str,
-    restrict: Optional[str] = None,
-    short: bool = False,
-    file_name_length: Optional[int] = None,
-) -> Path:
+class OutputTemplate:
     """
-    Create the file name for the song, by replacing template variables with the actual values.
+    An output template parsed once into literal parts and variables,
+    to render the file names of many songs.
+    Rendered file names are cached by the values of the variables.
+    """
+
+    def __init__(self, template: str, source: Optional[str] = None):
+        """
+        Parse the template.
+
+        ### Arguments
+        - template: the complete template, ending with `.{output-ext}`
+        - source: the template this one was reduced from, if any
+        """
+
+        self.template = template
+        self.source = source or template
+
+        # Literal parts at even indexes, variables at odd indexes
+        self.parts: List[str] = TEMPLATE_REGEX.split(template)
+        self.variables: List[str] = self.parts[1::2]
+        self.list_vars = [var for var in LIST_VARS if var in self.variables]
+        self.cache: Dict[Tuple, Path] = {}
+
+        # The value of {output-ext} is the file extension, without a getter
+        self.getters = [TEMPLATE_VALUES.get(var) for var in self.variables]
+        self.short_getters = [
+            SHORT_ARTISTS if var == "{artists}" else getter
+            for var, getter in zip(self.variables, self.getters)
+        ]
+
+    def render(
+        self,
+        song: Song,
+        file_extension: str,
+        restrict: Optional[str] = None,
+        short: bool = False,
+        file_name_length: Optional[int] = None,
+    ) -> Path:
+        """
+        Render the file name of a song.
+
+        ### Arguments
+        - song: the song object
+        - file_extension: the file extension to use
+        - restrict: sanitization to apply to the filename
+        - short: whether to use the short version of the template
+        - file_name_length: the maximum length of the file name
+
+        ### Returns
+        - the file name as a Path object
+        """
+
+        missing_vars = tuple(
+            var for var in self.list_vars if getattr(song, LIST_VARS[var]) is None
+        )
+        if missing_vars:
+            for var in missing_vars:
+                logger.warning(
+                    "Template contains %s, but it's value is None. "
+                    "Replacing with empty string.",
+                    var,
+                )
+
+            return get_reduced_template(self.template, missing_vars).render(
+                song, file_extension, restrict, short, file_name_length
+            )
+
+        values = tuple(
+            file_extension if getter is None else getter(song)
+            for getter in (self.short_getters if short else self.getters)
+        )
+
+        key = (values, restrict, short, file_name_length)
+        file = self.cache.get(key)
+        if file is not None:
+            return file
+
+        rendered = list(self.parts)
+        rendered[1::2] = [
+            "None" if value is None else sanitize_string(str(value)) for value in values
+        ]
+        file = create_path_object("".join(rendered))
+
+        length_limit = file_name_length or 255
+        if len(file.name) >= length_limit:
+            # Long file names depend on more than the template variables
+            return shorten_file_name(
+                song, self.source, file_extension, restrict, short, length_limit
+            )
+
+        # Restrict the filename if needed
+        if restrict and restrict != "none":
+            file = restrict_filename(file, restrict == "strict")
+
+        if len(self.cache) >= RENDER_CACHE_SIZE:
+            self.cache.clear()
+
+        self.cache[key] = file
+
+        return file
+
+
+@lru_cache(maxsize=None)
+def get_reduced_template(
+    template: str, missing_vars: Tuple[str, ...]
+) -> OutputTemplate:
+    """
+    Get the template without the list variables the song has no value for.
 
     ### Arguments
-    - song: the song object
-    - template: the template string
-    - file_extension: the file extension to use
-    - restrict: sanitization to apply to the filename
-    - short: whether to use the short version of the template
-    - file_name_length: the maximum length of the file name
+    - template: the complete template
+    - missing_vars: the variables to remove
 
     ### Returns
-    - the formatted string as a Path object
+    - the parsed template
+    """
+
+    reduced = template
+    for var in missing_vars:
+        reduced = reduced.replace(var, "").replace(r"//", r"/")
+
+    # If template has only {output-ext}, fix it
+    if reduced in ["/.{output-ext}", ".{output-ext}"]:
+        reduced = "{artists} - {title}.{output-ext}"
+
+    return OutputTemplate(reduced, template)
+
+
+@lru_cache(maxsize=None)
+def compile_template(template: str) -> OutputTemplate:
     """
+    Parse an output template, completing it with the default file name
+    and extension like `create_file_name` does.
 
-    temp_song = copy.deepcopy(song)
+    ### Arguments
+    - template: the template string
+
+    ### Returns
+    - the parsed template
+    """
 
     # If template does not contain any of the keys,
     # append {artists} - {title}.{output-ext} to it
@@ -333,25 +510,64 @@ def create_file_name(
     if not template.endswith(".{output-ext}"):
         template += ".{output-ext}"
 
-    formatted_string = format_query(
-        song=song,
-        template=template,
-        santitize=True,
-        file_extension=file_extension,
-        short=short,
+    # If template has only {output-ext}, fix it
+    if template in ["/.{output-ext}", ".{output-ext}"]:
+        template = "{artists} - {title}.{output-ext}"
+
+    return OutputTemplate(template)
+
+
+def create_file_name(
+    song: Song,
+    template: str,
+    file_extension: str,
+    restrict: Optional[str] = None,
+    short: bool = False,
+    file_name_length: Optional[int] = None,
+) -> Path:
+    """
+    Create the file name for the song, by replacing template variables with the actual values.
+
+    ### Arguments
+    - song: the song object
+    - template: the template string
+    - file_extension: the file extension to use
+    - restrict: sanitization to apply to the filename
+    - short: whether to use the short version of the template
+    - file_name_length: the maximum length of the file name
+
+    ### Returns
+    - the formatted string as a Path object
+    """
+
+    return compile_template(template).render(
+        song, file_extension, restrict, short, file_name_length
     )
 
-    file = create_path_object(formatted_string)
 
-    length_limit = file_name_length or 255
+def shorten_file_name(
+    song: Song,
+    template: str,
+    file_extension: str,
+    restrict: Optional[str],
+    short: bool,
+    length_limit: int,
+) -> Path:
+    """
+    Create the file name of a song whose file name is too long,
+    using the short template and shortening the artist and title if needed.
 
-    # Check if the file name length is greater than the limit
-    if len(file.name) < length_limit:
-        # Restrict the filename if needed
-        if restrict and restrict != "none":
-            return restrict_filename(file, restrict == "strict")
+    ### Arguments
+    - song: the song object
+    - template: the complete template
+    - file_extension: the file extension to use
+    - restrict: sanitization to apply to the filename
+    - short: whether the short version of the template was used
+    - length_limit: the maximum length of the file name
 
-        return file
+    ### Returns
+    - the file name as a Path object
+    """
 
     if short is False:
         return create_file_name(
@@ -368,6 +584,7 @@ def create_file_name(
 
     # Path template is already short, but we still can't create a file
     # so we reduce it even further
+    temp_song = dataclasses.replace(song)
     is_long_artist = len(temp_song.artist) > half_length
     is_long_title = len(temp_song.name) > half_length
 
@@ -514,6 +731,9 @@ def restrict_filename(pathobj: Path, strict: bool = True) -> Path:
     - Based on the `sanitize_filename` function from yt-dlp
     """
     if strict:
+        # pylint: disable=import-outside-toplevel
+        from yt_dlp.utils import sanitize_filename
+
         result = sanitize_filename(pathobj.name, True, False)  # type: ignore
         result = result.replace("_-_", "-")
     else:
@@ -594,18 +814,33 @@ def create_path_object(string: str) -> Path:
     # Parse template as Path object
     file = Path(string)
 
-    santitized_parts = []
-    for part in file.parts:
-        match = re.search(r"[^\.*](.*)[^\.*$]", part)
-        if match and part != ".spotdl":
-            santitized_parts.append(match.group(0))
-        else:
-            santitized_parts.append(part)
+    santitized_parts = tuple(map(sanitize_path_part, file.parts))
+    if santitized_parts == file.parts:
+        return file
 
     # Join the parts of the path
     return Path(*santitized_parts)
 
 
+@lru_cache(maxsize=2**14)
+def sanitize_path_part(part: str) -> str:
+    """
+    Remove the dots and asterisks around a part of a path.
+
+    ### Arguments
+    - part: the part of the path
+
+    ### Returns
+    - the sanitized part
+    """
+
+    match = PATH_PART_REGEX.search(part)
+    if match and part != ".spotdl":
+        return match.group(0)
+
+    return part
+
+
 def args_to_ytdlp_options(
     argument_list: List[str], defaults: Optional[Dict[str, Any]] = None
 ) -> Dict[str, Any]:
@@ -620,6 +855,9 @@ def args_to_ytdlp_options(
     - the dictionary of options
     """
 
+    # yt-dlp is heavy to import, load it only when it's needed
+    from yt_dlp import parse_options  # pylint: disable=import-outside-toplevel
+
     parsed_options = parse_options(argument_list).ydl_opts
 
     if defaults is None:
@@ -0,0 +1,124 @@
+"""
+Module for importing modules and objects only when they are first used.
+Keeps the startup of the cli fast, heavy dependencies (yt-dlp, fastapi,
+lyrics providers...) are loaded only by the code paths that need them.
+"""
+
+import importlib
+from typing import Any, Callable, Dict, Iterator, Mapping
+
+__all__ = [
+    "LazyImportError",
+    "import_object",
+    "LazyImportDict",
+    "lazy_getattr",
+]
+
+
+class LazyImportError(Exception):
+    """
+    Base class for all exceptions related to lazy imports.
+    """
+
+
+def import_object(path: str) -> Any:
+    """
+    Import an object from its path.
+
+    ### Arguments
+    - path: The path of the object, in the `package.module:attribute` format.
+        If there is no `:attribute` part, the module itself is returned.
+
+    ### Returns
+    - The imported object.
+    """
+
+    module_name, _, attribute = path.partition(":")
+    module = importlib.import_module(module_name)
+
+    if not attribute:
+        return module
+
+    try:
+        return getattr(module, attribute)
+    except AttributeError as exception:
+        raise LazyImportError(
+            f"Module {module_name} has no attribute {attribute}"
+        ) from exception
+
+
+class LazyImportDict(Mapping[str, Any]):
+    """
+    Read-only dictionary whose keys are known upfront,
+    but whose values are imported on first access.
+    """
+
+    def __init__(self, paths: Dict[str, str]):
+        """
+        Initialize the dictionary.
+
+        ### Arguments
+        - paths: Dictionary of keys and `package.module:attribute` paths.
+        """
+
+        self.paths = paths
+        self.loaded: Dict[str, Any] = {}
+
+    def __getitem__(self, key: str) -> Any:
+        """
+        Get the value for the key, importing it if needed.
+
+        ### Arguments
+        - key: The key.
+
+        ### Returns
+        - The imported object.
+        """
+
+        if key not in self.loaded:
+            self.loaded[key] = import_object(self.paths[key])
+
+        return self.loaded[key]
+
+    def __contains__(self, key: object) -> bool:
+        """
+        Check if the key exists, without importing anything.
+        """
+
+        return key in self.paths
+
+    def __iter__(self) -> Iterator[str]:
+        """
+        Iterate over the keys, without importing anything.
+        """
+
+        return iter(self.paths)
+
+    def __len__(self) -> int:
+        """
+        Get the number of keys.
+        """
+
+        return len(self.paths)
+
+
+def lazy_getattr(module_name: str, paths: Dict[str, str]) -> Callable[[str], Any]:
+    """
+    Create a module level `__getattr__` (PEP 562) that imports
+    the attributes of a package on first access.
+
+    ### Arguments
+    - module_name: The name of the module, used in error messages.
+    - paths: Dictionary of attribute names and `package.module:attribute` paths.
+
+    ### Returns
+    - The `__getattr__` function.
+    """
+
+    def __getattr__(name: str) -> Any:
+        if name not in paths:
+            raise AttributeError(f"module {module_name!r} has no attribute {name!r}")
+
+        return import_object(paths[name])
+
+    return __getattr__
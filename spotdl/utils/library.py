@@ -0,0 +1,296 @@
+"""
+Module for the index of the audio files already in the library.
+Lookups are answered from memory, without probing the filesystem per song.
+"""
+
+import logging
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from mutagen import File
+
+from spotdl.types.song import Song
+from spotdl.utils.formatter import slugify
+
+__all__ = [
+    "DURATION_TOLERANCE",
+    "FileIndex",
+    "LibraryIndex",
+    "get_audio_duration",
+    "reuse_library_file",
+]
+
+# Maximum difference in seconds between two files of the same recording
+DURATION_TOLERANCE = 2
+logger = logging.getLogger(__name__)
+
+
+class FileIndex:
+    """
+    Existing files, listing each directory once
+    instead of checking every file for existence.
+    """
+
+    def __init__(self):
+        """
+        Initialize the file index.
+        """
+
+        self.lock = threading.Lock()
+        self.directories: Dict[str, FrozenSet[str]] = {}
+
+    def clear(self):
+        """
+        Forget the listings, so that files changed since are seen.
+        """
+
+        with self.lock:
+            self.directories = {}
+
+    def get_names(self, directory: str) -> FrozenSet[str]:
+        """
+        Get the names of the files in a directory, listing it on first use.
+
+        ### Arguments
+        - directory: the path of the directory
+
+        ### Returns
+        - the names of the files
+        """
+
+        names = self.directories.get(directory)
+        if names is None:
+            try:
+                names = frozenset(os.listdir(directory))
+            except OSError:
+                names = frozenset()
+
+            with self.lock:
+                names = self.directories.setdefault(directory, names)
+
+        return names
+
+    def exists(self, path: Path) -> bool:
+        """
+        Check if a file exists.
+
+        ### Arguments
+        - path: the path of the file
+
+        ### Returns
+        - whether the file exists
+        """
+
+        return path.name in self.get_names(str(path.parent))
+
+    def add(self, path: Path):
+        """
+        Record a file created after its directory was listed.
+
+        ### Arguments
+        - path: the path of the file
+        """
+
+        # Directories that aren't listed yet will be listed with the file
+        directory = str(path.parent)
+        with self.lock:
+            names = self.directories.get(directory)
+            if names is not None:
+                self.directories[directory] = names | {path.name}
+
+    def discard(self, path: Path):
+        """
+        Record a removed file.
+
+        ### Arguments
+        - path: the path of the file
+        """
+
+        directory = str(path.parent)
+        with self.lock:
+            names = self.directories.get(directory)
+            if names is not None:
+                self.directories[directory] = names - {path.name}
+
+
+def get_audio_duration(path: Path) -> Optional[int]:
+    """
+    Get the duration of an audio file.
+
+    ### Arguments
+    - path: the path of the file
+
+    ### Returns
+    - the duration in seconds, or None if the file can't be read
+    """
+
+    try:
+        audio_file = File(str(path))
+    except Exception as exception:  # pylint: disable=W0718
+        logger.debug("Could not read the duration of %s: %s", path, exception)
+        return None
+
+    if audio_file is None or audio_file.info is None:
+        return None
+
+    return int(audio_file.info.length)
+
+
+class LibraryIndex:
+    """
+    Audio files of the library, indexed by Spotify url, by ISRC
+    and by normalized artist and title, to find a recording
+    that was already downloaded from another release.
+    """
+
+    def __init__(self):
+        """
+        Initialize the library index.
+        """
+
+        self.lock = threading.Lock()
+        self.by_url: Dict[str, List[Path]] = {}
+        self.by_isrc: Dict[str, List[Path]] = {}
+        self.by_name: Dict[Tuple[str, str], List[Tuple[int, Path]]] = {}
+        self.paths: Set[Path] = set()
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    @staticmethod
+    def get_name_key(song: Song) -> Optional[Tuple[str, str]]:
+        """
+        Get the normalized artist and title of a song.
+
+        ### Arguments
+        - song: the song
+
+        ### Returns
+        - the key, or None if the song has no artist or title
+        """
+
+        artist = song.artist or (song.artists[0] if song.artists else None)
+        if not artist or not song.name:
+            return None
+
+        return slugify(artist), slugify(song.name)
+
+    def add(self, song: Song, path: Path):
+        """
+        Add the file of a song.
+
+        ### Arguments
+        - song: the song
+        - path: the path of its audio file
+        """
+
+        duration = song.duration or get_audio_duration(path)
+        name_key = self.get_name_key(song)
+
+        with self.lock:
+            self.paths.add(path)
+
+            if song.url:
+                self.by_url.setdefault(song.url, []).append(path)
+
+            if song.isrc:
+                self.by_isrc.setdefault(song.isrc.upper(), []).append(path)
+
+            if name_key and duration:
+                self.by_name.setdefault(name_key, []).append((int(duration), path))
+
+    def find(self, song: Song, exclude: Optional[Path] = None) -> Optional[Path]:
+        """
+        Find a file of the same recording.
+
+        ### Arguments
+        - song: the song
+        - exclude: a path that doesn't count as a match, like the song's own path
+
+        ### Returns
+        - the path of the first match that still exists, by url, then ISRC,
+            then artist, title and duration
+        """
+
+        candidates: List[Path] = []
+        if song.url:
+            candidates.extend(self.by_url.get(song.url, []))
+
+        if song.isrc:
+            candidates.extend(self.by_isrc.get(song.isrc.upper(), []))
+
+        name_key = self.get_name_key(song)
+        if name_key and song.duration:
+            candidates.extend(
+                path
+                for duration, path in self.by_name.get(name_key, [])
+                if abs(duration - song.duration) <= DURATION_TOLERANCE
+            )
+
+        for path in candidates:
+            if path != exclude and path.exists():
+                return path
+
+        return None
+
+
+def reuse_library_file(
+    library: LibraryIndex,
+    file_index: FileIndex,
+    song: Song,
+    output_file: Path,
+    mode: str,
+) -> Optional[Path]:
+    """
+    Use the library file of the same recording instead of downloading a song.
+
+    ### Arguments
+    - library: the library index
+    - file_index: the index of the existing files
+    - song: the song
+    - output_file: the path the song would be downloaded to
+    - mode: `skip` to use the library file as is,
+        `link` to hard link it to the output path
+
+    ### Returns
+    - the path of the file used for the song, or None if the recording
+        isn't in the library
+    """
+
+    library_file = library.find(song, exclude=output_file)
+    if library_file is None:
+        return None
+
+    if mode == "skip":
+        logger.info(
+            "Skipping %s (same recording in library) '%s'",
+            song.display_name,
+            library_file,
+        )
+
+        return library_file
+
+    # Linked files share their data, including the tags of the library file
+    linked_file = output_file.with_suffix(library_file.suffix)
+    linked_file.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(library_file, linked_file)
+    except FileExistsError:
+        pass
+    except OSError as exc:
+        logger.debug("Could not link %s, copying it: %s", library_file, exc)
+        shutil.copy2(library_file, linked_file)
+
+    logger.info(
+        "Linked %s to the same recording in library '%s'",
+        song.display_name,
+        library_file,
+    )
+
+    file_index.add(linked_file)
+    library.add(song, linked_file)
+
+    return linked_file
@@ -5,27 +5,35 @@
 import logging
 import re
 from pathlib import Path
+from typing import Optional
 
 from syncedlyrics import search as syncedlyrics_search
-from syncedlyrics.utils import Lyrics, TargetType, has_translation
+from syncedlyrics.utils import Lyrics, TargetType
 
 from spotdl.types.song import Song
+from spotdl.utils.lyrics import SongLyrics, is_synced
 
 logger = logging.getLogger(__name__)
 
 __all__ = ["generate_lrc", "remomve_lrc"]
 
 
-def generate_lrc(song: Song, output_file: Path):
+def generate_lrc(
+    song: Song, output_file: Path, song_lyrics: Optional[SongLyrics] = None
+):
     """
     Generates an LRC file for the current song
 
     ### Arguments
     - song: Song object
     - output_file: Path to the output file
+    - song_lyrics: Lyrics already resolved for the song,
+        if passed no new search is made
     """
 
-    if song.lyrics and has_translation(song.lyrics):
+    if song_lyrics is not None:
+        lrc_data = song_lyrics.lrc
+    elif song.lyrics and is_synced(song.lyrics):
         lrc_data = song.lyrics
     else:
         try:
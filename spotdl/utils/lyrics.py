@@ -0,0 +1,175 @@
+"""
+Module for resolving the lyrics of songs once, for both
+the embedded lyrics and the lrc files.
+"""
+
+import logging
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional
+
+from syncedlyrics import search as syncedlyrics_search
+
+from spotdl.providers.lyrics.base import LyricsProvider
+from spotdl.types.song import Song
+
+__all__ = ["LRC_REGEX", "is_synced", "SongLyrics", "LyricsResolver"]
+
+LRC_REGEX = re.compile(r"(\[\d{2}:\d{2}.\d{2,3}\])")
+
+logger = logging.getLogger(__name__)
+
+
+def is_synced(lyrics: str) -> bool:
+    """
+    Check if the lyrics are in lrc format, using regex on the first 5 lines.
+
+    ### Arguments
+    - lyrics: The lyrics.
+
+    ### Returns
+    - True if the lyrics have timestamps.
+    """
+
+    return any(line and LRC_REGEX.match(line) for line in lyrics.splitlines()[:5])
+
+
+@dataclass
+class SongLyrics:
+    """
+    Lyrics found for a song.
+    `lyrics` is the result of the first lyrics provider that found something,
+    `synced` and `plain` are the variants found along the way.
+    """
+
+    lyrics: Optional[str] = None
+    synced: Optional[str] = None
+    plain: Optional[str] = None
+
+    def add(self, lyrics: str):
+        """
+        Add lyrics, sorting them into the synced or plain variant.
+
+        ### Arguments
+        - lyrics: The lyrics.
+        """
+
+        if self.lyrics is None:
+            self.lyrics = lyrics
+
+        if is_synced(lyrics):
+            self.synced = self.synced or lyrics
+        else:
+            self.plain = self.plain or lyrics
+
+    @property
+    def lrc(self) -> Optional[str]:
+        """
+        Lyrics to save in the lrc file, synced lyrics are preferred.
+        """
+
+        return self.synced or self.plain
+
+
+class LyricsResolver:
+    """
+    Searches lyrics with the lyrics providers, in order.
+    Results are cached, so that the embedded lyrics and the lrc file
+    come from the same search.
+    """
+
+    def __init__(
+        self,
+        lyrics_providers: List[LyricsProvider],
+        find_synced: bool = False,
+        cache_size: int = 512,
+    ):
+        """
+        Initialize the resolver.
+
+        ### Arguments
+        - lyrics_providers: The lyrics providers to use, in order.
+        - find_synced: Whether synced lyrics are needed (for lrc files).
+            If the providers only found plain lyrics and the synced provider
+            didn't run, synced lyrics are searched once more.
+        - cache_size: Number of songs to keep in the cache.
+        """
+
+        self.lyrics_providers = lyrics_providers
+        self.find_synced = find_synced
+        self.cache_size = cache_size
+        self.cache: "OrderedDict[str, SongLyrics]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def resolve(self, song: Song) -> SongLyrics:
+        """
+        Find the lyrics of a song.
+
+        ### Arguments
+        - song: The song.
+
+        ### Returns
+        - The lyrics found.
+        """
+
+        key = song.url or song.display_name
+        with self.lock:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.cache.move_to_end(key)
+                return cached
+
+        song_lyrics = SongLyrics()
+        searched_synced = False
+        for lyrics_provider in self.lyrics_providers:
+            searched_synced = searched_synced or lyrics_provider.name == "Synced"
+            lyrics = lyrics_provider.get_lyrics(song.name, song.artists)
+            if lyrics:
+                logger.debug(
+                    "Found lyrics for %s on %s", song.display_name, lyrics_provider.name
+                )
+
+                song_lyrics.add(lyrics)
+                break
+
+            logger.debug(
+                "%s failed to find lyrics for %s",
+                lyrics_provider.name,
+                song.display_name,
+            )
+
+        # Synced lyrics weren't searched yet
+        if self.find_synced and song_lyrics.synced is None and not searched_synced:
+            try:
+                synced_lyrics = syncedlyrics_search(song.display_name, synced_only=True)
+            except Exception as exception:  # pylint: disable=W0718
+                logger.debug("Could not search synced lyrics: %s", exception)
+                synced_lyrics = None
+
+            if synced_lyrics:
+                song_lyrics.add(synced_lyrics)
+
+        with self.lock:
+            self.cache[key] = song_lyrics
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+        return song_lyrics
+
+    def resolve_batch(self, songs: List[Song], threads: int = 4) -> List[SongLyrics]:
+        """
+        Find the lyrics of several songs concurrently.
+
+        ### Arguments
+        - songs: The songs.
+        - threads: Number of concurrent searches.
+
+        ### Returns
+        - The lyrics found, in the same order as the songs.
+        """
+
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            return list(executor.map(self.resolve, songs))
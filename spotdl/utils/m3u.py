@@ -4,12 +4,14 @@
 
 import logging
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from spotdl.types.song import Song
 from spotdl.utils.formatter import create_file_name, sanitize_string
+from spotdl.utils.library import FileIndex
 
 __all__ = [
+    "M3UWriter",
     "create_m3u_content",
     "gen_m3u_files",
     "create_m3u_file",
@@ -18,6 +20,132 @@
 logger = logging.getLogger(__name__)
 
 
+class M3UWriter:
+    """
+    Writes m3u files line by line. The entries of the songs are kept,
+    so songs in several lists are rendered once.
+    """
+
+    def __init__(
+        self,
+        template: str,
+        file_extension: str,
+        restrict: Optional[str] = None,
+        short: bool = False,
+        detect_formats: Optional[List[str]] = None,
+    ):
+        """
+        Initialize the writer.
+
+        ### Arguments
+        - template: the template to use
+        - file_extension: the file extension to use
+        - restrict: sanitization to apply to the filename
+        - short: whether to use the short version of the template
+        - detect_formats: the formats to detect for existing files
+        """
+
+        self.template = template
+        self.file_extension = file_extension
+        self.restrict = restrict
+        self.short = short
+        self.detect_formats = detect_formats
+        self.list_template = "{list-" in template
+        self.file_index = FileIndex()
+        self.entries: Dict[Tuple, str] = {}
+
+    def get_file_name(self, song: Song) -> Path:
+        """
+        Get the path of a song, in the first detected format that exists.
+
+        ### Arguments
+        - song: the song
+
+        ### Returns
+        - the path of the song
+        """
+
+        for file_ext in self.detect_formats or []:
+            file_name = create_file_name(
+                song, self.template, file_ext, self.restrict, self.short
+            )
+
+            if self.file_index.exists(file_name):
+                return file_name
+
+        return create_file_name(
+            song, self.template, self.file_extension, self.restrict, self.short
+        )
+
+    def get_entry(self, song: Song) -> str:
+        """
+        Get the `#EXTINF` and path lines of a song.
+
+        ### Arguments
+        - song: the song
+
+        ### Returns
+        - the lines of the song
+        """
+
+        # Songs in several lists only share their entry
+        # if the template doesn't use the list fields
+        key: Tuple = (song.url,)
+        if self.list_template:
+            key += (song.list_name, song.list_position, song.list_length)
+
+        entry = self.entries.get(key) if song.url else None
+        if entry is not None:
+            return entry
+
+        metadata = create_file_name(
+            song, "#EXTINF:{duration},{album-artist} - {title}", ""
+        )
+        entry = f"{metadata}\n{self.get_file_name(song)}\n"
+
+        if song.url:
+            self.entries[key] = entry
+
+        return entry
+
+    def iter_lines(self, song_list: List[Song]) -> Iterator[str]:
+        """
+        Iterate over the content of an m3u file.
+
+        ### Arguments
+        - song_list: the list of songs
+
+        ### Returns
+        - the header, then the lines of every song
+        """
+
+        yield "#EXTM3U\n"
+
+        for song in song_list:
+            yield self.get_entry(song)
+
+    def write_file(self, file_name: str, song_list: List[Song]) -> Path:
+        """
+        Write an m3u file.
+
+        ### Arguments
+        - file_name: the file name to use
+        - song_list: the list of songs
+
+        ### Returns
+        - the path of the m3u file
+        """
+
+        file_path = Path(
+            *(sanitize_string(part) for part in Path(file_name).parts)
+        ).absolute()
+
+        with open(file_path, "w", encoding="utf-8") as m3u_file:
+            m3u_file.writelines(self.iter_lines(song_list))
+
+        return file_path
+
+
 def create_m3u_content(
     song_list: List[Song],
     template: str,
@@ -41,35 +169,9 @@ def create_m3u_content(
     - the m3u content as a string
     """
 
-    text = "#EXTM3U\n"
+    writer = M3UWriter(template, file_extension, restrict, short, detect_formats)
 
-    for song in song_list:
-        metadata = create_file_name(
-            song, "#EXTINF:{duration},{album-artist} - {title}", ""
-        )
-        text += str(metadata) + "\n"
-
-        if not detect_formats:
-            file_name = create_file_name(
-                song, template, file_extension, restrict, short
-            )
-
-            text += str(file_name) + "\n"
-        else:
-            for file_ext in detect_formats:
-                file_name = create_file_name(song, template, file_ext, restrict, short)
-
-                if file_name.exists():
-                    text += str(file_name) + "\n"
-                    break
-            else:
-                # Runs if no existing file was found (no break)
-                file_name = create_file_name(
-                    song, template, file_extension, restrict, short
-                )
-                text += str(file_name) + "\n"
-
-    return text
+    return "".join(writer.iter_lines(song_list))
 
 
 def gen_m3u_files(
@@ -127,42 +229,19 @@ def gen_m3u_files(
         )
         return
 
+    # Shared by all lists, so songs in several lists are rendered once
+    writer = M3UWriter(template, file_extension, restrict, short, detect_formats)
+
     if "{list}" in file_name:
         # Create multiple m3u files if there are multiple lists
         for list_name, song_list in lists_object.items():
-            create_m3u_file(
-                file_name.format(
-                    list=list_name,
-                ),
-                song_list,
-                template,
-                file_extension,
-                restrict,
-                short,
-                detect_formats,
-            )
+            writer.write_file(file_name.format(list=list_name), song_list)
     elif "{list[" in file_name and "]}" in file_name:
         # Create a single m3u file for specified song list name
-        create_m3u_file(
-            file_name.format(list=list(lists_object.keys())),
-            songs,
-            template,
-            file_extension,
-            restrict,
-            short,
-            detect_formats,
-        )
+        writer.write_file(file_name.format(list=list(lists_object.keys())), songs)
     else:
         # Use the provided file name
-        create_m3u_file(
-            file_name,
-            songs,
-            template,
-            file_extension,
-            restrict,
-            short,
-            detect_formats,
-        )
+        writer.write_file(file_name, songs)
 
 
 def create_m3u_file(
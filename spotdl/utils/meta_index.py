@@ -0,0 +1,114 @@
+"""
+Module for the index of files already processed by `spotdl meta`.
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+__all__ = ["METADATA_VERSION", "MetaIndex"]
+
+# Increase when the way metadata is applied changes,
+# so that files tagged by older versions are processed again
+METADATA_VERSION = 1
+
+
+class MetaIndex(Dict[str, Dict[str, Any]]):
+    """
+    MetaIndex class.
+    A file-persistable dict of file path -> modification time, size,
+    spotify id and metadata version of the last applied metadata.
+    """
+
+    def load(self, file: Path) -> bool:
+        """
+        Imports the index from the file.
+
+        ### Arguments
+        - file: the file name of the index
+
+        ### Returns
+        - if the file exists and is valid
+        """
+
+        try:
+            with open(file, "r", encoding="utf-8") as index_file:
+                data = json.load(index_file)
+        except (OSError, ValueError):
+            return False
+
+        self.clear()
+        if isinstance(data, dict):
+            self.update(data)
+
+        return True
+
+    def save(self, file: Path) -> bool:
+        """
+        Exports the current index to the file.
+
+        ### Arguments
+        - file: the file name of the index
+        """
+
+        with open(file, "w", encoding="utf-8") as index_file:
+            json.dump(self, index_file)
+
+        return True
+
+    @staticmethod
+    def get_key(path: Path) -> str:
+        """
+        Get the index key of a file.
+
+        ### Arguments
+        - path: path to the file
+
+        ### Returns
+        - the absolute path of the file
+        """
+
+        return str(path.absolute())
+
+    def is_current(self, path: Path) -> bool:
+        """
+        Check if the file didn't change since its metadata was applied.
+        Only the file stats are read, the file isn't opened.
+
+        ### Arguments
+        - path: path to the file
+
+        ### Returns
+        - True if the file can be skipped
+        """
+
+        entry = self.get(self.get_key(path))
+        if entry is None or entry.get("version") != METADATA_VERSION:
+            return False
+
+        try:
+            stat_result = path.stat()
+        except OSError:
+            return False
+
+        return (
+            entry.get("mtime_ns") == stat_result.st_mtime_ns
+            and entry.get("size") == stat_result.st_size
+        )
+
+    def add_file(self, path: Path, song_id: Optional[str]):
+        """
+        Record that the metadata of the file is up to date.
+
+        ### Arguments
+        - path: path to the file
+        - song_id: spotify id of the song applied to the file
+        """
+
+        stat_result = path.stat()
+        self[self.get_key(path)] = {
+            "mtime_ns": stat_result.st_mtime_ns,
+            "size": stat_result.st_size,
+            "song_id": song_id,
+            "version": METADATA_VERSION,
+        }
@@ -12,14 +12,14 @@
 
 import base64
 import logging
-import re
 from pathlib import Path
 from typing import Any, Dict, Optional
 
 import requests
+from mutagen import PaddingInfo
 from mutagen._file import File
 from mutagen.flac import Picture
-from mutagen.id3 import ID3
+from mutagen.id3 import ID3, Frames, ID3NoHeaderError
 from mutagen.id3._frames import (
     APIC,
     COMM,
@@ -46,6 +46,7 @@
 from spotdl.utils.config import GlobalConfig
 from spotdl.utils.formatter import to_ms
 from spotdl.utils.lrc import remomve_lrc
+from spotdl.utils.lyrics import is_synced
 
 logger = logging.getLogger(__name__)
 
@@ -57,8 +58,11 @@
     "TAG_TO_SONG",
     "M4A_TO_SONG",
     "MP3_TO_SONG",
-    "LRC_REGEX",
+    "TAG_PADDING",
+    "MAX_TAG_PADDING",
     "embed_metadata",
+    "embed_mp3_file",
+    "get_tag_padding",
     "embed_cover",
     "embed_lyrics",
     "get_file_metadata",
@@ -157,7 +161,10 @@ class MetadataError(Exception):
     if TAG_TO_SONG.get(key)
 }
 
-LRC_REGEX = re.compile(r"(\[\d{2}:\d{2}.\d{2,3}\])")
+# Padding left in the tags when a file has to be rewritten,
+# and the most padding kept when the tags are updated in place
+TAG_PADDING = 16 * 1024
+MAX_TAG_PADDING = 1024 * 1024
 
 
 def embed_metadata(
@@ -183,11 +190,15 @@ def embed_metadata(
         embed_wav_file(output_file, song)
         return
 
+    if encoding == "mp3":
+        embed_mp3_file(output_file, song, id3_separator, skip_album_art)
+        return
+
     # Get the tag preset for the file extension
     tag_preset = TAG_PRESET if encoding != "m4a" else M4A_TAG_PRESET
 
     try:
-        audio_file = File(str(output_file.resolve()), easy=encoding == "mp3")
+        audio_file = File(str(output_file.resolve()))
 
         if audio_file is None:
             raise MetadataError(
@@ -216,7 +227,7 @@ def embed_metadata(
     if song.copyright_text:
         audio_file[tag_preset["copyright"]] = song.copyright_text
 
-    if song.download_url and encoding != "mp3":
+    if song.download_url:
         audio_file[tag_preset["comment"]] = song.download_url
 
     # Embed some metadata in format specific ways
@@ -232,47 +243,115 @@ def embed_metadata(
         audio_file[tag_preset["tracknumber"]] = [(song.track_number, song.tracks_count)]
         audio_file[tag_preset["explicit"]] = (4 if song.explicit is True else 2,)
         audio_file[tag_preset["woas"]] = song.url.encode("utf-8")
-    elif encoding == "mp3":
-        audio_file["tracknumber"] = f"{str(song.track_number)}/{str(song.tracks_count)}"
-        audio_file["discnumber"] = f"{str(song.disc_number)}/{str(song.disc_count)}"
-        audio_file["isrc"] = song.isrc
 
-    # Mp3 specific encoding
-    if encoding == "mp3":
-        if id3_separator != "/":
-            audio_file.save(v23_sep=id3_separator, v2_version=3)
-        else:
-            audio_file.save(v2_version=3)
+    if not skip_album_art:
+        # Embed album art
+        audio_file = embed_cover(audio_file, song, encoding)
+
+    # Embed lyrics
+    audio_file = embed_lyrics(audio_file, song, encoding)
+
+    audio_file.save(padding=get_tag_padding)
+
 
+def embed_mp3_file(
+    output_file: Path,
+    song: Song,
+    id3_separator: str = "/",
+    skip_album_art: Optional[bool] = False,
+):
+    """
+    Set ID3 tags for mp3 files. All the frames are set on one ID3 object,
+    so the file is written only once.
+
+    ### Arguments
+    - output_file: Path to the output file.
+    - song: Song object.
+    - id3_separator: The separator used for the id3 tags.
+    - skip_album_art: Boolean to skip album art embedding.
+    """
+
+    try:
         audio_file = ID3(str(output_file.resolve()))
+    except ID3NoHeaderError:
+        audio_file = ID3()
+    except Exception as exc:
+        raise MetadataError("Unable to load file.") from exc
 
-        audio_file.add(WOAS(encoding=3, url=song.url))
+    def set_text(tag: str, value: Any):
+        frame_class = Frames[MP3_TAG_PRESET[tag]]
+        audio_file.add(frame_class(encoding=3, text=value))
 
-        if song.download_url:
-            audio_file.add(COMM(encoding=3, text=song.download_url))
+    # Embed basic metadata
+    set_text("artist", song.artists)
+    set_text("albumartist", song.album_artist if song.album_artist else song.artist)
+    set_text("title", song.name)
+    set_text("date", song.date)
+    set_text("encodedby", song.publisher)
 
-        if song.popularity:
-            audio_file.add(
-                POPM(
-                    rating=int(song.popularity * 255 / 100),
-                )
+    # Embed metadata that isn't always present
+    if song.album_name:
+        set_text("album", song.album_name)
+
+    if song.genres:
+        set_text("genre", song.genres[0].title())
+
+    if song.copyright_text:
+        set_text("copyright", song.copyright_text)
+
+    set_text("tracknumber", f"{str(song.track_number)}/{str(song.tracks_count)}")
+    set_text("discnumber", f"{str(song.disc_number)}/{str(song.disc_count)}")
+    set_text("isrc", song.isrc)
+
+    audio_file.add(WOAS(encoding=3, url=song.url))
+
+    if song.download_url:
+        audio_file.add(COMM(encoding=3, text=song.download_url))
+
+    if song.popularity:
+        audio_file.add(
+            POPM(
+                rating=int(song.popularity * 255 / 100),
             )
+        )
 
-        if song.year:
-            audio_file.add(TYER(encoding=3, text=str(song.year)))
+    if song.year:
+        audio_file.add(TYER(encoding=3, text=str(song.year)))
 
     if not skip_album_art:
         # Embed album art
-        audio_file = embed_cover(audio_file, song, encoding)
+        audio_file = embed_cover(audio_file, song, "mp3")
 
     # Embed lyrics
-    audio_file = embed_lyrics(audio_file, song, encoding)
+    audio_file = embed_lyrics(audio_file, song, "mp3")
 
-    # Mp3 specific encoding
-    if encoding == "mp3":
-        audio_file.save(v23_sep=id3_separator, v2_version=3)
-    else:
-        audio_file.save()
+    audio_file.save(
+        str(output_file.resolve()),
+        v23_sep=id3_separator,
+        v2_version=3,
+        padding=get_tag_padding,
+    )
+
+
+def get_tag_padding(info: PaddingInfo) -> int:
+    """
+    Padding strategy for mutagen. Leaves room in the tags, so that
+    later metadata updates (`meta`, `--overwrite metadata`)
+    can be written in place instead of rewriting the whole file.
+
+    ### Arguments
+    - info: Padding info from mutagen.
+
+    ### Returns
+    - The padding to use, in bytes.
+    """
+
+    # The new tags fit in the current space, write them in place
+    if 0 <= info.padding <= MAX_TAG_PADDING:
+        return info.padding
+
+    # The file has to be rewritten, leave room for the next update
+    return TAG_PADDING + info.size // 100
 
 
 def embed_cover(audio_file, song: Song, encoding: str):
@@ -356,11 +435,7 @@ def embed_lyrics(audio_file, song: Song, encoding: str):
     tag_preset = TAG_PRESET if encoding != "m4a" else M4A_TAG_PRESET
 
     # Check if the lyrics are in lrc format
-    # using regex on the first 5 lines
-    lrc_lines = lyrics.splitlines()[:5]
-    lrc_lines = [line for line in lrc_lines if line and LRC_REGEX.match(line)]
-
-    if len(lrc_lines) == 0:
+    if not is_synced(lyrics):
         # Lyrics are not in lrc format
         # Embed them normally
         if encoding == "mp3":
@@ -628,11 +703,7 @@ def embed_wav_file(output_file: Path, song: Song):
 
     if song.lyrics:
         # Check if the lyrics are in lrc format
-        # using regex on the first 5 lines
-        lrc_lines = song.lyrics.splitlines()[:5]
-        lrc_lines = [line for line in lrc_lines if line and LRC_REGEX.match(line)]
-
-        if len(lrc_lines) == 0:
+        if not is_synced(song.lyrics):
             audio.tags.add(USLT(encoding=Encoding.UTF8, text=song.lyrics))  # type: ignore
         else:
             lrc_data = []
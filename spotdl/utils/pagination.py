@@ -0,0 +1,122 @@
+"""
+Module for fetching every page of a paginated Spotify response.
+The offsets of the remaining pages are known from the first page,
+so they are fetched concurrently.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from spotdl.utils.spotify import SpotifyClient, get_request_priority, request_priority
+
+__all__ = [
+    "PAGE_THREADS",
+    "get_page_urls",
+    "get_all_items",
+]
+
+# Maximum number of pages fetched at the same time
+PAGE_THREADS = 8
+
+logger = logging.getLogger(__name__)
+
+
+def get_page_urls(page: Dict[str, Any]) -> Optional[List[str]]:
+    """
+    Get the urls of the pages after the given page.
+
+    ### Arguments
+    - page: A page of an offset based paginated response.
+
+    ### Returns
+    - The urls of the remaining pages, or None if the response
+        is cursor based and the pages have to be followed one by one.
+    """
+
+    next_url = page.get("next")
+    if not next_url:
+        return []
+
+    total, limit, offset = page.get("total"), page.get("limit"), page.get("offset")
+    url_parts = urlsplit(next_url)
+    params = parse_qsl(url_parts.query)
+    if (
+        not isinstance(total, int)
+        or not isinstance(limit, int)
+        or not isinstance(offset, int)
+        or not limit
+        or "offset" not in dict(params)
+    ):
+        return None
+
+    urls = []
+    for page_offset in range(offset + limit, total, limit):
+        page_params = [
+            (key, str(page_offset) if key == "offset" else value)
+            for key, value in params
+        ]
+        urls.append(urlunsplit(url_parts._replace(query=urlencode(page_params))))
+
+    return urls
+
+
+def get_all_items(
+    first_page: Dict[str, Any],
+    key: Optional[str] = None,
+    threads: int = PAGE_THREADS,
+) -> List[Any]:
+    """
+    Get the items of every page of a paginated response, in order.
+
+    ### Arguments
+    - first_page: The first page of the response.
+    - key: Key of the page in the responses of the next pages,
+        for responses that wrap the page (like followed artists).
+    - threads: Maximum number of pages fetched at the same time.
+
+    ### Returns
+    - The items of all pages. If a page can't be fetched,
+        the items of the pages before it are returned.
+    """
+
+    spotify_client = SpotifyClient()
+    items = list(first_page["items"])
+
+    page_urls = get_page_urls(first_page)
+    if page_urls is None:
+        # Cursor based pagination, each page gives the url of the next one
+        page: Optional[Dict[str, Any]] = first_page
+        while page and page["next"]:
+            response = spotify_client.next(page)
+            page = response[key] if response and key else response
+            if page is None:
+                logger.warning("Couldn't get the next page of %s", first_page["href"])
+                break
+
+            items.extend(page["items"])
+
+        return items
+
+    # Worker threads don't inherit the priority of the calling thread
+    priority = get_request_priority()
+
+    def fetch_page(url: str) -> Optional[Dict[str, Any]]:
+        # Rate limited requests are retried by the client's request scheduler
+        with request_priority(priority):
+            response = spotify_client.next({"next": url})
+
+        return response[key] if response and key else response
+
+    with ThreadPoolExecutor(max_workers=max(1, threads)) as executor:
+        pages = list(executor.map(fetch_page, page_urls))
+
+    for page_url, page in zip(page_urls, pages):
+        if page is None:
+            logger.warning("Couldn't get page %s", page_url)
+            break
+
+        items.extend(page["items"])
+
+    return items
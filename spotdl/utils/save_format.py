@@ -0,0 +1,295 @@
+"""
+Module for reading and writing `.spotdl` save and sync files.
+
+Two formats are supported. The legacy format is a single JSON document:
+a list of songs for save files, a dict with a `songs` list for sync files.
+The compact format is newline-delimited JSON: a header object on the first
+line, then one song per line, so files can be read and written one song
+at a time.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+__all__ = [
+    "SAVE_FORMATS",
+    "NDJSON_FORMAT",
+    "SaveFormatError",
+    "SaveFileWriter",
+    "read_header",
+    "is_ndjson",
+    "iter_songs",
+    "load_save_file",
+    "write_save_file",
+]
+
+SAVE_FORMATS = ["json", "ndjson"]
+
+# Value of the `format` key in the header of compact files
+NDJSON_FORMAT = "ndjson"
+
+NDJSON_VERSION = 1
+
+
+class SaveFormatError(Exception):
+    """
+    Base class for all exceptions related to save files.
+    """
+
+
+def read_header(save_file: IO[str]) -> Optional[Dict[str, Any]]:
+    """
+    Read the header of a compact file.
+
+    ### Arguments
+    - save_file: the opened file, positioned at its start
+
+    ### Returns
+    - the header, or None if the file is in the legacy format.
+        The file is positioned after the header for compact files,
+        at its start otherwise.
+    """
+
+    first_line = save_file.readline()
+    try:
+        header = json.loads(first_line)
+    except ValueError:
+        header = None
+
+    if isinstance(header, dict) and header.get("format") == NDJSON_FORMAT:
+        return header
+
+    save_file.seek(0)
+
+    return None
+
+
+def is_ndjson(path: Union[str, Path]) -> bool:
+    """
+    Check if a file is in the compact format.
+
+    ### Arguments
+    - path: the path of the file
+
+    ### Returns
+    - whether the file is in the compact format
+    """
+
+    try:
+        with open(path, "r", encoding="utf-8") as save_file:
+            return read_header(save_file) is not None
+    except OSError:
+        return False
+
+
+def iter_songs(path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    """
+    Iterate over the songs of a save or sync file, in either format.
+    Compact files are read one line at a time.
+
+    ### Arguments
+    - path: the path of the file
+
+    ### Returns
+    - the song dicts
+    """
+
+    with open(path, "r", encoding="utf-8") as save_file:
+        header = read_header(save_file)
+        if header is None:
+            data = json.load(save_file)
+            yield from data["songs"] if isinstance(data, dict) else data
+            return
+
+        for line in save_file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def load_save_file(path: Union[str, Path]) -> Tuple[Dict[str, Any], List[Dict]]:
+    """
+    Load a save or sync file, in either format.
+
+    ### Arguments
+    - path: the path of the file
+
+    ### Returns
+    - the header (without the songs, empty for legacy save files)
+        and the list of song dicts
+    """
+
+    with open(path, "r", encoding="utf-8") as save_file:
+        header = read_header(save_file)
+        if header is not None:
+            # Lines never contain raw newlines, so they are parsed as one array
+            lines = (line for line in save_file.read().splitlines() if line.strip())
+            return header, json.loads("[" + ",".join(lines) + "]")
+
+        data = json.load(save_file)
+
+    if isinstance(data, list):
+        return {}, data
+
+    if not isinstance(data, dict):
+        raise SaveFormatError(f"{path} is not a valid save file")
+
+    header = {key: value for key, value in data.items() if key != "songs"}
+
+    return header, data.get("songs") or []
+
+
+class SaveFileWriter:
+    """
+    Writes a save or sync file one song at a time.
+    The file is written next to its final path and moved into place
+    when closed, so an interrupted write keeps the previous file.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        header: Optional[Dict[str, Any]] = None,
+        save_format: str = NDJSON_FORMAT,
+    ):
+        """
+        Open the file.
+
+        ### Arguments
+        - path: the path of the file
+        - header: the data stored next to the songs (like the sync query),
+            None for save files that only contain songs
+        - save_format: `ndjson` for the compact format, `json` for the legacy one
+        """
+
+        if save_format not in SAVE_FORMATS:
+            raise SaveFormatError(f"Unknown save format: {save_format}")
+
+        self.path = Path(path)
+        self.header = header
+        self.save_format = save_format
+        self.temp_path = self.path.with_name(self.path.name + ".tmp")
+        self.file = open(self.temp_path, "w", encoding="utf-8")  # pylint: disable=R1732
+        self.count = 0
+
+        if save_format == NDJSON_FORMAT:
+            self.file.write(
+                self.dumps(
+                    {
+                        "format": NDJSON_FORMAT,
+                        "version": NDJSON_VERSION,
+                        **(header or {}),
+                    }
+                )
+            )
+        elif header is not None:
+            # Same layout as `json.dump(..., indent=4)` with the songs last
+            header_json = json.dumps(header, indent=4, ensure_ascii=False)
+            prefix = header_json[:-2] + "," if header else "{"
+            self.file.write(prefix + '\n    "songs": [')
+        else:
+            self.file.write("[")
+
+    @staticmethod
+    def dumps(data: Dict[str, Any]) -> str:
+        """
+        Serialize a line of a compact file.
+
+        ### Arguments
+        - data: the header or song dict
+
+        ### Returns
+        - the line, with its newline
+        """
+
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+    def write(self, song: Dict[str, Any]):
+        """
+        Write a song.
+
+        ### Arguments
+        - song: the song dict
+        """
+
+        if self.save_format == NDJSON_FORMAT:
+            self.file.write(self.dumps(song))
+        else:
+            indent = " " * (8 if self.header is not None else 4)
+            song_json = json.dumps(song, indent=4, ensure_ascii=False)
+            self.file.write(
+                ("," if self.count else "")
+                + "\n"
+                + indent
+                + song_json.replace("\n", "\n" + indent)
+            )
+
+        self.count += 1
+
+    def write_all(self, songs: Iterable[Dict[str, Any]]):
+        """
+        Write several songs.
+
+        ### Arguments
+        - songs: the song dicts
+        """
+
+        for song in songs:
+            self.write(song)
+
+    def close(self):
+        """
+        Finish the file and move it to its final path.
+        """
+
+        if self.save_format != NDJSON_FORMAT:
+            closing_indent = "\n    " if self.header is not None else "\n"
+            self.file.write((closing_indent if self.count else "") + "]")
+            if self.header is not None:
+                self.file.write("\n}")
+
+        self.file.close()
+        os.replace(self.temp_path, self.path)
+
+    def abort(self):
+        """
+        Stop writing, keeping the previous file.
+        """
+
+        self.file.close()
+        self.temp_path.unlink(missing_ok=True)
+
+    def __enter__(self) -> "SaveFileWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_save_file(
+    path: Union[str, Path],
+    songs: Iterable[Dict[str, Any]],
+    header: Optional[Dict[str, Any]] = None,
+    save_format: str = "json",
+) -> int:
+    """
+    Write a save or sync file.
+
+    ### Arguments
+    - path: the path of the file
+    - songs: the song dicts
+    - header: the data stored next to the songs, None for save files
+    - save_format: `ndjson` for the compact format, `json` for the legacy one
+
+    ### Returns
+    - the number of songs written
+    """
+
+    with SaveFileWriter(path, header, save_format) as writer:
+        writer.write_all(songs)
+
+    return writer.count
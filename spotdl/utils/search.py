@@ -6,11 +6,10 @@
 """
 
 import concurrent.futures
-import json
 import logging
 import re
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import requests
 from ytmusicapi import YTMusic
@@ -21,6 +20,8 @@
 from spotdl.types.saved import Saved
 from spotdl.types.song import Song, SongList
 from spotdl.utils.metadata import get_file_metadata
+from spotdl.utils.pagination import get_all_items
+from spotdl.utils.save_format import iter_songs
 from spotdl.utils.spotify import SpotifyClient, SpotifyError
 
 __all__ = [
@@ -29,7 +30,9 @@
     "parse_query",
     "get_simple_songs",
     "reinit_song",
+    "reinit_songs",
     "get_song_from_file_metadata",
+    "gather_known_song_files",
     "gather_known_songs",
     "create_ytm_album",
     "create_ytm_playlist",
@@ -285,10 +288,9 @@ def get_simple_songs(
         elif request == "all-saved-playlists":
             lists.extend(get_all_saved_playlists())
         elif request.endswith(".spotdl"):
-            with open(request, "r", encoding="utf-8") as save_file:
-                for track in json.load(save_file):
-                    # Append to songs
-                    songs.append(Song.from_dict(track))
+            # Save and sync files, in the legacy or the compact format
+            for track in iter_songs(request):
+                songs.append(Song.from_dict(track))
         else:
             songs.append(Song.from_search_term(request))
 
@@ -367,9 +369,7 @@ def songs_from_albums(albums: List[str]):
     """
 
     songs: List[Song] = []
-    for album_id in albums:
-        album = Album.from_url(album_id, fetch_songs=False)
-
+    for album in Album.list_from_urls(albums):
         songs.extend([Song.from_missing_data(**song.json) for song in album.songs])
 
     return songs
@@ -409,16 +409,8 @@ def get_all_user_playlists(user_url: str = "") -> List[Playlist]:
     if user_playlists_response is None:
         raise SpotifyError("Couldn't get user playlists")
 
-    user_playlists = user_playlists_response["items"]
-
-    # Fetch all saved tracks
-    while user_playlists_response and user_playlists_response["next"]:
-        response = spotify_client.next(user_playlists_response)
-        if response is None:
-            break
-
-        user_playlists_response = response
-        user_playlists.extend(user_playlists_response["items"])
+    # Fetch all user playlists
+    user_playlists = get_all_items(user_playlists_response)
 
     return [
         Playlist.from_url(playlist["external_urls"]["spotify"], fetch_songs=False)
@@ -443,21 +435,11 @@ def get_user_saved_albums() -> List[Album]:
     if user_saved_albums_response is None:
         raise SpotifyError("Couldn't get user saved albums")
 
-    user_saved_albums = user_saved_albums_response["items"]
-
-    # Fetch all saved tracks
-    while user_saved_albums_response and user_saved_albums_response["next"]:
-        response = spotify_client.next(user_saved_albums_response)
-        if response is None:
-            break
+    # Fetch all saved albums
+    user_saved_albums = get_all_items(user_saved_albums_response)
 
-        user_saved_albums_response = response
-        user_saved_albums.extend(user_saved_albums_response["items"])
-
-    return [
-        Album.from_url(item["album"]["external_urls"]["spotify"], fetch_songs=False)
-        for item in user_saved_albums
-    ]
+    # The saved albums already contain the first page of their tracks
+    return [Album.from_raw_metadata(item["album"]) for item in user_saved_albums]
 
 
 def get_user_followed_artists() -> List[Artist]:
@@ -476,17 +458,8 @@ def get_user_followed_artists() -> List[Artist]:
     if user_followed_response is None:
         raise SpotifyError("Couldn't get user followed artists")
 
-    user_followed_response = user_followed_response["artists"]
-    user_followed = user_followed_response["items"]
-
-    # Fetch all artists
-    while user_followed_response and user_followed_response["next"]:
-        response = spotify_client.next(user_followed_response)
-        if response is None:
-            break
-
-        user_followed_response = response["artists"]
-        user_followed.extend(user_followed_response["items"])
+    # Fetch all artists, followed artists are paginated with a cursor
+    user_followed = get_all_items(user_followed_response["artists"], key="artists")
 
     return [
         Artist.from_url(followed_artist["external_urls"]["spotify"], fetch_songs=False)
@@ -515,17 +488,10 @@ def get_all_saved_playlists() -> List[Playlist]:
     if user_playlists_response is None:
         raise SpotifyError("Couldn't get user playlists")
 
-    user_playlists = user_playlists_response["items"]
     user_id = user_playlists_response["href"].split("users/")[-1].split("/")[0]
 
-    # Fetch all saved tracks
-    while user_playlists_response and user_playlists_response["next"]:
-        response = spotify_client.next(user_playlists_response)
-        if response is None:
-            break
-
-        user_playlists_response = response
-        user_playlists.extend(user_playlists_response["items"])
+    # Fetch all saved playlists
+    user_playlists = get_all_items(user_playlists_response)
 
     return [
         Playlist.from_url(playlist["external_urls"]["spotify"], fetch_songs=False)
@@ -558,6 +524,61 @@ def reinit_song(song: Song) -> Song:
     else:
         raise QueryError("Song object is missing required data to be reinitialized")
 
+    return merge_song_data(data, new_data)
+
+
+def reinit_songs(songs: List[Song]) -> List[Song]:
+    """
+    Update multiple song objects with new data from Spotify,
+    fetching the Spotify songs in bulk instead of one by one.
+
+    ### Arguments
+    - songs: List of song objects
+
+    ### Returns
+    - List of updated song objects, songs that couldn't be found are returned as they are
+    """
+
+    song_ids = [
+        song.song_id or song.url.split("/")[-1].split("?")[0]
+        for song in songs
+        if song.url and "open.spotify.com" in song.url and "track" in song.url
+    ]
+
+    new_songs = {
+        new_song.song_id: new_song
+        for new_song in Song.list_from_urls(
+            [
+                f"https://open.spotify.com/track/{song_id}"
+                for song_id in dict.fromkeys(song_ids)
+            ]
+        )
+    }
+
+    updated_songs = []
+    for song in songs:
+        song_id = song.song_id or (song.url or "").split("/")[-1].split("?")[0]
+        new_song = new_songs.get(song_id)
+        if new_song is None:
+            updated_songs.append(song)
+        else:
+            updated_songs.append(merge_song_data(song.json, new_song.json))
+
+    return updated_songs
+
+
+def merge_song_data(data: Dict[str, Any], new_data: Dict[str, Any]) -> Song:
+    """
+    Fill the missing values of a song with new data.
+
+    ### Arguments
+    - data: Song data
+    - new_data: New song data from Spotify
+
+    ### Returns
+    - Updated song object
+    """
+
     for key in Song.__dataclass_fields__:  # type: ignore # pylint: disable=E1101
         val = data.get(key)
         new_val = new_data.get(key)
@@ -589,16 +610,16 @@ def get_song_from_file_metadata(file: Path, id3_separator: str = "/") -> Optiona
     return Song.from_missing_data(**file_metadata)
 
 
-def gather_known_songs(output: str, output_format: str) -> Dict[str, List[Path]]:
+def gather_known_song_files(output: str, output_format: str) -> List[Tuple[Song, Path]]:
     """
-    Gather all known songs from the output directory
+    Gather all known songs from the output directory, with their files
 
     ### Arguments
     - output: Output path template
     - output_format: Output format
 
     ### Returns
-    - Dictionary containing all known songs and their paths
+    - List of the songs and the paths of their files
     """
 
     # Get the base directory from the path template
@@ -606,7 +627,7 @@ def gather_known_songs(output: str, output_format: str) -> Dict[str, List[Path]]
     base_dir = output.split("{", 1)[0]
     paths = Path(base_dir).glob(f"**/*.{output_format}")
 
-    known_songs: Dict[str, List[Path]] = {}
+    song_files: List[Tuple[Song, Path]] = []
     for path in paths:
         # Try to get the song from the metadata
         song = get_song_from_file_metadata(path)
@@ -619,11 +640,26 @@ def gather_known_songs(output: str, output_format: str) -> Dict[str, List[Path]]
 
             song = search_results[0]
 
-        known_paths = known_songs.get(song.url)
-        if known_paths is None:
-            known_songs[song.url] = [path]
-        else:
-            known_songs[song.url].append(path)
+        song_files.append((song, path))
+
+    return song_files
+
+
+def gather_known_songs(output: str, output_format: str) -> Dict[str, List[Path]]:
+    """
+    Gather all known songs from the output directory
+
+    ### Arguments
+    - output: Output path template
+    - output_format: Output format
+
+    ### Returns
+    - Dictionary containing all known songs and their paths
+    """
+
+    known_songs: Dict[str, List[Path]] = {}
+    for song, path in gather_known_song_files(output, output_format):
+        known_songs.setdefault(song.url, []).append(path)
 
     return known_songs
 
@@ -8,25 +8,64 @@
 ```
 """
 
+import heapq
+import itertools
 import json
 import logging
-from typing import Dict, Optional
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import requests
 from spotipy import Spotify
 from spotipy.cache_handler import CacheFileHandler, MemoryCacheHandler
+from spotipy.exceptions import SpotifyException
 from spotipy.oauth2 import SpotifyClientCredentials, SpotifyOAuth
+from urllib3.util.retry import Retry
 
 from spotdl.utils.config import get_cache_path, get_spotify_cache_path
 
 __all__ = [
+    "PRIORITY_INTERACTIVE",
+    "PRIORITY_DEFAULT",
+    "PRIORITY_BULK",
+    "REQUESTS_PER_SECOND",
+    "REQUEST_BURST",
+    "RATE_LIMIT_RETRIES",
     "SpotifyError",
     "SpotifyClient",
+    "RequestScheduler",
+    "get_scheduler",
+    "get_retry_after",
+    "get_endpoint",
+    "get_request_priority",
+    "request_priority",
     "save_spotify_cache",
 ]
 
+# Request priorities, lower values are sent first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_BULK = 2
+
+# Token bucket of the request scheduler
+REQUESTS_PER_SECOND = 20.0
+REQUEST_BURST = 40
+
+# Number of times a rate limited request is retried
+RATE_LIMIT_RETRIES = 5
+
 logger = logging.getLogger(__name__)
 
+request_priority_var: ContextVar[int] = ContextVar(
+    "request_priority", default=PRIORITY_DEFAULT
+)
+
 
 class SpotifyError(Exception):
     """
@@ -34,6 +73,191 @@ class SpotifyError(Exception):
     """
 
 
+@contextmanager
+def request_priority(priority: int) -> Iterator[None]:
+    """
+    Set the priority of the Spotify requests made in this context.
+
+    ### Arguments
+    - priority: One of the `PRIORITY_*` constants.
+    """
+
+    token = request_priority_var.set(priority)
+    try:
+        yield
+    finally:
+        request_priority_var.reset(token)
+
+
+def get_request_priority() -> int:
+    """
+    Get the priority of the Spotify requests made in this context.
+
+    ### Returns
+    - The priority, `PRIORITY_DEFAULT` if none was set.
+    """
+
+    return request_priority_var.get()
+
+
+def get_endpoint(url: str) -> str:
+    """
+    Get the endpoint of a Spotify api url, used to group the cache metrics.
+
+    ### Arguments
+    - url: Relative or absolute url of the request.
+
+    ### Returns
+    - The first segment of the path, for example `albums` or `artists`.
+    """
+
+    path = url.split("?", 1)[0].split("/v1/", 1)[-1]
+
+    return path.strip("/").split("/", 1)[0]
+
+
+def get_retry_after(exception: SpotifyException, attempt: int = 0) -> float:
+    """
+    Get the number of seconds to wait after a rate limited request.
+
+    ### Arguments
+    - exception: The exception raised by spotipy.
+    - attempt: Number of the failed attempt, used for the exponential backoff
+        when Spotify doesn't send a `Retry-After` header.
+
+    ### Returns
+    - The number of seconds to wait.
+    """
+
+    try:
+        return float((exception.headers or {})["Retry-After"])
+    except (KeyError, TypeError, ValueError):
+        return float(2**attempt)
+
+
+class RequestScheduler:
+    """
+    Coordinates the Spotify requests of all threads.
+    Requests are limited by a token bucket and sent in order of priority,
+    a rate limited response pauses every request for its `Retry-After` delay.
+    """
+
+    def __init__(self, rate: float = REQUESTS_PER_SECOND, burst: int = REQUEST_BURST):
+        """
+        Initialize the scheduler.
+
+        ### Arguments
+        - rate: Number of requests per second.
+        - burst: Number of requests that can be sent at once.
+        """
+
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.resume_at = 0.0
+        self.condition = threading.Condition()
+        self.waiting: List[Tuple[int, int]] = []
+        self.tickets = itertools.count()
+        self.metrics: Dict[str, float] = {
+            "requests": 0,
+            "queue_wait": 0.0,
+            "max_queue_wait": 0.0,
+            "throttled": 0,
+            "backoff": 0.0,
+        }
+
+    def acquire(self, priority: Optional[int] = None):
+        """
+        Wait until a request can be sent.
+
+        ### Arguments
+        - priority: Priority of the request,
+            defaults to the priority set with `request_priority`.
+        """
+
+        if priority is None:
+            priority = get_request_priority()
+
+        started = time.monotonic()
+        with self.condition:
+            ticket = (priority, next(self.tickets))
+            heapq.heappush(self.waiting, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self.tokens = min(
+                        self.burst, self.tokens + (now - self.updated) * self.rate
+                    )
+                    self.updated = now
+
+                    delay: Optional[float] = None
+                    if self.waiting[0] == ticket:
+                        delay = max(self.resume_at - now, (1 - self.tokens) / self.rate)
+                        if delay <= 0:
+                            self.tokens -= 1
+                            break
+
+                    self.condition.wait(delay)
+            finally:
+                self.waiting.remove(ticket)
+                heapq.heapify(self.waiting)
+                self.condition.notify_all()
+
+            queue_wait = time.monotonic() - started
+            self.metrics["requests"] += 1
+            self.metrics["queue_wait"] += queue_wait
+            self.metrics["max_queue_wait"] = max(
+                self.metrics["max_queue_wait"], queue_wait
+            )
+
+    def throttle(self, seconds: float):
+        """
+        Pause every request after a rate limited response.
+
+        ### Arguments
+        - seconds: Number of seconds to wait, from the `Retry-After` header.
+        """
+
+        logger.debug("Rate limited by Spotify, pausing requests for %ss", seconds)
+
+        with self.condition:
+            self.resume_at = max(self.resume_at, time.monotonic() + seconds)
+            self.metrics["throttled"] += 1
+            self.metrics["backoff"] += seconds
+            self.condition.notify_all()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get the scheduler metrics.
+
+        ### Returns
+        - Dict with the number of requests, the total, average and maximum
+            queue wait, the number of throttle events and the total backoff.
+        """
+
+        with self.condition:
+            metrics: Dict[str, Any] = dict(self.metrics)
+
+        metrics["average_queue_wait"] = (
+            metrics["queue_wait"] / metrics["requests"] if metrics["requests"] else 0.0
+        )
+
+        return metrics
+
+
+@lru_cache(maxsize=None)
+def get_scheduler() -> RequestScheduler:
+    """
+    Get the request scheduler shared by the whole process.
+
+    ### Returns
+    - The request scheduler.
+    """
+
+    return RequestScheduler()
+
+
 class Singleton(type):
     """
     Singleton metaclass for SpotifyClient. Ensures that SpotifyClient is not
@@ -126,7 +350,7 @@ def init(  # pylint: disable=bad-mcs-method-argument
         self._instance = super().__call__(
             auth=auth_token,
             auth_manager=credential_manager,
-            status_forcelist=(429, 500, 502, 503, 504, 404),
+            status_forcelist=(500, 502, 503, 504, 404),
         )
 
         # Return instance
@@ -143,6 +367,15 @@ class SpotifyClient(Spotify, metaclass=Singleton):
     _initialized = False
     cache: Dict[str, Optional[Dict]] = {}
 
+    # Guards the cache, the in flight requests and the cache metrics
+    cache_lock = threading.Lock()
+    in_flight: Dict[str, Future] = {}
+    cache_metrics: Dict[str, Counter] = {
+        "hits": Counter(),
+        "misses": Counter(),
+        "coalesced": Counter(),
+    }
+
     def __init__(self, *args, **kwargs):
         """
         Initializes the SpotifyClient.
@@ -165,10 +398,64 @@ def __init__(self, *args, **kwargs):
             with open(cache_file_loc, "w", encoding="utf-8") as cache_file:
                 json.dump(self.cache, cache_file)
 
+    def _build_session(self):
+        """
+        Build the requests session.
+        Rate limited requests are not retried by urllib3, which would block
+        the thread, they are retried by the request scheduler instead.
+        """
+
+        self._session = requests.Session()
+        retry = Retry(
+            total=self.retries,
+            connect=None,
+            read=False,
+            allowed_methods=frozenset(["GET", "POST", "PUT", "DELETE"]),
+            status=self.status_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=self.status_forcelist,
+            respect_retry_after_header=False,
+        )
+
+        adapter = requests.adapters.HTTPAdapter(max_retries=retry)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def clear_cache(self, keep_tracks: bool = True):
+        """
+        Remove the cached responses, so that lists that may have changed
+        are fetched again by long running operations.
+
+        ### Arguments
+        - keep_tracks: Whether to keep the cached tracks.
+        """
+
+        with self.cache_lock:
+            for key in list(self.cache):
+                if not keep_tracks or "tracks/" not in key:
+                    self.cache.pop(key, None)
+
+    @classmethod
+    def get_cache_metrics(cls) -> Dict[str, Dict[str, int]]:
+        """
+        Get the number of cache hits, misses and coalesced requests.
+
+        ### Returns
+        - Dict of metric to a dict of endpoint (like `albums`) to count.
+            Coalesced requests waited for an identical request in flight
+            instead of sending their own.
+        """
+
+        with cls.cache_lock:
+            return {
+                metric: dict(counts) for metric, counts in cls.cache_metrics.items()
+            }
+
     def _get(self, url, args=None, payload=None, **kwargs):
         """
         Overrides the get method of the SpotifyClient.
-        Allows us to cache requests
+        Allows us to cache requests, concurrent identical requests
+        share a single call to Spotify.
         """
 
         use_cache = not self.no_cache  # type: ignore # pylint: disable=E1101
@@ -176,30 +463,75 @@ def _get(self, url, args=None, payload=None, **kwargs):
         if args:
             kwargs.update(args)
 
-        cache_key = None
-        if use_cache:
-            key_obj = dict(kwargs)
-            key_obj["url"] = url
-            key_obj["data"] = json.dumps(payload)
-            cache_key = json.dumps(key_obj)
-            if cache_key is None:
-                cache_key = url
-            if self.cache.get(cache_key) is not None:
-                return self.cache[cache_key]
+        key_obj = dict(kwargs)
+        key_obj["url"] = url
+        key_obj["data"] = json.dumps(payload)
+        cache_key = json.dumps(key_obj)
+        endpoint = get_endpoint(url)
+
+        with self.cache_lock:
+            cached = self.cache.get(cache_key) if use_cache else None
+            if cached is not None:
+                self.cache_metrics["hits"][endpoint] += 1
+                return cached
+
+            flight = self.in_flight.get(cache_key)
+            if flight is None:
+                flight = self.in_flight[cache_key] = Future()
+                self.cache_metrics["misses"][endpoint] += 1
+                leader = True
+            else:
+                self.cache_metrics["coalesced"][endpoint] += 1
+                leader = False
+
+        if not leader:
+            return flight.result()
+
+        try:
+            response = self._send_get(url, payload, kwargs)
+        except BaseException as exc:
+            with self.cache_lock:
+                self.in_flight.pop(cache_key, None)
+
+            flight.set_exception(exc)
+            raise
+
+        with self.cache_lock:
+            if use_cache:
+                self.cache[cache_key] = response
+
+            self.in_flight.pop(cache_key, None)
+
+        flight.set_result(response)
+
+        return response
+
+    def _send_get(self, url, payload, params):
+        """
+        Send a GET request through the request scheduler.
+        Connection errors are retried up to `max_retries` times,
+        rate limited requests up to `RATE_LIMIT_RETRIES` times.
+        """
 
         # Wrap in a try-except and retry up to `retries` times.
         response = None
         retries = self.max_retries  # type: ignore # pylint: disable=E1101
+        throttle_retries = 0
+        scheduler = get_scheduler()
         while response is None:
+            scheduler.acquire()
             try:
-                response = self._internal_call("GET", url, payload, kwargs)
+                response = self._internal_call("GET", url, payload, params)
             except (requests.exceptions.Timeout, requests.ConnectionError) as exc:
                 retries -= 1
                 if retries <= 0:
                     raise exc
+            except SpotifyException as exc:
+                if exc.http_status != 429 or throttle_retries >= RATE_LIMIT_RETRIES:
+                    raise exc
 
-        if use_cache and cache_key is not None:
-            self.cache[cache_key] = response
+                scheduler.throttle(get_retry_after(exc, throttle_retries))
+                throttle_retries += 1
 
         return response
 
@@ -217,11 +549,12 @@ def save_spotify_cache(cache: Dict[str, Optional[Dict]]):
     logger.debug("Saving Spotify cache to %s", cache_file_loc)
 
     # Only cache tracks
-    cache = {
-        key: value
-        for key, value in cache.items()
-        if value is not None and "tracks/" in key
-    }
+    with SpotifyClient.cache_lock:
+        cache = {
+            key: value
+            for key, value in cache.items()
+            if value is not None and "tracks/" in key
+        }
 
     with open(cache_file_loc, "w", encoding="utf-8") as cache_file:
         json.dump(cache, cache_file)
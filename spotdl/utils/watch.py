@@ -0,0 +1,113 @@
+"""
+Module for detecting changes of the lists in a sync file
+without fetching their tracks.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from spotdl.utils.spotify import SpotifyClient
+
+__all__ = ["ALBUMS_PER_REQUEST", "get_snapshot_id", "get_snapshot_ids"]
+
+# Maximum number of albums per request to the albums endpoint
+ALBUMS_PER_REQUEST = 20
+
+logger = logging.getLogger(__name__)
+
+
+def get_snapshot_id(query: str) -> Optional[str]:
+    """
+    Get a value that changes when the songs of a query change.
+
+    ### Arguments
+    - query: The query, as stored in the sync file.
+
+    ### Returns
+    - The snapshot id, or None if changes can't be detected
+        and the query has to be fetched again.
+
+    ### Notes
+    - Playlists use their `snapshot_id`, artists the number and the
+        most recent of their albums, saved tracks the number and the most
+        recently saved track. Tracks never change.
+    """
+
+    spotify_client = SpotifyClient()
+    snapshot_id: Optional[str] = None
+
+    if "open.spotify.com" in query and "track" in query:
+        snapshot_id = "track"
+    elif "open.spotify.com" in query and "playlist" in query:
+        playlist = spotify_client.playlist(query, fields="snapshot_id")
+        if playlist:
+            snapshot_id = playlist["snapshot_id"]
+    elif "open.spotify.com" in query and "artist" in query:
+        albums = spotify_client.artist_albums(
+            query, include_groups="album,single,compilation", limit=1
+        )
+        if albums:
+            items = albums["items"]
+            snapshot_id = f"{albums['total']}:{items[0]['id'] if items else ''}"
+    elif query == "saved":
+        saved_tracks = spotify_client.current_user_saved_tracks(limit=1)
+        if saved_tracks:
+            items = saved_tracks["items"]
+            latest = (
+                f"{items[0]['track']['id']}@{items[0]['added_at']}" if items else ""
+            )
+            snapshot_id = f"{saved_tracks['total']}:{latest}"
+
+    return snapshot_id
+
+
+def get_snapshot_ids(queries: List[str], threads: int = 1) -> Dict[str, Optional[str]]:
+    """
+    Get the snapshot ids of several queries.
+    Albums are checked in bulk, the other queries concurrently.
+
+    ### Arguments
+    - queries: The queries.
+    - threads: Number of concurrent requests.
+
+    ### Returns
+    - Dict of query to snapshot id, None for queries that have to be fetched again.
+    """
+
+    def safe_snapshot_id(query: str) -> Optional[str]:
+        try:
+            return get_snapshot_id(query)
+        except Exception as exception:  # pylint: disable=W0718
+            logger.debug("Could not check %s for changes: %s", query, exception)
+            return None
+
+    album_queries: List[str] = []
+    other_queries: List[str] = []
+    for query in queries:
+        if "open.spotify.com" in query and "album" in query:
+            album_queries.append(query)
+        else:
+            other_queries.append(query)
+
+    snapshot_ids: Dict[str, Optional[str]] = {}
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        snapshot_ids.update(
+            zip(other_queries, executor.map(safe_snapshot_id, other_queries))
+        )
+
+    spotify_client = SpotifyClient()
+    for index in range(0, len(album_queries), ALBUMS_PER_REQUEST):
+        chunk = album_queries[index : index + ALBUMS_PER_REQUEST]
+        try:
+            albums = (spotify_client.albums(chunk) or {}).get("albums") or []
+        except Exception as exception:  # pylint: disable=W0718
+            logger.debug("Could not check albums for changes: %s", exception)
+            albums = []
+
+        for query, album in zip(chunk, albums):
+            snapshot_ids[query] = (
+                f"{album['id']}:{album['total_tracks']}" if album else None
+            )
+
+    return {query: snapshot_ids.get(query) for query in queries}
@@ -9,9 +9,10 @@
 import mimetypes
 import os
 import shutil
+import threading
 from argparse import Namespace
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple, Union
 
 from fastapi import (
     APIRouter,
@@ -29,7 +30,6 @@
 from uvicorn import Server
 
 from spotdl._version import __version__
-from spotdl.download.downloader import Downloader
 from spotdl.download.progress_handler import ProgressHandler, SongTracker
 from spotdl.types.album import Album
 from spotdl.types.artist import Artist
@@ -48,6 +48,10 @@
 )
 from spotdl.utils.github import RateLimitError, get_latest_version, get_status
 from spotdl.utils.search import get_search_results
+from spotdl.utils.spotify import PRIORITY_INTERACTIVE, request_priority
+
+if TYPE_CHECKING:
+    from spotdl.utils.web_engine import DownloadEngine
 
 __all__ = [
     "ALLOWED_ORIGINS",
@@ -111,6 +115,9 @@ class Client:
     Holds the client's state.
     """
 
+    # Minimum delay between two progress flushes (at most 5 updates per second)
+    update_interval = 0.2
+
     def __init__(
         self,
         websocket: WebSocket,
@@ -134,11 +141,17 @@ def __init__(
 
         self.websocket = websocket
         self.client_id = client_id
-        self.downloader = Downloader(
-            settings=self.downloader_settings, loop=app_state.loop
-        )
 
-        self.downloader.progress_handler.web_ui = True
+        # Latest (progress, message) of every song that changed since the last flush
+        self.pending_updates: Dict[SongTracker, Tuple[int, str]] = {}
+        self.update_lock = threading.Lock()
+        self.flush_scheduled = False
+
+        # Last song payload sent for every running job
+        self.sent_songs: Dict[SongTracker, Dict[str, Any]] = {}
+
+        # Running batch downloads
+        self.batch_tasks: Set[asyncio.Future] = set()
 
     async def connect(self):
         """
@@ -163,22 +176,116 @@ async def send_update(self, update: Dict[str, Any]):
 
     def song_update(self, progress_handler: SongTracker, message: str):
         """
-        Called when a song updates.
+        Called when a song updates, from the download worker threads.
+        Updates are coalesced and sent by `flush_updates` on the event loop.
+
+        ### Arguments
+        - progress_handler: The progress handler.
+        - message: The message to send.
+        """
+
+        with self.update_lock:
+            self.pending_updates[progress_handler] = (
+                int(progress_handler.progress),
+                message,
+            )
+
+            if self.flush_scheduled:
+                return
+
+            self.flush_scheduled = True
+
+        app_state.loop.call_soon_threadsafe(
+            lambda: asyncio.ensure_future(self.flush_updates())
+        )
+
+    def create_update(
+        self, progress_handler: SongTracker, progress: int, message: str
+    ) -> Dict[str, Any]:
+        """
+        Create the update message for a song. The full song is sent
+        with the first update of a job and whenever its fields change,
+        the other updates only identify the song.
 
         ### Arguments
         - progress_handler: The progress handler.
+        - progress: The progress of the song.
         - message: The message to send.
+
+        ### Returns
+        - returns the update message.
         """
 
-        update_message = {
-            "song": progress_handler.song.json,
-            "progress": progress_handler.progress,
+        song = progress_handler.song
+        song_data = song.json
+        if self.sent_songs.get(progress_handler) == song_data:
+            song_data = {"song_id": song.song_id, "url": song.url}
+        else:
+            self.sent_songs[progress_handler] = song_data
+
+        # The job is finished, no more updates will follow
+        if progress >= 100 or message == "Error":
+            self.sent_songs.pop(progress_handler, None)
+
+        return {
+            "song": song_data,
+            "progress": progress,
             "message": message,
         }
 
-        asyncio.run_coroutine_threadsafe(
-            self.send_update(update_message), app_state.loop
-        )
+    async def flush_updates(self):
+        """
+        Send the pending updates until there are none left.
+        While a slow client is still receiving, new updates replace the pending
+        ones, so the memory used and the work done on the loop stay bounded.
+        """
+
+        while True:
+            with self.update_lock:
+                pending = self.pending_updates
+                self.pending_updates = {}
+
+                if not pending:
+                    self.flush_scheduled = False
+                    return
+
+            try:
+                for progress_handler, (progress, message) in pending.items():
+                    await self.send_update(
+                        self.create_update(progress_handler, progress, message)
+                    )
+            except Exception as exception:  # pylint: disable=W0703
+                app_state.logger.debug(
+                    "Failed to send updates to client %s: %s",
+                    self.client_id,
+                    exception,
+                )
+
+                with self.update_lock:
+                    self.pending_updates.clear()
+                    self.sent_songs.clear()
+                    self.flush_scheduled = False
+
+                return
+
+            await asyncio.sleep(self.update_interval)
+
+    def create_job_settings(self) -> DownloaderOptions:
+        """
+        Create the settings of a new download job.
+
+        ### Returns
+        - returns a copy of the client's settings with the output set
+            to the client's session directory if needed.
+        """
+
+        job_settings = DownloaderOptions(**self.downloader_settings)  # type: ignore
+        if not app_state.web_settings.get("web_use_output_dir", False):
+            job_settings["output"] = str(
+                (get_spotdl_path() / f"web/sessions/{self.client_id}").absolute()
+            )
+
+        return job_settings
 
     @classmethod
     def get_instance(cls, client_id: str) -> Optional["Client"]:
@@ -211,6 +318,7 @@ class ApplicationState:
     loop: asyncio.AbstractEventLoop
     web_settings: WebOptions
     downloader_settings: DownloaderOptions
+    engine: "DownloadEngine"
     clients: Dict[str, Client] = {}
     logger: logging.Logger
 
@@ -266,7 +374,11 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
         while True:
             await websocket.receive_json()
     except WebSocketDisconnect:
-        app_state.clients.pop(client_id, None)
+        client = app_state.clients.pop(client_id, None)
+        app_state.engine.forget_client(client_id)
+        if client is not None:
+            for task in list(client.batch_tasks):
+                task.cancel()
 
         if (
             len(app_state.clients) == 0
@@ -302,7 +414,8 @@ def song_from_url(url: str) -> Song:
     - returns the first result as a Song object.
     """
 
-    return Song.from_url(url)
+    with request_priority(PRIORITY_INTERACTIVE):
+        return Song.from_url(url)
 
 
 @router.get("/api/url", response_model=None)
@@ -317,17 +430,18 @@ def songs_from_url(url: str) -> List[Song]:
     - returns a list with Song objects to be downloaded.
     """
 
-    if "playlist" in url:
-        playlist = Playlist.from_url(url)
-        return list(map(Song.from_url, playlist.urls))
-    if "album" in url:
-        album = Album.from_url(url)
-        return list(map(Song.from_url, album.urls))
-    if "artist" in url:
-        artist = Artist.from_url(url)
-        return list(map(Song.from_url, artist.urls))
+    with request_priority(PRIORITY_INTERACTIVE):
+        if "playlist" in url:
+            playlist = Playlist.from_url(url)
+            return list(map(Song.from_url, playlist.urls))
+        if "album" in url:
+            album = Album.from_url(url)
+            return list(map(Song.from_url, album.urls))
+        if "artist" in url:
+            artist = Artist.from_url(url)
+            return list(map(Song.from_url, artist.urls))
 
-    return [Song.from_url(url)]
+        return [Song.from_url(url)]
 
 
 @router.get("/api/version", response_model=None)
@@ -350,6 +464,8 @@ async def shutdown_event():
     Called when the server is shutting down.
     """
 
+    app_state.engine.close()
+
     if (
         not app_state.web_settings["keep_sessions"]
         and not app_state.web_settings["web_use_output_dir"]
@@ -372,7 +488,8 @@ def query_search(query: str) -> List[Song]:
     - returns a list of Song objects.
     """
 
-    return get_search_results(query)
+    with request_priority(PRIORITY_INTERACTIVE):
+        return get_search_results(query)
 
 
 @router.post("/api/download/url")
@@ -391,24 +508,23 @@ async def download_url(
     - returns the file path if the song was downloaded.
     """
 
-    if state.web_settings.get("web_use_output_dir", False):
-        client.downloader.settings["output"] = client.downloader_settings["output"]
-    else:
-        client.downloader.settings["output"] = str(
-            (get_spotdl_path() / f"web/sessions/{client.client_id}").absolute()
-        )
+    # Settings are applied per job, the downloader itself is shared
+    job_settings = client.create_job_settings()
 
-    client.downloader.progress_handler = ProgressHandler(
+    progress_handler = ProgressHandler(
         simple_tui=True,
         update_callback=client.song_update,
     )
 
     try:
         # Fetch song metadata
-        song = Song.from_url(url)
+        with request_priority(PRIORITY_INTERACTIVE):
+            song = Song.from_url(url)
 
         # Download Song
-        _, path = await client.downloader.pool_download(song)
+        _, path = await state.engine.download(
+            client.client_id, song, job_settings, progress_handler
+        )
 
         if path is None:
             state.logger.error(f"Failure downloading {song.name}")
@@ -485,7 +601,8 @@ def update_settings(
     state: ApplicationState = Depends(get_current_state),
 ) -> DownloaderOptions:
     """
-    Update client settings, and re-initialize downloader.
+    Update client settings. They are applied to the client's next downloads,
+    the shared download engine warms a new downloader only if needed.
 
     ### Arguments
     - settings: The settings to change.
@@ -506,12 +623,7 @@ def update_settings(
 
     new_settings = DownloaderOptions(**settings_cpy)  # type: ignore
 
-    # Re-initialize downloader
     client.downloader_settings = new_settings
-    client.downloader = Downloader(
-        new_settings,
-        loop=state.loop,
-    )
 
     return new_settings
 
@@ -579,6 +691,7 @@ def get_options() -> Dict[str, Any]:
         "keep_sessions",
         "log_level",
         "simple_tui",
+        "no_preflight",
         "headless",
         "download_ffmpeg",
         "generate_config",
@@ -0,0 +1,480 @@
+"""
+Module with the download engine shared by the web clients
+and the batch download endpoint.
+"""
+
+import asyncio
+import copy
+import uuid
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from spotdl.download.downloader import Downloader
+from spotdl.download.progress_handler import ProgressHandler
+from spotdl.types.options import DownloaderOptions
+from spotdl.types.song import Song
+from spotdl.utils.config import modernize_settings
+from spotdl.utils.library import FileIndex
+from spotdl.utils.search import get_simple_songs, reinit_songs
+from spotdl.utils.web import ApplicationState, Client, get_client, get_current_state
+
+__all__ = [
+    "ENGINE_OPTIONS",
+    "DownloadEngine",
+    "batch_router",
+    "resolve_batch",
+    "run_batch",
+    "download_batch",
+]
+
+# Settings that are baked into a Downloader when it is constructed
+# (providers, ffmpeg, archive, proxy...). Jobs whose settings differ
+# only in other options can share the same warmed Downloader.
+ENGINE_OPTIONS = (
+    "audio_providers",
+    "lyrics_providers",
+    "genius_token",
+    "format",
+    "ffmpeg",
+    "cookie_file",
+    "search_query",
+    "filter_results",
+    "yt_dlp_args",
+    "proxy",
+    "archive",
+    "scan_for_songs",
+    "detect_formats",
+)
+
+
+class DownloadEngine:
+    """
+    Server-wide download engine shared by all the web clients.
+
+    Keeps a small pool of warmed Downloader instances, enforces a global
+    concurrency budget and schedules the queued jobs round-robin between
+    clients, so one client with a large queue can't starve the others.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        max_workers: int,
+        max_downloaders: int = 4,
+    ):
+        """
+        Initialize the download engine.
+
+        ### Arguments
+        - loop: The event loop used by the web server.
+        - max_workers: The maximum number of concurrent downloads for all clients.
+        - max_downloaders: The maximum number of warmed downloaders to keep.
+        """
+
+        self.loop = loop
+        self.max_workers = max(1, max_workers)
+        self.max_downloaders = max(1, max_downloaders)
+        self.active = 0
+
+        self.downloaders: "OrderedDict[Tuple, Downloader]" = OrderedDict()
+        self.retired: List[Downloader] = []
+        self.queues: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self.downloader_lock: Optional[asyncio.Lock] = None
+
+    @staticmethod
+    def get_engine_key(settings: DownloaderOptions) -> Tuple:
+        """
+        Get the key of the downloader that can run a job with these settings.
+
+        ### Arguments
+        - settings: The job settings.
+
+        ### Returns
+        - returns a hashable key.
+        """
+
+        options = list(ENGINE_OPTIONS)
+
+        # Known songs are gathered from the output directory
+        if settings.get("scan_for_songs"):
+            options.append("output")
+
+        return tuple(
+            (option, repr(settings.get(option))) for option in options  # type: ignore
+        )
+
+    def get_cached_downloader(
+        self, settings: DownloaderOptions
+    ) -> Optional[Downloader]:
+        """
+        Get an already warmed downloader for these settings.
+
+        ### Arguments
+        - settings: The job settings.
+
+        ### Returns
+        - returns the downloader or None if it has not been created yet.
+        """
+
+        key = self.get_engine_key(settings)
+        downloader = self.downloaders.get(key)
+        if downloader is not None:
+            self.downloaders.move_to_end(key)
+
+        return downloader
+
+    def warm_up(self, settings: DownloaderOptions) -> Downloader:
+        """
+        Create the downloader for these settings synchronously, if needed.
+
+        ### Arguments
+        - settings: The job settings.
+
+        ### Returns
+        - returns the warmed downloader.
+        """
+
+        downloader = self.get_cached_downloader(settings)
+        if downloader is not None:
+            return downloader
+
+        downloader = Downloader(settings=settings, loop=self.loop)
+        self.downloaders[self.get_engine_key(settings)] = downloader
+
+        # Drop the least recently used downloaders,
+        # they are closed once their running jobs are done
+        while len(self.downloaders) > self.max_downloaders:
+            self.retired.append(self.downloaders.popitem(last=False)[1])
+
+        return downloader
+
+    async def get_downloader(self, settings: DownloaderOptions) -> Downloader:
+        """
+        Get a downloader for the job, creating it in a thread if needed.
+
+        ### Arguments
+        - settings: The job settings.
+
+        ### Returns
+        - returns the warmed downloader.
+        """
+
+        downloader = self.get_cached_downloader(settings)
+        if downloader is not None:
+            return downloader
+
+        if self.downloader_lock is None:
+            self.downloader_lock = asyncio.Lock()
+
+        async with self.downloader_lock:
+            return await self.loop.run_in_executor(None, self.warm_up, settings)
+
+    def create_job(
+        self,
+        downloader: Downloader,
+        settings: DownloaderOptions,
+        progress_handler: ProgressHandler,
+    ) -> Downloader:
+        """
+        Create a lightweight per-job view of a warmed downloader.
+
+        ### Arguments
+        - downloader: The warmed downloader.
+        - settings: The job settings.
+        - progress_handler: The progress handler of the job.
+
+        ### Returns
+        - returns a shallow copy of the downloader, sharing providers, archive
+            and known songs but using the job's settings and progress handler.
+        """
+
+        job = copy.copy(downloader)
+        job.settings = DownloaderOptions(**settings)  # type: ignore
+        modernize_settings(job.settings)
+        job.progress_handler = progress_handler
+        job.errors = []
+
+        # Files might have been added or removed since the downloader was warmed
+        job.file_index = FileIndex()
+
+        return job
+
+    def dispatch(self):
+        """
+        Start as many queued jobs as the budget allows,
+        taking one job per client in turn.
+        """
+
+        while self.active < self.max_workers and self.queues:
+            client_id, queue = self.queues.popitem(last=False)
+            ticket = queue.popleft()
+
+            # Put the client at the back of the line
+            if queue:
+                self.queues[client_id] = queue
+
+            if ticket.done():
+                continue
+
+            self.active += 1
+            ticket.set_result(None)
+
+    def release(self):
+        """
+        Give back a slot of the budget.
+        """
+
+        self.active -= 1
+        self.dispatch()
+
+        # Jobs get their downloader after taking a slot,
+        # so no job uses a retired downloader when no slot is taken
+        if self.active == 0:
+            while self.retired:
+                self.retired.pop().close(wait=False)
+
+    async def download(
+        self,
+        client_id: str,
+        song: Song,
+        settings: DownloaderOptions,
+        progress_handler: ProgressHandler,
+    ) -> Tuple[Song, Optional[Path]]:
+        """
+        Queue a song for download and wait for the result.
+
+        ### Arguments
+        - client_id: The id of the client that requested the download.
+        - song: The song to download.
+        - settings: The job settings.
+        - progress_handler: The progress handler of the job.
+
+        ### Returns
+        - tuple with the song and the path to the downloaded file if successful.
+        """
+
+        ticket = self.loop.create_future()
+        self.queues.setdefault(client_id, deque()).append(ticket)
+        self.dispatch()
+
+        try:
+            await ticket
+        except asyncio.CancelledError:
+            # The slot was granted right before the request got cancelled
+            if ticket.done() and not ticket.cancelled():
+                self.release()
+            raise
+
+        try:
+            downloader = await self.get_downloader(settings)
+            job = self.create_job(downloader, settings, progress_handler)
+
+            return await self.loop.run_in_executor(None, job.search_and_download, song)
+        finally:
+            self.release()
+
+    def close(self):
+        """
+        Stop the conversion workers of all the downloaders.
+        """
+
+        for downloader in [*self.downloaders.values(), *self.retired]:
+            downloader.close(wait=False)
+
+        self.downloaders.clear()
+        self.retired.clear()
+
+    def forget_client(self, client_id: str):
+        """
+        Cancel the queued jobs of a client that disconnected.
+
+        ### Arguments
+        - client_id: The client's ID.
+        """
+
+        queue = self.queues.pop(client_id, None)
+        for ticket in queue or []:
+            ticket.cancel()
+
+
+batch_router = APIRouter()
+
+
+def resolve_batch(urls: List[str], settings: DownloaderOptions) -> List[Song]:
+    """
+    Resolve the urls of a batch download into fully populated songs.
+    Track urls and the songs of lists are fetched in bulk from Spotify.
+
+    ### Arguments
+    - urls: Track, album, playlist, artist urls or search queries.
+    - settings: The job settings.
+
+    ### Returns
+    - returns the list of songs to download.
+    """
+
+    track_urls = [
+        url
+        for url in urls
+        if "open.spotify.com" in url and "/track/" in url and "|" not in url
+    ]
+    other_queries = [url for url in urls if url not in track_urls]
+
+    songs = Song.list_from_urls(track_urls) if track_urls else []
+
+    if other_queries:
+        list_songs = get_simple_songs(
+            other_queries,
+            use_ytm_data=settings["ytm_data"],
+            playlist_numbering=settings["playlist_numbering"],
+            album_type=settings["album_type"],
+            playlist_retain_track_cover=settings["playlist_retain_track_cover"],
+        )
+
+        songs.extend(reinit_songs(list_songs))
+
+    # Remove duplicates
+    return list({song.url: song for song in songs}.values())
+
+
+async def run_batch(
+    batch_id: str,
+    songs: List[Song],
+    job_settings: DownloaderOptions,
+    client: Client,
+    state: ApplicationState,
+):
+    """
+    Download the songs of a batch through the shared engine
+    and stream the result of every song to the client.
+
+    ### Arguments
+    - batch_id: The id of the batch.
+    - songs: The songs to download.
+    - job_settings: The job settings.
+    - client: The client's state.
+    - state: The application state.
+    """
+
+    async def notify(update: Dict[str, Any]):
+        try:
+            await client.send_update({"batch_id": batch_id, **update})
+        except Exception:  # pylint: disable=W0703
+            state.logger.debug("Client %s is gone", client.client_id)
+
+    try:
+        downloader = await state.engine.get_downloader(job_settings)
+    except Exception as exception:  # pylint: disable=W0703
+        state.logger.error(f"Error starting batch {batch_id}! {exception}")
+
+        await notify(
+            {
+                "finished": True,
+                "downloaded": 0,
+                "failed": len(songs),
+                "error": str(exception),
+            }
+        )
+
+        return
+
+    if job_settings["archive"]:
+        songs = [song for song in songs if song.url not in downloader.url_archive]
+
+    progress_handler = ProgressHandler(
+        simple_tui=True,
+        update_callback=client.song_update,
+    )
+    progress_handler.set_song_count(len(songs))
+
+    async def download(song: Song) -> Tuple[Song, Optional[Path]]:
+        path = None
+        error = None
+        try:
+            song, path = await state.engine.download(
+                client.client_id, song, job_settings, progress_handler
+            )
+        except Exception as exception:  # pylint: disable=W0703
+            error = str(exception)
+
+        await notify(
+            {
+                "song": {"song_id": song.song_id, "url": song.url},
+                "path": str(path.absolute()) if path else None,
+                "error": error if path is None else None,
+            }
+        )
+
+        return song, path
+
+    results = await asyncio.gather(*[download(song) for song in songs])
+
+    if job_settings["archive"]:
+        for song, path in results:
+            if path or job_settings["add_unavailable"]:
+                downloader.url_archive.add(song.url)
+
+        downloader.url_archive.save(job_settings["archive"])
+
+    downloaded = len([path for _, path in results if path])
+    state.logger.info(
+        "Batch %s finished, downloaded %s/%s songs", batch_id, downloaded, len(songs)
+    )
+
+    await notify(
+        {
+            "finished": True,
+            "downloaded": downloaded,
+            "failed": len(results) - downloaded,
+        }
+    )
+
+
+@batch_router.post("/api/download/batch")
+async def download_batch(
+    urls: List[str],
+    client: Client = Depends(get_client),
+    state: ApplicationState = Depends(get_current_state),
+) -> Dict[str, Any]:
+    """
+    Download multiple songs, albums, playlists or artists in one job.
+    The result of every song is sent over the client's websocket
+    as soon as it is available.
+
+    ### Arguments
+    - urls: The urls (or search queries) to download.
+    - client: The client's state.
+    - state: The application state.
+
+    ### Returns
+    - returns the id of the batch and the songs that will be downloaded.
+    """
+
+    job_settings = client.create_job_settings()
+
+    try:
+        songs = await state.loop.run_in_executor(
+            None, resolve_batch, urls, job_settings
+        )
+    except Exception as exception:
+        state.logger.error(f"Error resolving batch! {exception}")
+
+        raise HTTPException(
+            status_code=400, detail=f"Error resolving batch: {exception}"
+        ) from exception
+
+    batch_id = uuid.uuid4().hex
+
+    task = asyncio.ensure_future(
+        run_batch(batch_id, songs, job_settings, client, state)
+    )
+    client.batch_tasks.add(task)
+    task.add_done_callback(client.batch_tasks.discard)
+
+    return {
+        "batch_id": batch_id,
+        "songs": [song.json for song in songs],
+    }
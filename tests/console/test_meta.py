@@ -0,0 +1,162 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Optional
+
+from mutagen.id3 import APIC, ID3
+
+import spotdl.console.meta
+from spotdl.console.meta import init_worker, meta
+from spotdl.types.song import Song
+from spotdl.utils.config import DOWNLOADER_OPTIONS, GlobalConfig
+from spotdl.utils.lyrics import SongLyrics
+from spotdl.utils.metadata import embed_metadata, get_file_metadata
+from spotdl.utils.search import QueryError
+
+
+def create_tagged_mp3(
+    path: Path,
+    url: Optional[str] = "https://open.spotify.com/track/1t2qKa8K72IBC8yQlhD9bU",
+    lyrics: Optional[str] = "lyrics",
+) -> Path:
+    """
+    Create a silent mp3 file with full metadata.
+    """
+
+    path.write_bytes((b"\xff\xfb\x90\x64" + b"\x00" * 413) * 100)
+
+    song = Song.from_missing_data(
+        name="Ropes",
+        artists=["Dirty Palm", "Chandler Jewels"],
+        artist="Dirty Palm",
+        album_name="Ropes",
+        disc_number=1,
+        disc_count=1,
+        track_number=1,
+        tracks_count=1,
+        date="2021-10-28",
+        isrc="GB2LD2110301",
+        publisher="",
+        url=url,
+        lyrics=lyrics,
+    )
+    embed_metadata(path, song)
+
+    tags = ID3(path)
+    tags.add(APIC(encoding=3, mime="image/jpeg", type=3, desc="Cover", data=b"art"))
+    tags.save(v2_version=3)
+
+    return path
+
+
+def test_meta_skips_unchanged_files(tmpdir, monkeypatch):
+    """
+    Test that a second run doesn't open files that didn't change.
+    """
+
+    monkeypatch.setattr(
+        spotdl.console.meta,
+        "get_meta_index_path",
+        lambda: Path(tmpdir) / "meta_index.json",
+    )
+
+    files = [create_tagged_mp3(Path(tmpdir) / f"song {i}.mp3") for i in range(3)]
+
+    read_files = []
+    read_file_metadata = spotdl.console.meta.read_file_metadata
+
+    def read_file_metadata_spy(path, id3_separator):
+        read_files.append(path)
+        return read_file_metadata(path, id3_separator)
+
+    monkeypatch.setattr(
+        spotdl.console.meta, "read_file_metadata", read_file_metadata_spy
+    )
+
+    downloader = SimpleNamespace(settings=dict(DOWNLOADER_OPTIONS))
+
+    meta([str(tmpdir)], downloader)  # type: ignore
+    assert sorted(read_files) == sorted(files)
+
+    read_files.clear()
+    meta([str(tmpdir)], downloader)  # type: ignore
+    assert read_files == []
+
+    # Changed files are processed again
+    create_tagged_mp3(files[0])
+    meta([str(tmpdir)], downloader)  # type: ignore
+    assert read_files == [files[0]]
+
+
+def test_meta_reinit_without_url(tmpdir, monkeypatch):
+    """
+    Test that tagged files without a Spotify url are looked up one by one.
+    """
+
+    monkeypatch.setattr(
+        spotdl.console.meta,
+        "get_meta_index_path",
+        lambda: Path(tmpdir) / "meta_index.json",
+    )
+
+    found_file = create_tagged_mp3(Path(tmpdir) / "found.mp3", url=None, lyrics=None)
+    missing_file = create_tagged_mp3(
+        Path(tmpdir) / "missing.mp3", url=None, lyrics=None
+    )
+
+    reinit_calls = []
+
+    def reinit_song(song):
+        if len(reinit_calls) == 1:
+            raise QueryError("Song not found")
+
+        reinit_calls.append(song)
+        return Song.from_missing_data(
+            **{
+                **song.json,
+                "publisher": "Publisher",
+                "url": "https://open.spotify.com/track/found",
+            }
+        )
+
+    monkeypatch.setattr(spotdl.console.meta, "reinit_song", reinit_song)
+    monkeypatch.setattr(spotdl.console.meta, "reinit_songs", lambda songs: songs)
+
+    downloader = SimpleNamespace(
+        settings=dict(DOWNLOADER_OPTIONS, threads=1),
+        lyrics_resolver=SimpleNamespace(
+            resolve_batch=lambda songs, _: [SongLyrics(lyrics="new lyrics")]
+            * len(songs)
+        ),
+    )
+
+    meta([str(found_file), str(missing_file)], downloader)  # type: ignore
+
+    assert [song.name for song in reinit_calls] == ["Ropes"]
+
+    found_meta = get_file_metadata(found_file)
+    assert found_meta is not None
+    assert found_meta["url"] == "https://open.spotify.com/track/found"
+    assert found_meta["lyrics"] == "new lyrics"
+
+    missing_meta = get_file_metadata(missing_file)
+    assert missing_meta is not None
+    assert missing_meta["lyrics"] is None
+
+
+def test_init_worker():
+    """
+    Test that spawned worker processes get the global config.
+    """
+
+    proxies = {"https": "http://localhost:8080"}
+    with ProcessPoolExecutor(
+        max_workers=1,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+        initargs=({"proxies": proxies},),
+    ) as executor:
+        assert (
+            executor.submit(GlobalConfig.get_parameter, "proxies").result() == proxies
+        )
@@ -0,0 +1,71 @@
+import re
+import subprocess
+import sys
+
+# Modules that must not be loaded just to start the cli.
+# Importing it used to take over 2 seconds, when every operation,
+# provider and the web server were loaded eagerly.
+LAZY_MODULES = [
+    "fastapi",
+    "uvicorn",
+    "yt_dlp",
+    "pykakasi",
+    "ytmusicapi",
+    "bs4",
+    "syncedlyrics",
+    "spotdl.download.downloader",
+    "spotdl.console.web",
+    "spotdl.console.download",
+    "spotdl.console.sync",
+    "spotdl.console.save",
+    "spotdl.console.meta",
+    "spotdl.console.url",
+    "spotdl.providers.audio",
+    "spotdl.providers.lyrics",
+    "spotdl.utils.web",
+    "spotdl.utils.search",
+    "spotdl.utils.metadata",
+]
+
+IMPORT_TIME_REGEX = re.compile(
+    r"^import time:\s+(?P<self>\d+) \|\s+(?P<cumulative>\d+) \|(?P<indent>\s+)(?P<name>\S+)$"
+)
+
+
+def get_imported_modules(module: str):
+    """
+    Run `python -X importtime` and get the names of the imported modules.
+    """
+
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    imported = set()
+    for line in process.stderr.splitlines():
+        match = IMPORT_TIME_REGEX.match(line)
+        if match:
+            imported.add(match.group("name"))
+
+    return imported
+
+
+def test_entry_point_lazy_imports():
+    """
+    Heavy dependencies should be loaded only by the operations that use them.
+    """
+
+    imported = get_imported_modules("spotdl.console.entry_point")
+
+    assert "spotdl.console.entry_point" in imported
+
+    loaded = [
+        module
+        for module in LAZY_MODULES
+        if any(name == module or name.startswith(module + ".") for name in imported)
+    ]
+
+    assert loaded == []
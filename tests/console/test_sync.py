@@ -0,0 +1,241 @@
+import json
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import spotdl.console.sync
+from spotdl.console.sync import execute_sync_plan, plan_sync, watch_cycle
+from spotdl.types.song import Song
+from spotdl.utils.config import DOWNLOADER_OPTIONS
+from spotdl.utils.library import FileIndex
+
+
+class FakeSpotifyClient:
+    """
+    Spotify client without any cached responses.
+    """
+
+    def clear_cache(self, keep_tracks=True):
+        pass
+
+
+def make_song(index: int, position: int) -> Song:
+    return Song.from_missing_data(
+        name=f"Song {index}",
+        artists=["Artist"],
+        artist="Artist",
+        url=f"https://open.spotify.com/track/{index}",
+        list_position=position,
+    )
+
+
+def test_plan_sync(tmpdir):
+    """
+    Test that the plan downloads, renames, deletes and retags the right files.
+    """
+
+    directory = Path(tmpdir)
+    old_songs = [make_song(index, index) for index in range(5)]
+    old_files = [
+        (directory / f"{song.list_position} - {song.name}.mp3", song.json)
+        for song in old_songs
+    ]
+    for path, _ in old_files[:4]:
+        path.write_bytes(b"audio")
+
+    # Song 0 is removed, song 1 moves, song 2 stays in place with a new album,
+    # song 3 stays in place, the file of song 4 was removed, song 5 is new
+    new_songs = [
+        make_song(1, 0),
+        make_song(2, 2),
+        make_song(3, 3),
+        make_song(4, 4),
+        make_song(5, 5),
+    ]
+    new_songs[1].album_name = "New album"
+    new_files = [
+        (directory / f"{song.list_position} - {song.name}.mp3", song)
+        for song in new_songs
+    ]
+
+    plan = plan_sync(old_files, new_files)
+
+    assert plan.deletes == [old_files[0][0]]
+    assert plan.renames == [(old_files[1][0], new_files[0][0])]
+    assert plan.retags == [(new_files[1][0], new_songs[1])]
+    assert plan.downloads == [new_songs[3], new_songs[4]]
+    assert plan.describe()[-1] == "2 to download, 1 to rename, 1 to delete, 1 to retag"
+
+    # Without deleting, the moved song is downloaded again
+    plan = plan_sync(old_files, new_files, delete=False)
+    assert plan.deletes == []
+    assert plan.renames == []
+    assert plan.downloads == [new_songs[0], new_songs[3], new_songs[4]]
+
+
+def test_plan_sync_repeated_song(tmpdir):
+    """
+    Test that every copy of a song that is in the list twice keeps its file.
+    """
+
+    directory = Path(tmpdir)
+    old_files = [
+        (directory / f"{song.list_position} - {song.name}.mp3", song.json)
+        for song in [make_song(1, 1), make_song(1, 2)]
+    ]
+    for path, _ in old_files:
+        path.write_bytes(b"audio")
+
+    # Both copies stay in place
+    new_songs = [make_song(1, 1), make_song(1, 2), make_song(2, 3)]
+    new_files = [
+        (directory / f"{song.list_position} - {song.name}.mp3", song)
+        for song in new_songs
+    ]
+
+    plan = plan_sync(old_files, new_files)
+    assert plan.deletes == []
+    assert plan.renames == []
+    assert plan.downloads == [new_songs[2]]
+
+    # Both copies move down, the new song takes the first position
+    new_songs = [make_song(2, 1), make_song(1, 2), make_song(1, 3)]
+    new_files = [
+        (directory / f"{song.list_position} - {song.name}.mp3", song)
+        for song in new_songs
+    ]
+
+    plan = plan_sync(old_files, new_files)
+    assert plan.deletes == []
+    assert plan.renames == [(old_files[0][0], new_files[2][0])]
+    assert plan.downloads == [new_songs[0]]
+
+    # The file moves to the first copy, the second copy is downloaded
+    plan = plan_sync(old_files[:1], new_files[1:])
+    assert plan.renames == [(old_files[0][0], new_files[1][0])]
+    assert plan.downloads == [new_songs[2]]
+
+
+def test_execute_sync_plan_swapped_files(tmpdir):
+    """
+    Test that files renamed to each other's paths are not overwritten.
+    """
+
+    directory = Path(tmpdir)
+    first, second = make_song(1, 1), make_song(2, 2)
+    first_path, second_path = directory / "1.mp3", directory / "2.mp3"
+    first_path.write_bytes(b"first")
+    second_path.write_bytes(b"second")
+
+    plan = plan_sync(
+        [(first_path, first.json), (second_path, second.json)],
+        [(second_path, make_song(1, 2)), (first_path, make_song(2, 1))],
+    )
+
+    downloader = SimpleNamespace(
+        settings=dict(DOWNLOADER_OPTIONS), file_index=FileIndex()
+    )
+    execute_sync_plan(plan, downloader)  # type: ignore
+
+    assert first_path.read_bytes() == b"second"
+    assert second_path.read_bytes() == b"first"
+    assert sorted(path.name for path in directory.iterdir()) == ["1.mp3", "2.mp3"]
+
+
+def test_plan_sync_speed(tmpdir):
+    """
+    Planning a 10k song sync should take milliseconds.
+    """
+
+    directory = Path(tmpdir)
+    old_files = [
+        (directory / f"{index}.mp3", make_song(index, index).json)
+        for index in range(10_000)
+    ]
+    new_files = [
+        (directory / f"{index}.mp3", make_song(index, index))
+        for index in range(5_000, 15_000)
+    ]
+
+    start = time.perf_counter()
+    plan = plan_sync(old_files, new_files)
+    elapsed = time.perf_counter() - start
+
+    assert len(plan.deletes) == 5_000
+    assert len(plan.downloads) == 10_000
+    assert elapsed < 0.5, f"planning took {elapsed * 1000:.0f}ms"
+
+
+def test_watch_cycle(tmpdir, monkeypatch):
+    """
+    Test that only the queries whose snapshot id changed are fetched,
+    and that only their new songs are fetched and downloaded.
+    """
+
+    directory = Path(tmpdir)
+    first, known, new = make_song(1, 1), make_song(2, 1), make_song(3, 2)
+    sync_path = directory / "test.spotdl"
+    sync_path.write_text(
+        json.dumps(
+            {
+                "type": "sync",
+                "query": ["playlist 1", "playlist 2"],
+                "songs": [first.json, known.json],
+                "sources": {
+                    "playlist 1": {"snapshot_id": "a", "urls": [first.url]},
+                    "playlist 2": {"snapshot_id": "b", "urls": [known.url]},
+                },
+            }
+        ),
+        encoding="utf-8",
+    )
+
+    settings = dict(DOWNLOADER_OPTIONS)
+    settings["output"] = str(directory / "{title}.{output-ext}")
+    for song in (first, known):
+        (directory / f"{song.name}.mp3").write_bytes(b"audio")
+
+    fetched, reinitialized, downloaded = [], [], []
+    snapshot_ids = {"playlist 1": "a", "playlist 2": "c"}
+
+    def fake_get_simple_songs(query, **_):
+        fetched.extend(query)
+        return [make_song(2, 1), make_song(3, 2)]
+
+    def fake_reinit_songs(songs):
+        reinitialized.extend(song.url for song in songs)
+        return songs
+
+    monkeypatch.setattr(spotdl.console.sync, "SpotifyClient", FakeSpotifyClient)
+    monkeypatch.setattr(
+        spotdl.console.sync, "get_snapshot_ids", lambda queries, _: snapshot_ids
+    )
+    monkeypatch.setattr(spotdl.console.sync, "get_simple_songs", fake_get_simple_songs)
+    monkeypatch.setattr(spotdl.console.sync, "reinit_songs", fake_reinit_songs)
+
+    downloader = SimpleNamespace(
+        settings=settings,
+        file_index=FileIndex(),
+        download_multiple_songs=downloaded.extend,
+    )
+
+    assert watch_cycle(str(sync_path), downloader) == 1  # type: ignore
+    assert fetched == ["playlist 2"]
+    assert reinitialized == [new.url]
+    assert [song.url for song in downloaded] == [new.url]
+
+    sync_data = json.loads(sync_path.read_text(encoding="utf-8"))
+    assert [entry["url"] for entry in sync_data["songs"]] == [
+        first.url,
+        known.url,
+        new.url,
+    ]
+    assert sync_data["sources"]["playlist 2"] == {
+        "snapshot_id": "c",
+        "urls": [known.url, new.url],
+    }
+
+    # Nothing changed since the last check
+    fetched.clear()
+    assert watch_cycle(str(sync_path), downloader) == 0  # type: ignore
+    assert fetched == []
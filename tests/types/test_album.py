@@ -1,5 +1,9 @@
+from urllib.parse import parse_qs, urlsplit
+
 import pytest
 
+import spotdl.types.album
+import spotdl.utils.pagination
 from spotdl.types.album import Album
 
 
@@ -60,3 +64,116 @@ def test_album_length():
     album = Album.from_url("https://open.spotify.com/album/4MQnUDGXmHOvnsWCpzeqWT")
 
     assert album.length == 16
+
+
+def make_raw_album(album_id, track_count):
+    tracks = [
+        {
+            "name": f"Track {index}",
+            "artists": [{"name": "Artist"}],
+            "disc_number": 1,
+            "duration_ms": 180000,
+            "track_number": index + 1,
+            "id": f"{album_id}{index}",
+            "explicit": False,
+            "external_urls": {"spotify": f"https://open.spotify.com/track/{index}"},
+        }
+        for index in range(track_count)
+    ]
+
+    def page(offset):
+        href = f"https://api.spotify.com/v1/albums/{album_id}/tracks"
+        return {
+            "href": f"{href}?offset={offset}&limit=50",
+            "items": tracks[offset : offset + 50],
+            "limit": 50,
+            "offset": offset,
+            "total": track_count,
+            "next": (
+                f"{href}?offset={offset + 50}&limit=50"
+                if offset + 50 < track_count
+                else None
+            ),
+        }
+
+    return {
+        "id": album_id,
+        "name": f"Album {album_id}",
+        "artists": [{"name": "Artist"}],
+        "album_type": "album",
+        "release_date": "2020-01-01",
+        "total_tracks": track_count,
+        "label": "Label",
+        "images": [],
+        "copyrights": [],
+        "external_urls": {"spotify": f"https://open.spotify.com/album/{album_id}"},
+        "tracks": page(0),
+        "page": page,
+    }
+
+
+class CountingSpotifyClient:
+    """
+    Spotify client that counts the API calls.
+    """
+
+    calls = 0
+    raw_albums = {}
+
+    def album(self, album_id):
+        CountingSpotifyClient.calls += 1
+        return self.raw_albums[album_id]
+
+    def albums(self, album_ids):
+        CountingSpotifyClient.calls += 1
+        return {"albums": [self.raw_albums[album_id] for album_id in album_ids]}
+
+    def next(self, result):
+        CountingSpotifyClient.calls += 1
+        url = urlsplit(result["next"])
+        album_id = url.path.split("/")[-2]
+        return self.raw_albums[album_id]["page"](int(parse_qs(url.query)["offset"][0]))
+
+
+@pytest.mark.parametrize(
+    "track_count, api_calls", [(10, 1), (50, 1), (51, 2), (120, 3)]
+)
+def test_album_api_calls(monkeypatch, track_count, api_calls):
+    """
+    Benchmark the number of API calls needed to load an album:
+    the first page of tracks comes with the album,
+    pagination continues from its next page.
+    """
+
+    CountingSpotifyClient.calls = 0
+    CountingSpotifyClient.raw_albums = {"a": make_raw_album("a", track_count)}
+    monkeypatch.setattr(spotdl.types.album, "SpotifyClient", CountingSpotifyClient)
+    monkeypatch.setattr(spotdl.utils.pagination, "SpotifyClient", CountingSpotifyClient)
+
+    album = Album.from_url("a", fetch_songs=False)
+
+    assert len(album.songs) == track_count
+    assert album.songs[-1].track_number == track_count
+    assert CountingSpotifyClient.calls == api_calls
+
+
+def test_album_list_api_calls(monkeypatch):
+    """
+    Benchmark the number of API calls needed to load many albums in bulk.
+    """
+
+    CountingSpotifyClient.calls = 0
+    CountingSpotifyClient.raw_albums = {
+        f"a{index}": make_raw_album(f"a{index}", 10) for index in range(39)
+    }
+    CountingSpotifyClient.raw_albums["big"] = make_raw_album("big", 120)
+    monkeypatch.setattr(spotdl.types.album, "SpotifyClient", CountingSpotifyClient)
+    monkeypatch.setattr(spotdl.utils.pagination, "SpotifyClient", CountingSpotifyClient)
+
+    albums = Album.list_from_urls(list(CountingSpotifyClient.raw_albums))
+
+    assert [album.url for album in albums] == list(CountingSpotifyClient.raw_albums)
+    assert sum(len(album.songs) for album in albums) == 39 * 10 + 120
+
+    # 2 bulk calls for 40 albums, 2 more pages for the big album
+    assert CountingSpotifyClient.calls == 4
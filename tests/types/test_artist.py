@@ -1,5 +1,8 @@
 import pytest
 
+import spotdl.types.album
+import spotdl.types.artist
+import spotdl.utils.pagination
 from spotdl.types.artist import Artist
 
 
@@ -65,3 +68,113 @@ def test_artist_from_string():
     assert artist.name.lower().startswith("gor")
     # assert artist.url == "http://open.spotify.com/artist/3AA28KZvwAUcZuOKwyblJQ"
     assert len(artist.urls) > 1
+
+
+def make_track(album_id, index, name=None):
+    return {
+        "name": name or f"{album_id} track {index}",
+        "artists": [{"name": "Artist"}],
+        "disc_number": 1,
+        "duration_ms": 180000,
+        "track_number": index + 1,
+        "id": f"{album_id}{index}",
+        "explicit": False,
+        "external_urls": {
+            "spotify": f"https://open.spotify.com/track/{album_id}{index}"
+        },
+    }
+
+
+def make_album(album_id, tracks):
+    return {
+        "id": album_id,
+        "name": f"Album {album_id}",
+        "artists": [{"name": "Artist"}],
+        "album_type": "album",
+        "release_date": "2020-01-01",
+        "total_tracks": len(tracks),
+        "label": "Label",
+        "images": [],
+        "copyrights": [],
+        "tracks": {
+            "items": tracks[:50],
+            "next": f"tracks of {album_id}" if len(tracks) > 50 else None,
+        },
+    }
+
+
+class FakeSpotifyClient:
+    """
+    Spotify client that serves an artist with 45 albums
+    and records the requests.
+    """
+
+    calls = []
+
+    def __init__(self):
+        self.raw_albums = {
+            f"a{index}": make_album(
+                f"a{index}", [make_track(f"a{index}", i) for i in range(10)]
+            )
+            for index in range(44)
+        }
+        self.raw_albums["big"] = make_album(
+            "big", [make_track("big", i) for i in range(70)]
+        )
+        # Same song on two albums
+        self.raw_albums["a0"]["tracks"]["items"][0]["name"] = "Hit Song"
+        self.raw_albums["a1"]["tracks"]["items"][0]["name"] = "hit song"
+
+    def artist(self, _):
+        self.calls.append("artist")
+        return {"name": "Artist", "genres": []}
+
+    def artist_albums(self, _, include_groups=None, limit=20):
+        self.calls.append("artist_albums")
+        items = [
+            {"name": album["name"], "external_urls": {"spotify": album_id}}
+            for album_id, album in self.raw_albums.items()
+        ]
+        # The same album released in another country
+        items.append(items[0])
+        return {"items": items[:limit], "next": "albums page 2", "rest": items[limit:]}
+
+    def albums(self, album_ids):
+        self.calls.append("albums")
+        assert len(album_ids) <= 20
+        return {"albums": [self.raw_albums[album_id] for album_id in album_ids]}
+
+    def next(self, result):
+        self.calls.append("next")
+        if result["next"] == "albums page 2":
+            return {"items": result["rest"], "next": None}
+
+        return {
+            "items": [make_track("big", i) for i in range(50, 70)],
+            "next": None,
+        }
+
+
+def test_artist_bulk_albums(monkeypatch):
+    """
+    Test that the albums of an artist are fetched in bulk,
+    and that only albums with more than 50 tracks are paginated.
+    """
+
+    FakeSpotifyClient.calls = []
+    monkeypatch.setattr(spotdl.types.artist, "SpotifyClient", FakeSpotifyClient)
+    monkeypatch.setattr(spotdl.types.album, "SpotifyClient", FakeSpotifyClient)
+    monkeypatch.setattr(spotdl.utils.pagination, "SpotifyClient", FakeSpotifyClient)
+
+    metadata, songs = Artist.get_metadata("https://open.spotify.com/artist/test")
+
+    assert len(metadata["albums"]) == 45
+    assert sorted(FakeSpotifyClient.calls) == sorted(
+        ["artist", "artist_albums", "next"] + ["albums"] * 3 + ["next"]
+    )
+
+    # 44 albums of 10 songs and one of 70 songs, with one duplicate song
+    assert len(songs) == 44 * 10 + 70 - 1
+    assert len({song.url for song in songs}) == len(songs)
+    assert [song.name for song in songs[:2]] == ["Hit Song", "a0 track 1"]
+    assert songs[-1].tracks_count == 70
@@ -1,3 +1,8 @@
+import json
+import time
+import tracemalloc
+from dataclasses import asdict, fields, make_dataclass
+
 import pytest
 
 from spotdl.types.album import Album
@@ -257,3 +262,140 @@ def test_song_from_dict():
     )
     assert song.explicit == False
     assert song.popularity == 0
+
+
+def test_song_list_from_urls(monkeypatch):
+    """
+    Test that songs are created with bulk requests, in the order of the urls.
+    """
+
+    calls = []
+
+    def raw_track(track_id):
+        return {
+            "id": track_id,
+            "name": f"name {track_id}",
+            "artists": [{"id": "artist", "name": "Artist"}],
+            "album": {"id": f"album{int(track_id) % 3}"},
+            "disc_number": 1,
+            "track_number": 1,
+            "duration_ms": 1000,
+            "explicit": False,
+            "popularity": 1,
+            "external_ids": {"isrc": "isrc"},
+            "external_urls": {"spotify": f"https://open.spotify.com/track/{track_id}"},
+        }
+
+    class FakeSpotifyClient:
+        def tracks(self, ids):
+            calls.append(("tracks", len(ids)))
+            return {"tracks": [None if i == "404" else raw_track(i) for i in ids]}
+
+        def artists(self, ids):
+            calls.append(("artists", len(ids)))
+            return {"artists": [{"id": i, "genres": ["genre"]} for i in ids]}
+
+        def albums(self, ids):
+            calls.append(("albums", len(ids)))
+            return {
+                "albums": [
+                    {
+                        "id": i,
+                        "name": i,
+                        "artists": [{"name": "Artist"}],
+                        "album_type": "album",
+                        "copyrights": [],
+                        "genres": [],
+                        "tracks": {"items": [{"disc_number": 1}]},
+                        "release_date": "2020-01-01",
+                        "total_tracks": 1,
+                        "label": "label",
+                        "images": [],
+                    }
+                    for i in ids
+                ]
+            }
+
+    monkeypatch.setattr("spotdl.types.song.SpotifyClient", FakeSpotifyClient)
+
+    urls = [f"https://open.spotify.com/track/{i}?si=x" for i in range(60)]
+    urls.insert(10, "https://open.spotify.com/track/404")
+
+    songs = Song.list_from_urls(urls)
+
+    assert [song.song_id for song in songs] == [str(i) for i in range(60)]
+    assert songs[0].genres == ["genre"]
+    assert calls == [("tracks", 50), ("tracks", 11), ("artists", 1), ("albums", 3)]
+
+
+def make_song_data(index: int) -> dict:
+    return {
+        "name": f"Song {index}",
+        "artists": [f"Artist {index % 100}", "Featured"],
+        "artist": f"Artist {index % 100}",
+        "genres": ["pop", "dance pop"],
+        "disc_number": 1,
+        "disc_count": 1,
+        "album_name": f"Album {index % 1000}",
+        "album_artist": f"Artist {index % 100}",
+        "duration": 200,
+        "year": 2020,
+        "date": "2020-01-01",
+        "track_number": index % 12 + 1,
+        "tracks_count": 12,
+        "song_id": f"id{index}",
+        "explicit": False,
+        "publisher": "Label",
+        "url": f"https://open.spotify.com/track/id{index}",
+        "isrc": f"ISRC{index}",
+        "cover_url": None,
+        "copyright_text": "2020 Label",
+        "album_id": f"album{index % 1000}",
+        "artist_id": f"artist{index % 100}",
+    }
+
+
+def test_song_json_copy():
+    """
+    Test that the json of a song is a copy that doesn't share its lists.
+    """
+
+    song = Song.from_dict(make_song_data(1))
+    data = song.json
+
+    assert data == asdict(song)
+    data["artists"].append("Other")
+    assert song.artists == ["Artist 1", "Featured"]
+    assert Song.from_dict(song.json) == song
+
+
+def test_song_benchmark():
+    """
+    Compare the memory and serialization speed of songs
+    with the previous, unslotted and uninterned song class.
+    """
+
+    legacy_song = make_dataclass(
+        "LegacySong", [(field.name, field.type, field) for field in fields(Song)]
+    )
+
+    # Songs loaded from a sync file, strings are not shared between songs
+    dumps = [json.dumps(make_song_data(index)) for index in range(10_000)]
+
+    def measure(cls, serialize):
+        tracemalloc.start()
+        songs = [cls(**json.loads(dump)) for dump in dumps]
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        for song in songs:
+            serialize(song)
+
+        return memory, time.perf_counter() - start
+
+    legacy_memory, legacy_time = measure(legacy_song, asdict)
+    memory, serialize_time = measure(Song, lambda song: song.json)
+
+    assert memory < legacy_memory * 0.7
+    assert serialize_time < legacy_time
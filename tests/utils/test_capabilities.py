@@ -0,0 +1,42 @@
+import time
+
+from spotdl.utils.capabilities import CapabilityCache
+
+
+def test_capability_cache(tmpdir):
+    """
+    Test that values are saved to disk and expire after their ttl.
+    """
+
+    path = tmpdir / "capabilities.json"
+
+    cache = CapabilityCache(path)
+    assert cache.get("missing") is None
+
+    cache.set("ytmusic-reachable", True, 60)
+    cache.set("expired", "value", -1)
+
+    assert cache.get("ytmusic-reachable") is True
+    assert cache.get("expired") is None
+
+    # A new cache reads the same file
+    assert CapabilityCache(path).get("ytmusic-reachable") is True
+
+    cache.delete("ytmusic-reachable")
+    assert CapabilityCache(path).get("ytmusic-reachable") is None
+
+
+def test_capability_cache_broken_file(tmpdir):
+    """
+    Test that a broken cache file is ignored.
+    """
+
+    path = tmpdir / "capabilities.json"
+    path.write_text("{not json", encoding="utf-8")
+
+    cache = CapabilityCache(path)
+    assert cache.get("ytmusic-reachable") is None
+
+    cache.set("ytmusic-reachable", False, 60)
+    assert cache.get("ytmusic-reachable") is False
+    assert cache.entries["ytmusic-reachable"]["expires"] > time.time()
@@ -0,0 +1,126 @@
+import platform
+import shutil
+import subprocess
+from concurrent.futures import Future
+from pathlib import Path
+
+import pytest
+from mutagen.easyid3 import EasyID3
+
+import spotdl.utils.ffmpeg
+from spotdl.utils.capabilities import CapabilityCache
+from spotdl.utils.conversion import ConversionJob, ConversionService, convert_batch
+from spotdl.utils.ffmpeg import FFmpegError
+
+BATCH_FFMPEG = """#!/bin/sh
+echo "$@" >> "$FFMPEG_LOG"
+sleep 0.2
+for arg in "$@"; do
+    case "$arg" in
+        *bad*) failed=1 ;;
+        *.mp3) touch "$arg" ;;
+    esac
+done
+[ -n "$failed" ] && exit 1
+exit 0
+"""
+
+
+@pytest.mark.skipif(platform.system() == "Windows", reason="Uses a shell script")
+def test_conversion_service(tmpdir, monkeypatch):
+    """
+    Test that queued files are converted in batches,
+    and that a failed batch is retried file by file.
+    """
+
+    ffmpeg_exec = Path(tmpdir) / "ffmpeg"
+    ffmpeg_exec.write_text(BATCH_FFMPEG)
+    ffmpeg_exec.chmod(0o755)
+
+    ffmpeg_log = Path(tmpdir) / "ffmpeg.log"
+    monkeypatch.setenv("FFMPEG_LOG", str(ffmpeg_log))
+    monkeypatch.setattr(
+        spotdl.utils.ffmpeg, "get_ffmpeg_version", lambda *_: (4.4, 2022)
+    )
+    monkeypatch.setattr(
+        spotdl.utils.ffmpeg,
+        "get_capabilities",
+        lambda: CapabilityCache(Path(tmpdir) / "capabilities.json"),
+    )
+
+    service = ConversionService(str(ffmpeg_exec), workers=1, max_batch=8)
+
+    futures = [
+        service.submit(Path(tmpdir) / f"{i}.webm", Path(tmpdir) / f"{i}.mp3")
+        for i in range(5)
+    ]
+
+    assert [future.result() for future in futures] == [(True, None)] * 5
+    assert all((Path(tmpdir) / f"{i}.mp3").is_file() for i in range(5))
+
+    # Files queued while the worker is busy are converted together
+    assert len(ffmpeg_log.read_text().splitlines()) <= 2
+
+    ffmpeg_log.unlink()
+    futures = [
+        service.submit(Path(tmpdir) / name, Path(tmpdir) / f"{name}.mp3")
+        for name in ["first.webm", "good.webm", "bad.webm"]
+    ]
+
+    results = [future.result() for future in futures]
+    service.close()
+
+    assert [success for success, _ in results] == [True, True, False]
+    assert results[2][1]["return_code"] == 1  # type: ignore
+
+    # The failed batch is retried one by one, whether first was part of it or not
+    assert len(ffmpeg_log.read_text().splitlines()) == 4
+
+    with pytest.raises(FFmpegError):
+        service.submit(Path(tmpdir) / "0.webm", Path(tmpdir) / "0.mp3")
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="Requires ffmpeg")
+def test_convert_batch_metadata(tmpdir):
+    """
+    Test that each output of a batch keeps the tags of its own input.
+    """
+
+    jobs = []
+    for index in range(2):
+        input_file = Path(tmpdir) / f"{index}.webm"
+        subprocess.run(
+            [
+                "ffmpeg",
+                "-nostdin",
+                "-f",
+                "lavfi",
+                "-i",
+                "anullsrc=r=48000:cl=mono",
+                "-t",
+                "1",
+                "-metadata",
+                f"title=Song {index}",
+                str(input_file),
+            ],
+            check=True,
+            capture_output=True,
+        )
+
+        jobs.append(
+            ConversionJob(
+                input_file=input_file,
+                output_file=Path(tmpdir) / f"{index}.mp3",
+                output_format="mp3",
+                bitrate=None,
+                ffmpeg_args=None,
+                progress_handler=None,
+                duration=None,
+                stream_copy=False,
+                future=Future(),
+            )
+        )
+
+    assert convert_batch(jobs) == (True, None)
+    assert EasyID3(jobs[0].output_file)["title"] == ["Song 0"]
+    assert EasyID3(jobs[1].output_file)["title"] == ["Song 1"]
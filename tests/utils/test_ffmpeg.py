@@ -9,6 +9,7 @@
 
 import spotdl.utils.config
 import spotdl.utils.ffmpeg
+from spotdl.utils.capabilities import CapabilityCache
 from spotdl.utils.ffmpeg import *
 
 ffmpeg_stdout = """
@@ -101,6 +102,42 @@ def test_get_local_ffmpeg(monkeypatch):
         assert str(local_ffmpeg).endswith("ffmpeg.exe")
 
 
+def test_find_ffmpeg_cached(monkeypatch, tmpdir):
+    """
+    Test that find_ffmpeg reuses the cached path until the binary changes.
+    """
+
+    monkeypatch.setattr(
+        spotdl.utils.ffmpeg,
+        "get_capabilities",
+        lambda: CapabilityCache(Path(tmpdir) / "capabilities.json"),
+    )
+
+    ffmpeg_exec = Path(tmpdir) / "ffmpeg"
+    ffmpeg_exec.write_text("#!/bin/sh\n")
+    ffmpeg_exec.chmod(0o755)
+
+    lookups = []
+
+    def get_ffmpeg_path():
+        lookups.append(1)
+        return ffmpeg_exec
+
+    monkeypatch.setattr(spotdl.utils.ffmpeg, "get_ffmpeg_path", get_ffmpeg_path)
+
+    assert find_ffmpeg() == ffmpeg_exec
+    assert find_ffmpeg() == ffmpeg_exec
+    assert len(lookups) == 1
+
+    # Replacing the binary invalidates the cached path
+    ffmpeg_exec.write_text("#!/bin/sh\n# new version\n")
+    assert find_ffmpeg() == ffmpeg_exec
+    assert len(lookups) == 2
+
+    assert find_ffmpeg(use_cache=False) == ffmpeg_exec
+    assert len(lookups) == 3
+
+
 def test_download_ffmpeg(monkeypatch, tmpdir):
     """
     Test download_ffmpeg function.
@@ -143,3 +180,130 @@ def test_convert(tmpdir, monkeypatch):
         output_format="m4a",
         bitrate="320K",
     ) == (True, None)
+
+
+FAKE_FFMPEG = """#!/bin/sh
+echo "  Duration: 00:00:10.00, start: 0.000000, bitrate: 128 kb/s" >&2
+i=0
+while [ $i -lt 500 ]; do echo "stderr line $i" >&2; i=$((i+1)); done
+sleep 0.1
+echo "out_time_us=N/A"
+echo "out_time_us=5000000"
+echo "progress=continue"
+echo "out_time_us=10000000"
+echo "progress=end"
+exit $FAKE_FFMPEG_EXIT
+"""
+
+
+@pytest.mark.skipif(platform.system() == "Windows", reason="Uses a shell script")
+def test_convert_progress(tmpdir, monkeypatch):
+    """
+    Test that convert reads the progress stream and keeps
+    only the end of stderr for the error report.
+    """
+
+    ffmpeg_exec = Path(tmpdir) / "ffmpeg"
+    ffmpeg_exec.write_text(FAKE_FFMPEG)
+    ffmpeg_exec.chmod(0o755)
+
+    monkeypatch.setattr(
+        spotdl.utils.ffmpeg, "get_ffmpeg_version", lambda *_: (4.4, 2022)
+    )
+    monkeypatch.setattr(
+        spotdl.utils.ffmpeg,
+        "get_capabilities",
+        lambda: CapabilityCache(Path(tmpdir) / "capabilities.json"),
+    )
+
+    progress = []
+    monkeypatch.setenv("FAKE_FFMPEG_EXIT", "0")
+    success, error = convert(
+        Path(tmpdir) / "input.webm",
+        Path(tmpdir) / "output.mp3",
+        ffmpeg=str(ffmpeg_exec),
+        progress_handler=progress.append,
+    )
+
+    assert success is True and error is None
+    assert progress == [0, 50, 100]
+
+    # The known duration is used instead of the one reported by ffmpeg
+    progress = []
+    convert(
+        Path(tmpdir) / "input.webm",
+        Path(tmpdir) / "output.mp3",
+        ffmpeg=str(ffmpeg_exec),
+        progress_handler=progress.append,
+        duration=20,
+    )
+
+    assert progress == [0, 25, 50, 100]
+
+    monkeypatch.setenv("FAKE_FFMPEG_EXIT", "1")
+    success, error = convert(
+        Path(tmpdir) / "input.webm",
+        Path(tmpdir) / "output.mp3",
+        ffmpeg=str(ffmpeg_exec),
+        progress_handler=progress.append,
+    )
+
+    assert success is False and error is not None
+    assert error["error"].splitlines() == [
+        f"stderr line {i}" for i in range(500 - STDERR_BUFFER_SIZE, 500)
+    ]
+    assert "-v" not in error["arguments"]
+
+    # Stream copy doesn't pass the codec or the bitrate
+    success, error = convert(
+        Path(tmpdir) / "input.webm",
+        Path(tmpdir) / "output.opus",
+        ffmpeg=str(ffmpeg_exec),
+        output_format="opus",
+        bitrate="128k",
+        stream_copy=True,
+    )
+
+    assert success is False and error is not None
+    assert error["arguments"][-4:] == ["-vn", "-c:a", "copy", error["arguments"][-1]]
+
+
+@pytest.mark.parametrize(
+    "codec, source_bitrate, output_format, bitrate, ffmpeg_args, expected",
+    [
+        ("opus", 160, "opus", "auto", None, True),
+        ("aac", 128, "m4a", None, None, True),
+        ("aac", 128, "m4a", "disable", None, True),
+        ("aac", 128, "m4a", "256k", None, True),
+        ("aac", 128, "m4a", "96k", None, False),
+        ("aac", 128, "m4a", "0", None, False),
+        ("aac", 128, "m4a", "auto", "-af loudnorm", False),
+        ("opus", 160, "mp3", "auto", None, False),
+        ("opus", 160, "ogg", "auto", None, False),
+        (None, None, "mp3", "auto", None, False),
+    ],
+)
+def test_can_copy_stream(
+    codec, source_bitrate, output_format, bitrate, ffmpeg_args, expected
+):
+    """
+    Test that the stream is copied only when it doesn't change the result.
+    """
+
+    assert (
+        can_copy_stream(codec, source_bitrate, output_format, bitrate, ffmpeg_args)
+        is expected
+    )
+
+
+def test_probe_audio_download_info(tmpdir):
+    """
+    Test that the yt-dlp info is used for files mutagen can't read.
+    """
+
+    webm_file = Path(tmpdir) / "song.webm"
+    webm_file.write_bytes(b"\x1a\x45\xdf\xa3")
+
+    assert probe_audio(webm_file, {"acodec": "opus", "abr": 129.5}) == ("opus", 130)
+    assert probe_audio(webm_file, {"acodec": "mp4a.40.2"}) == ("aac", None)
+    assert probe_audio(webm_file) == (None, None)
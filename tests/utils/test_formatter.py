@@ -1,7 +1,9 @@
+import time
 from pathlib import Path
 
 from spotdl.types.song import Song, SongList
 from spotdl.utils.formatter import (
+    compile_template,
     create_file_name,
     create_song_title,
     parse_duration,
@@ -166,3 +168,65 @@ def test_parse_duration():
     assert parse_duration("views") == float(0.0)
     assert parse_duration([1, 2, 3]) == float(0.0)  # type: ignore
     assert parse_duration({"json": "data"}) == float(0.0)  # type: ignore
+
+
+def make_song(index: int) -> Song:
+    return Song.from_missing_data(
+        name=f"Song: {index}",
+        artists=[f"Artist {index % 100}", "Featured"],
+        artist=f"Artist {index % 100}",
+        album_name=f"Album {index % 1000}",
+        track_number=index % 12 + 1,
+        song_id=f"id{index}",
+        list_position=index,
+        list_length=10_000,
+    )
+
+
+def test_compile_template():
+    """
+    Test that templates are parsed once and that rendered file names are cached.
+    """
+
+    template = compile_template("{artist}/{album}/{list-name}/{title}")
+
+    assert template is compile_template("{artist}/{album}/{list-name}/{title}")
+    assert template.template == "{artist}/{album}/{list-name}/{title}.{output-ext}"
+    assert template.variables == [
+        "{artist}",
+        "{album}",
+        "{list-name}",
+        "{title}",
+        "{output-ext}",
+    ]
+
+    song = make_song(1)
+
+    # The song has no list name, so it's removed from the template
+    path = create_file_name(song, "{artist}/{album}/{list-name}/{title}", "mp3")
+    assert path == Path("Artist 1/Album 1/Song- 1.mp3")
+
+    song.list_name = "List"
+    path = create_file_name(song, "{artist}/{album}/{list-name}/{title}", "mp3")
+    assert path == Path("Artist 1/Album 1/List/Song- 1.mp3")
+    assert create_file_name(song, "{artist}/{album}/{list-name}/{title}", "mp3") is path
+
+    # A changed song is rendered again
+    song.name = "Other"
+    path = create_file_name(song, "{artist}/{album}/{list-name}/{title}", "mp3")
+    assert path == Path("Artist 1/Album 1/List/Other.mp3")
+
+
+def test_create_file_name_speed():
+    """
+    Rendering the file names of a large library should be fast.
+    """
+
+    songs = [make_song(index) for index in range(10_000)]
+
+    start = time.perf_counter()
+    for song in songs:
+        create_file_name(song, "{artist}/{album}/{track-number} - {title}", "mp3")
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 1, f"rendering took {elapsed * 1000:.0f}ms"
@@ -0,0 +1,122 @@
+import os
+from pathlib import Path
+
+from spotdl.types.song import Song
+from spotdl.utils.library import FileIndex, LibraryIndex, reuse_library_file
+
+
+def make_song(index, name="Song", isrc=None, duration=200):
+    return Song.from_missing_data(
+        name=name,
+        artists=["Artist"],
+        artist="Artist",
+        duration=duration,
+        isrc=isrc,
+        url=f"https://open.spotify.com/track/{index}",
+    )
+
+
+def test_library_index(tmpdir, monkeypatch):
+    """
+    Test that recordings are found by url, by ISRC, and by artist and title
+    within the duration tolerance.
+    """
+
+    monkeypatch.chdir(tmpdir)
+    library = LibraryIndex()
+    album_file = Path("Artist/Album/Song.mp3")
+    single_file = Path("Artist/Single/Other Song.mp3")
+    for path in (album_file, single_file):
+        path.parent.mkdir(parents=True)
+        path.write_bytes(b"audio")
+
+    library.add(make_song(1, isrc="usabc0000001"), album_file)
+    library.add(make_song(2, name="Other Song", duration=180), single_file)
+
+    assert len(library) == 2
+
+    # Same track
+    assert library.find(make_song(1)) == album_file
+    assert library.find(make_song(1), exclude=album_file) is None
+
+    # Same recording on another release
+    assert library.find(make_song(3, name="Live", isrc="USABC0000001")) == album_file
+
+    # Same artist and title
+    assert library.find(make_song(4, name="other song", duration=182)) == single_file
+    assert library.find(make_song(4, name="Other Song", duration=183)) is None
+    assert library.find(make_song(4, name="Another Song", duration=180)) is None
+
+    # Removed files aren't matches
+    single_file.unlink()
+    assert library.find(make_song(4, name="other song", duration=182)) is None
+
+
+def test_reuse_library_file(tmpdir, monkeypatch):
+    """
+    Test that the library file is used as is or linked to the output path.
+    """
+
+    monkeypatch.chdir(tmpdir)
+    library_file = Path("Artist", "Album", "Song.mp3")
+    library_file.parent.mkdir(parents=True)
+    library_file.write_bytes(b"audio")
+
+    library = LibraryIndex()
+    library.add(make_song(1, isrc="USABC0000001"), library_file)
+    file_index = FileIndex()
+
+    song = make_song(2, isrc="USABC0000001")
+    output_file = Path("Playlist", "Song.opus")
+
+    skipped_file = reuse_library_file(library, file_index, song, output_file, "skip")
+    assert skipped_file == library_file
+    assert not Path("Playlist").exists()
+
+    linked_file = reuse_library_file(library, file_index, song, output_file, "link")
+    assert linked_file == Path("Playlist", "Song.mp3")
+    assert linked_file.read_bytes() == b"audio"
+    assert file_index.exists(linked_file)
+    assert library.find(song, exclude=library_file) == linked_file
+
+    other_song = make_song(3, name="Other Song")
+    assert (
+        reuse_library_file(library, file_index, other_song, output_file, "link") is None
+    )
+
+
+def test_file_index(tmpdir, monkeypatch):
+    """
+    Test that each directory is listed once and kept up to date.
+    """
+
+    monkeypatch.chdir(tmpdir)
+    Path("Artist").mkdir()
+    Path("Artist", "Song 1.mp3").write_bytes(b"audio")
+
+    listings = []
+    listdir = os.listdir
+
+    def counting_listdir(path):
+        listings.append(path)
+        return listdir(path)
+
+    monkeypatch.setattr(os, "listdir", counting_listdir)
+
+    file_index = FileIndex()
+    assert file_index.exists(Path("Artist", "Song 1.mp3"))
+    assert not file_index.exists(Path("Artist", "Song 2.mp3"))
+    assert not file_index.exists(Path("Missing", "Song 1.mp3"))
+
+    file_index.add(Path("Artist", "Song 2.mp3"))
+    file_index.discard(Path("Artist", "Song 1.mp3"))
+
+    assert file_index.exists(Path("Artist", "Song 2.mp3"))
+    assert not file_index.exists(Path("Artist", "Song 1.mp3"))
+    assert listings == ["Artist", "Missing"]
+
+    # Changes made by others are seen once the index is cleared
+    Path("Artist", "Song 3.mp3").write_bytes(b"audio")
+    file_index.clear()
+    assert file_index.exists(Path("Artist", "Song 3.mp3"))
+    assert listings == ["Artist", "Missing", "Artist"]
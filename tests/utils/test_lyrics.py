@@ -0,0 +1,133 @@
+from pathlib import Path
+
+from spotdl.providers.lyrics.base import LyricsProvider
+from spotdl.types.song import Song
+from spotdl.utils import lrc, lyrics
+from spotdl.utils.lrc import generate_lrc
+from spotdl.utils.lyrics import LyricsResolver, SongLyrics, is_synced
+
+SYNCED_LYRICS = "[00:01.00] First line\n[00:02.50] Second line"
+PLAIN_LYRICS = "First line\nSecond line"
+
+
+class FakeProvider(LyricsProvider):
+    """
+    Lyrics provider that counts its searches.
+    """
+
+    def __init__(self, lyrics=None):
+        super().__init__()
+        self.lyrics = lyrics
+        self.calls = 0
+
+    def get_lyrics(self, name, artists, **_):
+        self.calls += 1
+        return self.lyrics
+
+
+class Synced(FakeProvider):
+    """
+    Fake provider named like the synced lyrics provider.
+    """
+
+
+def make_song():
+    return Song.from_missing_data(
+        name="Song",
+        artists=["Artist"],
+        artist="Artist",
+        url="https://open.spotify.com/track/1t2qKa8K72IBC8yQlhD9bU",
+    )
+
+
+def test_is_synced():
+    """
+    Test the detection of lrc timestamps.
+    """
+
+    assert is_synced(SYNCED_LYRICS) is True
+    assert is_synced(PLAIN_LYRICS) is False
+    assert is_synced("") is False
+
+
+def test_lyrics_resolver_cache(monkeypatch):
+    """
+    Test that providers are searched in order, once per song.
+    """
+
+    def fail_search(*_, **__):
+        raise AssertionError("synced lyrics searched without find_synced")
+
+    monkeypatch.setattr(lyrics, "syncedlyrics_search", fail_search)
+
+    empty_provider = FakeProvider()
+    plain_provider = FakeProvider(PLAIN_LYRICS)
+    last_provider = FakeProvider(SYNCED_LYRICS)
+    resolver = LyricsResolver([empty_provider, plain_provider, last_provider])
+
+    song = make_song()
+    song_lyrics = resolver.resolve(song)
+    assert song_lyrics.lyrics == PLAIN_LYRICS
+    assert song_lyrics.plain == PLAIN_LYRICS
+    assert song_lyrics.synced is None
+
+    assert resolver.resolve(make_song()) is song_lyrics
+    assert resolver.resolve_batch([make_song(), make_song()]) == [song_lyrics] * 2
+    assert (empty_provider.calls, plain_provider.calls, last_provider.calls) == (
+        1,
+        1,
+        0,
+    )
+
+
+def test_lyrics_resolver_synced(monkeypatch):
+    """
+    Test that synced lyrics are searched once more only when needed.
+    """
+
+    searches = []
+
+    def fake_search(query, **_):
+        searches.append(query)
+        return SYNCED_LYRICS
+
+    monkeypatch.setattr(lyrics, "syncedlyrics_search", fake_search)
+
+    resolver = LyricsResolver([FakeProvider(PLAIN_LYRICS)], find_synced=True)
+    song_lyrics = resolver.resolve(make_song())
+    assert song_lyrics.lyrics == PLAIN_LYRICS
+    assert song_lyrics.synced == SYNCED_LYRICS
+    assert song_lyrics.lrc == SYNCED_LYRICS
+    assert searches == ["Artist - Song"]
+
+    # The synced provider already searched, no need to search again
+    resolver = LyricsResolver([Synced(), FakeProvider(PLAIN_LYRICS)], find_synced=True)
+    song_lyrics = resolver.resolve(make_song())
+    assert song_lyrics.lrc == PLAIN_LYRICS
+    assert searches == ["Artist - Song"]
+
+
+def test_generate_lrc_resolved_lyrics(tmpdir, monkeypatch):
+    """
+    Test that the lrc file is written from the resolved lyrics without a search.
+    """
+
+    def fail_search(*_, **__):
+        raise AssertionError("lyrics searched again")
+
+    monkeypatch.setattr(lrc, "syncedlyrics_search", fail_search)
+
+    output_file = Path(tmpdir) / "Artist - Song.mp3"
+    song_lyrics = SongLyrics()
+    song_lyrics.add(SYNCED_LYRICS)
+    generate_lrc(make_song(), output_file, song_lyrics)
+
+    lrc_file = output_file.with_suffix(".lrc")
+    assert lrc_file.read_text(encoding="utf-8").strip() == SYNCED_LYRICS
+
+    # Synced lyrics already on the song are reused too
+    lrc_file.unlink()
+    song = make_song()
+    song.lyrics = SYNCED_LYRICS
+    generate_lrc(song, output_file)
+    assert lrc_file.exists()
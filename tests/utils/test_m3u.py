@@ -1,7 +1,16 @@
+import os
+from pathlib import Path
+
 import pytest
 
 from spotdl.types.playlist import Playlist
-from spotdl.utils.m3u import create_m3u_content, create_m3u_file
+from spotdl.types.song import Song
+from spotdl.utils.m3u import (
+    M3UWriter,
+    create_m3u_content,
+    create_m3u_file,
+    gen_m3u_files,
+)
 
 PLAYLIST = "https://open.spotify.com/playlist/5LkNhFidYyyjRWwnkcMbQs"
 
@@ -18,8 +27,67 @@ def test_create_m3u_content():
     assert content.split("\n")[1].startswith("#EXTINF:")
     assert content.split("\n")[2].endswith(".mp3")
 
+
 def test_create_m3u_file(tmpdir, monkeypatch):
     monkeypatch.chdir(tmpdir)
     playlist = Playlist.from_url(PLAYLIST)
     create_m3u_file("test.m3u", playlist.songs, "", "mp3")
     assert tmpdir.join("test.m3u").isfile() is True
+
+
+def test_m3u_writer(tmpdir, monkeypatch):
+    """
+    Test that existing files are detected with one listing per directory,
+    and that songs in several lists are rendered once.
+    """
+
+    monkeypatch.chdir(tmpdir)
+    Path("Artist").mkdir()
+    Path("Artist", "Song 1.opus").write_bytes(b"audio")
+    Path("Artist", "Song 2.mp3").write_bytes(b"audio")
+
+    songs = [
+        Song.from_missing_data(
+            name=f"Song {index}",
+            artists=["Artist"],
+            artist="Artist",
+            album_artist="Artist",
+            duration=200,
+            url=f"https://open.spotify.com/track/{index}",
+            list_name=list_name,
+        )
+        for list_name in ("First", "Second")
+        for index in range(1, 4)
+    ]
+
+    listings = []
+    listdir = os.listdir
+
+    def counting_listdir(path):
+        listings.append(path)
+        return listdir(path)
+
+    monkeypatch.setattr(os, "listdir", counting_listdir)
+
+    gen_m3u_files(
+        songs,
+        "{list}.m3u8",
+        "{artist}/{title}",
+        "mp3",
+        detect_formats=["opus", "mp3"],
+    )
+
+    assert listings == ["Artist"]
+    assert Path("First.m3u8").read_text(encoding="utf-8") == (
+        "#EXTM3U\n"
+        "#EXTINF:200,Artist - Song 1\nArtist/Song 1.opus\n"
+        "#EXTINF:200,Artist - Song 2\nArtist/Song 2.mp3\n"
+        "#EXTINF:200,Artist - Song 3\nArtist/Song 3.mp3\n"
+    )
+    assert Path("Second.m3u8").read_text(encoding="utf-8") == Path(
+        "First.m3u8"
+    ).read_text(encoding="utf-8")
+
+    writer = M3UWriter("{artist}/{title}", "mp3")
+    writer.write_file("all.m3u8", songs)
+    assert len(writer.entries) == 3
@@ -0,0 +1,52 @@
+import os
+from pathlib import Path
+
+from spotdl.utils.meta_index import METADATA_VERSION, MetaIndex
+
+
+def test_meta_index(tmpdir):
+    """
+    Test that files are current until they change, and that the index is saved.
+    """
+
+    song_file = Path(tmpdir) / "song.mp3"
+    song_file.write_bytes(b"audio")
+
+    index = MetaIndex()
+    assert index.is_current(song_file) is False
+
+    index.add_file(song_file, "1t2qKa8K72IBC8yQlhD9bU")
+    assert index.is_current(song_file) is True
+
+    index_file = Path(tmpdir) / "meta_index.json"
+    index.save(index_file)
+
+    loaded_index = MetaIndex()
+    assert loaded_index.load(index_file) is True
+    assert loaded_index.is_current(song_file) is True
+    assert loaded_index[MetaIndex.get_key(song_file)]["version"] == METADATA_VERSION
+
+    # A modified file has to be processed again
+    song_file.write_bytes(b"new audio")
+    stat_result = os.stat(song_file)
+    os.utime(song_file, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 1))
+    assert loaded_index.is_current(song_file) is False
+
+    # So does a file tagged by an older version
+    loaded_index.add_file(song_file, None)
+    loaded_index[MetaIndex.get_key(song_file)]["version"] = METADATA_VERSION - 1
+    assert loaded_index.is_current(song_file) is False
+
+
+def test_meta_index_missing_file(tmpdir):
+    """
+    Test that a missing or broken index file is ignored.
+    """
+
+    index = MetaIndex()
+    assert index.load(Path(tmpdir) / "missing.json") is False
+
+    broken_file = Path(tmpdir) / "broken.json"
+    broken_file.write_text("{", encoding="utf-8")
+    assert index.load(broken_file) is False
+    assert len(index) == 0
@@ -7,7 +7,7 @@
 import spotdl.utils.ffmpeg
 from spotdl.types.song import Song
 from spotdl.utils.ffmpeg import convert
-from spotdl.utils.metadata import embed_metadata, get_file_metadata
+from spotdl.utils.metadata import TAG_PADDING, embed_metadata, get_file_metadata
 
 
 @pytest.mark.parametrize(
@@ -90,3 +90,80 @@ def test_embed_metadata(tmpdir, monkeypatch, output_format):
             continue
 
         assert file_metadata[key] == value
+
+
+def create_mp3(path: Path, frames: int = 2000) -> Path:
+    """
+    Create a silent mp3 file without tags, 128kbps 44.1kHz.
+    """
+
+    frame = b"\xff\xfb\x90\x64" + b"\x00" * 413
+    path.write_bytes(frame * frames)
+
+    return path
+
+
+def get_bytes_written() -> int:
+    """
+    Get the number of bytes written by the process so far.
+    """
+
+    with open("/proc/self/io", "r", encoding="utf-8") as io_file:
+        for line in io_file:
+            if line.startswith("wchar:"):
+                return int(line.split()[1])
+
+    raise RuntimeError("wchar not found")
+
+
+@pytest.mark.skipif(not Path("/proc/self/io").exists(), reason="Linux only")
+def test_embed_metadata_bytes_written(tmpdir):
+    """
+    Benchmark bytes written per song. Tagging a new file rewrites it once,
+    and updating the tags later is done in place.
+    """
+
+    output_file = create_mp3(Path(tmpdir) / "test.mp3")
+    audio_size = output_file.stat().st_size
+
+    song = Song.from_missing_data(
+        name="Ropes",
+        artists=["Dirty Palm", "Chandler Jewels"],
+        artist="Dirty Palm",
+        album_name="Ropes",
+        album_artist="Dirty Palm",
+        genres=["gaming edm"],
+        disc_number=1,
+        disc_count=1,
+        track_number=1,
+        tracks_count=1,
+        year=2021,
+        date="2021-10-28",
+        isrc="GB2LD2110301",
+        publisher="",
+        url="https://open.spotify.com/track/1t2qKa8K72IBC8yQlhD9bU",
+        download_url="link",
+        popularity=50,
+        lyrics="line one\nline two",
+    )
+
+    written = get_bytes_written()
+    embed_metadata(output_file, song)
+    first_write = get_bytes_written() - written
+
+    song.lyrics = "updated lyrics\n" * 100
+    written = get_bytes_written()
+    embed_metadata(output_file, song)
+    update_write = get_bytes_written() - written
+
+    # The audio is moved once, not once per save
+    assert first_write < audio_size * 1.5
+
+    # The update fits in the padding, only the tags are written
+    assert update_write < TAG_PADDING * 2
+
+    file_metadata = get_file_metadata(output_file)
+    assert file_metadata is not None
+    assert file_metadata["name"] == "Ropes"
+    assert file_metadata["artists"] == ["Dirty Palm", "Chandler Jewels"]
+    assert file_metadata["lyrics"] == song.lyrics
@@ -0,0 +1,101 @@
+import random
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import spotdl.utils.pagination
+from spotdl.utils.pagination import get_all_items, get_page_urls
+from spotdl.utils.spotify import PRIORITY_BULK, get_request_priority, request_priority
+
+HREF = "https://api.spotify.com/v1/playlists/test/tracks"
+
+
+def make_page(offset, total, limit=100):
+    return {
+        "href": f"{HREF}?offset={offset}&limit={limit}",
+        "items": list(range(offset, min(offset + limit, total))),
+        "limit": limit,
+        "offset": offset,
+        "total": total,
+        "next": (
+            f"{HREF}?offset={offset + limit}&limit={limit}&additional_types=track"
+            if offset + limit < total
+            else None
+        ),
+    }
+
+
+class FakeSpotifyClient:
+    """
+    Spotify client serving the pages of a 1050 item list out of order,
+    recording the offset and priority of the requests.
+    """
+
+    requests = []
+    priorities = []
+    lock = threading.Lock()
+
+    def next(self, result):
+        offset = int(parse_qs(urlsplit(result["next"]).query)["offset"][0])
+        with self.lock:
+            self.requests.append(offset)
+            self.priorities.append(get_request_priority())
+
+        time.sleep(random.random() / 100)
+        return make_page(offset, 1050)
+
+
+def test_get_page_urls():
+    """
+    Test that the remaining pages are computed from the first page.
+    """
+
+    urls = get_page_urls(make_page(0, 350))
+
+    assert urls == [
+        f"{HREF}?offset=100&limit=100&additional_types=track",
+        f"{HREF}?offset=200&limit=100&additional_types=track",
+        f"{HREF}?offset=300&limit=100&additional_types=track",
+    ]
+    assert get_page_urls(make_page(0, 50)) == []
+
+    # Cursor based pages can't be computed
+    assert get_page_urls({"items": [], "next": f"{HREF}?after=abc", "total": 5}) is None
+
+
+def test_get_all_items(monkeypatch):
+    """
+    Test that the pages are fetched concurrently and kept in order,
+    with the priority of the calling thread.
+    """
+
+    FakeSpotifyClient.requests = []
+    FakeSpotifyClient.priorities = []
+    monkeypatch.setattr(spotdl.utils.pagination, "SpotifyClient", FakeSpotifyClient)
+
+    with request_priority(PRIORITY_BULK):
+        items = get_all_items(make_page(0, 1050), threads=4)
+
+    assert items == list(range(1050))
+    assert sorted(FakeSpotifyClient.requests) == list(range(100, 1050, 100))
+    assert FakeSpotifyClient.priorities == [PRIORITY_BULK] * 10
+
+
+def test_get_all_items_cursor(monkeypatch):
+    """
+    Test that cursor based pages are followed one by one.
+    """
+
+    pages = {
+        "page 2": {"artists": {"items": [3, 4], "next": "page 3"}},
+        "page 3": {"artists": {"items": [5], "next": None}},
+    }
+
+    class CursorSpotifyClient:
+        def next(self, result):
+            return pages[result["next"]]
+
+    monkeypatch.setattr(spotdl.utils.pagination, "SpotifyClient", CursorSpotifyClient)
+
+    first_page = {"href": "page 1", "items": [1, 2], "next": "page 2", "total": 5}
+    assert get_all_items(first_page, key="artists") == [1, 2, 3, 4, 5]
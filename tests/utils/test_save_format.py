@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+from spotdl.console.sync import load_sync_file
+from spotdl.types.song import Song
+from spotdl.utils.save_format import (
+    SaveFileWriter,
+    is_ndjson,
+    iter_songs,
+    load_save_file,
+    write_save_file,
+)
+from spotdl.utils.search import get_simple_songs
+
+
+def make_songs(count: int):
+    return [
+        Song.from_missing_data(
+            name=f"Sóng {index}",
+            artists=["Artist"],
+            artist="Artist",
+            url=f"https://open.spotify.com/track/{index}",
+        ).json
+        for index in range(count)
+    ]
+
+
+@pytest.mark.parametrize("header", [None, {"type": "sync", "query": ["saved"]}])
+def test_legacy_format(tmpdir, header):
+    """
+    Test that the legacy format is written like `json.dump` with an indent.
+    """
+
+    path = tmpdir / "test.spotdl"
+    songs = make_songs(3)
+
+    assert write_save_file(path, iter(songs), header) == 3
+
+    expected = songs if header is None else {**header, "songs": songs}
+    assert path.read_text("utf-8") == json.dumps(expected, indent=4, ensure_ascii=False)
+    assert load_save_file(path) == (header or {}, songs)
+    assert list(iter_songs(path)) == songs
+    assert not is_ndjson(path)
+
+
+def test_ndjson_format(tmpdir):
+    """
+    Test that compact files store one song per line and are read transparently.
+    """
+
+    path = tmpdir / "test.spotdl"
+    songs = make_songs(3)
+
+    write_save_file(path, songs, {"type": "sync", "query": ["saved"]}, "ndjson")
+
+    lines = path.read_text("utf-8").splitlines()
+    assert len(lines) == 4
+    assert json.loads(lines[1]) == songs[0]
+    assert is_ndjson(path)
+
+    header, loaded = load_save_file(path)
+    assert header["type"] == "sync" and header["query"] == ["saved"]
+    assert loaded == songs
+    assert list(iter_songs(path)) == songs
+
+    sync_data = load_sync_file(str(path))
+    assert sync_data["format"] == "ndjson"
+    assert sync_data["songs"] == songs
+
+    # Save files are read by the download and sync operations
+    write_save_file(path, songs, save_format="ndjson")
+    assert [song.url for song in get_simple_songs([str(path)])] == [
+        song["url"] for song in songs
+    ]
+
+
+def test_interrupted_write(tmpdir):
+    """
+    Test that an interrupted write keeps the previous file.
+    """
+
+    path = tmpdir / "test.spotdl"
+    write_save_file(path, make_songs(2), save_format="ndjson")
+
+    with pytest.raises(RuntimeError):
+        with SaveFileWriter(path) as writer:
+            writer.write(make_songs(1)[0])
+            raise RuntimeError("interrupted")
+
+    assert len(list(iter_songs(path))) == 2
+    assert [file.basename for file in tmpdir.listdir()] == ["test.spotdl"]
@@ -1,6 +1,23 @@
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
 import pytest
+from spotipy.exceptions import SpotifyException
 
-from spotdl.utils.spotify import SpotifyClient, SpotifyError
+import spotdl.utils.spotify
+from spotdl.utils.spotify import (
+    PRIORITY_BULK,
+    PRIORITY_DEFAULT,
+    PRIORITY_INTERACTIVE,
+    RequestScheduler,
+    SpotifyClient,
+    SpotifyError,
+    get_endpoint,
+    get_retry_after,
+)
 
 
 def test_init(patch_dependencies):
@@ -37,3 +54,195 @@ def test_multiple_init():
             user_auth=False,
             no_cache=True,
         )
+
+
+def test_scheduler_priority():
+    """
+    Test that waiting requests are sent in order of priority.
+    """
+
+    scheduler = RequestScheduler(rate=20, burst=1)
+    scheduler.acquire()
+
+    sent = []
+    lock = threading.Lock()
+
+    def send(priority):
+        scheduler.acquire(priority)
+        with lock:
+            sent.append(priority)
+
+    threads = [
+        threading.Thread(target=send, args=(priority,))
+        for priority in (PRIORITY_BULK, PRIORITY_DEFAULT, PRIORITY_INTERACTIVE)
+    ]
+
+    # Queue every request before a token is available
+    for thread in threads:
+        thread.start()
+        time.sleep(0.005)
+
+    for thread in threads:
+        thread.join()
+
+    assert sent == [PRIORITY_INTERACTIVE, PRIORITY_DEFAULT, PRIORITY_BULK]
+    assert scheduler.get_metrics()["requests"] == 4
+
+
+def test_scheduler_rate():
+    """
+    Test that requests after the burst are limited by the token bucket.
+    """
+
+    scheduler = RequestScheduler(rate=100, burst=5)
+
+    start = time.monotonic()
+    for _ in range(15):
+        scheduler.acquire()
+    elapsed = time.monotonic() - start
+
+    assert elapsed >= 0.09
+    assert scheduler.get_metrics()["max_queue_wait"] > 0
+
+
+def test_rate_limited_request(monkeypatch):
+    """
+    Test that a rate limited request pauses the scheduler and is retried.
+    """
+
+    scheduler = RequestScheduler()
+    monkeypatch.setattr(spotdl.utils.spotify, "get_scheduler", lambda: scheduler)
+
+    calls = []
+
+    def internal_call(method, url, payload, params):
+        calls.append(url)
+        if len(calls) <= 2:
+            raise SpotifyException(
+                429, -1, "rate limited", headers={"Retry-After": "0.05"}
+            )
+
+        return {"url": url}
+
+    client = SimpleNamespace(max_retries=3, _internal_call=internal_call)
+
+    start = time.monotonic()
+    response = SpotifyClient._send_get(client, "tracks/1", None, {})  # type: ignore
+
+    assert response == {"url": "tracks/1"}
+    assert calls == ["tracks/1"] * 3
+    assert time.monotonic() - start >= 0.1
+
+    metrics = scheduler.get_metrics()
+    assert metrics["throttled"] == 2
+    assert metrics["backoff"] == pytest.approx(0.1)
+    assert metrics["requests"] == 3
+
+
+def test_get_retry_after():
+    """
+    Test that the Retry-After header is used, with an exponential backoff
+    when it is missing.
+    """
+
+    exception = SpotifyException(429, -1, "", headers={"Retry-After": "3"})
+    assert get_retry_after(exception) == 3
+    assert get_retry_after(SpotifyException(429, -1, ""), 2) == 4
+
+
+def make_cache_client(send_get, no_cache=False):
+    return SimpleNamespace(
+        no_cache=no_cache,
+        cache={},
+        cache_lock=threading.Lock(),
+        in_flight={},
+        cache_metrics={
+            "hits": Counter(),
+            "misses": Counter(),
+            "coalesced": Counter(),
+        },
+        _send_get=send_get,
+    )
+
+
+def test_request_coalescing():
+    """
+    Test that concurrent identical requests share a single call to Spotify.
+    """
+
+    calls = []
+
+    def send_get(url, payload, params):
+        calls.append(url)
+        time.sleep(0.05)
+        return {"id": url}
+
+    client = make_cache_client(send_get)
+    barrier = threading.Barrier(16)
+
+    def get_album(_):
+        barrier.wait()
+        return SpotifyClient._get(client, "albums/1")  # type: ignore
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        responses = list(executor.map(get_album, range(16)))
+
+    assert calls == ["albums/1"]
+    assert all(response == {"id": "albums/1"} for response in responses)
+    assert client.in_flight == {}
+    assert client.cache_metrics["misses"] == {"albums": 1}
+    assert (
+        client.cache_metrics["coalesced"]["albums"]
+        + client.cache_metrics["hits"]["albums"]
+        == 15
+    )
+
+    # Later requests are served from the cache
+    SpotifyClient._get(client, "albums/1")  # type: ignore
+    assert len(calls) == 1
+
+
+def test_request_coalescing_error():
+    """
+    Test that the error of a shared request is raised in every waiting thread,
+    and that the request is sent again afterwards.
+    """
+
+    calls = []
+
+    def send_get(url, payload, params):
+        calls.append(url)
+        time.sleep(0.05)
+        if len(calls) == 1:
+            raise SpotifyException(500, -1, "server error")
+
+        return {"id": url}
+
+    client = make_cache_client(send_get, no_cache=True)
+    barrier = threading.Barrier(4)
+
+    def get_artist(_):
+        barrier.wait()
+        try:
+            return SpotifyClient._get(client, "artists/1")  # type: ignore
+        except SpotifyException as exception:
+            return exception.http_status
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        assert list(executor.map(get_artist, range(4))) == [500] * 4
+
+    assert client.in_flight == {}
+    response = SpotifyClient._get(client, "artists/1")  # type: ignore
+    assert response == {"id": "artists/1"}
+    assert client.cache == {}
+
+
+def test_get_endpoint():
+    """
+    Test that requests are grouped by endpoint in the metrics.
+    """
+
+    assert get_endpoint("albums/1") == "albums"
+    assert get_endpoint("https://api.spotify.com/v1/artists/1/albums?limit=50") == (
+        "artists"
+    )
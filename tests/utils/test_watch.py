@@ -0,0 +1,75 @@
+import spotdl.utils.watch
+from spotdl.utils.watch import get_snapshot_ids
+
+
+class FakeSpotifyClient:
+    """
+    Spotify client that records the requests.
+    """
+
+    calls = []
+
+    def playlist(self, playlist_id, fields=None):
+        self.calls.append(("playlist", playlist_id, fields))
+        return {"snapshot_id": "snapshot"}
+
+    def artist_albums(self, artist_id, include_groups=None, limit=20):
+        self.calls.append(("artist_albums", artist_id, limit))
+        return {"total": 12, "items": [{"id": "latest"}]}
+
+    def current_user_saved_tracks(self, limit=20):
+        self.calls.append(("current_user_saved_tracks", limit))
+        return {"total": 0, "items": []}
+
+    def albums(self, albums):
+        self.calls.append(("albums", len(albums)))
+        return {
+            "albums": [
+                {"id": album.split("/")[-1], "total_tracks": 10} for album in albums
+            ]
+        }
+
+
+def test_get_snapshot_ids(monkeypatch):
+    """
+    Test that lists are checked without fetching their tracks,
+    and that albums are checked in bulk.
+    """
+
+    FakeSpotifyClient.calls = []
+    monkeypatch.setattr(spotdl.utils.watch, "SpotifyClient", FakeSpotifyClient)
+
+    playlist = "https://open.spotify.com/playlist/37i9dQZF1E8UXBoz02kGID"
+    artist = "https://open.spotify.com/artist/1uNFoZAHBGtllmzznpCI3s"
+    track = "https://open.spotify.com/track/1t2qKa8K72IBC8yQlhD9bU"
+    albums = [f"https://open.spotify.com/album/{index}" for index in range(25)]
+
+    snapshot_ids = get_snapshot_ids(
+        [playlist, artist, track, "saved", "search term", *albums], 4
+    )
+
+    assert snapshot_ids[playlist] == "snapshot"
+    assert snapshot_ids[artist] == "12:latest"
+    assert snapshot_ids[track] == "track"
+    assert snapshot_ids["saved"] == "0:"
+    assert snapshot_ids["search term"] is None
+    assert snapshot_ids[albums[24]] == "24:10"
+    assert list(snapshot_ids) == [
+        playlist,
+        artist,
+        track,
+        "saved",
+        "search term",
+        *albums,
+    ]
+
+    assert sorted(FakeSpotifyClient.calls, key=str) == sorted(
+        [
+            ("playlist", playlist, "snapshot_id"),
+            ("artist_albums", artist, 1),
+            ("current_user_saved_tracks", 1),
+            ("albums", 20),
+            ("albums", 5),
+        ],
+        key=str,
+    )
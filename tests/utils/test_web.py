@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import threading
+import time
+
+from spotdl.types.song import Song
+from spotdl.utils.web import Client, app_state
+from spotdl.utils.web_engine import DownloadEngine, run_batch
+
+
+class FakeJob:
+    def __init__(self, order, lock, running, peak):
+        self.order = order
+        self.lock = lock
+        self.running = running
+        self.peak = peak
+
+    def search_and_download(self, song):
+        with self.lock:
+            self.running[0] += 1
+            self.peak[0] = max(self.peak[0], self.running[0])
+            self.order.append(song)
+
+        time.sleep(0.02)
+
+        with self.lock:
+            self.running[0] -= 1
+
+        return song, None
+
+
+def test_download_engine_budget_and_fairness(monkeypatch):
+    """
+    Test that the engine never runs more than `max_workers` jobs
+    and that queued jobs are taken from the clients in turn.
+    """
+
+    loop = asyncio.new_event_loop()
+    engine = DownloadEngine(loop, max_workers=1)
+
+    order = []
+    lock = threading.Lock()
+    running, peak = [0], [0]
+
+    async def get_downloader(_settings):
+        return None
+
+    monkeypatch.setattr(engine, "get_downloader", get_downloader)
+    monkeypatch.setattr(
+        engine,
+        "create_job",
+        lambda *_: FakeJob(order, lock, running, peak),
+    )
+
+    async def run():
+        jobs = [engine.download("a", f"a{i}", {}, None) for i in range(3)]
+        jobs += [engine.download("b", f"b{i}", {}, None) for i in range(3)]
+        return await asyncio.gather(*jobs)
+
+    results = loop.run_until_complete(run())
+    loop.close()
+
+    assert len(results) == 6
+    assert peak[0] == 1
+    assert engine.active == 0
+    # a0 starts right away, after that the clients take turns
+    assert order == ["a0", "a1", "b0", "a2", "b1", "b2"]
+
+
+def test_download_engine_key():
+    """
+    Test that only the options baked into a downloader change its key.
+    """
+
+    settings = {"format": "mp3", "output": "a", "scan_for_songs": False}
+
+    assert DownloadEngine.get_engine_key(settings) == DownloadEngine.get_engine_key(
+        {**settings, "output": "b"}
+    )
+    assert DownloadEngine.get_engine_key(settings) != DownloadEngine.get_engine_key(
+        {**settings, "format": "flac"}
+    )
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_json(self, data):
+        await asyncio.sleep(0.01)
+        self.sent.append(data)
+
+
+class FakeTracker:
+    def __init__(self, song):
+        self.song = song
+        self.progress = 0
+
+
+def test_client_coalesces_song_updates(monkeypatch):
+    """
+    Test that progress updates are coalesced and that the full song
+    is only sent with the first update.
+    """
+
+    loop = asyncio.new_event_loop()
+    monkeypatch.setattr(app_state, "loop", loop, raising=False)
+    monkeypatch.setattr(app_state, "downloader_settings", {}, raising=False)
+
+    websocket = FakeWebSocket()
+    client = Client(websocket, "client")  # type: ignore
+    song = Song.from_missing_data(name="test", song_id="id", url="url")
+    tracker = FakeTracker(song)
+
+    def worker():
+        for progress in range(101):
+            tracker.progress = progress
+            client.song_update(tracker, "Downloading")  # type: ignore
+
+    async def run():
+        await asyncio.to_thread(worker)
+        while client.flush_scheduled:
+            await asyncio.sleep(0.05)
+
+    loop.run_until_complete(run())
+    loop.close()
+
+    assert 1 <= len(websocket.sent) < 101
+    assert websocket.sent[0]["song"] == song.json
+    assert websocket.sent[-1]["progress"] == 100
+    assert all(
+        update["song"] == {"song_id": "id", "url": "url"}
+        for update in websocket.sent[1:]
+    )
+
+
+def test_client_sends_changed_songs(monkeypatch):
+    """
+    Test that the full song is sent again when its fields change.
+    """
+
+    monkeypatch.setattr(app_state, "downloader_settings", {}, raising=False)
+
+    client = Client(FakeWebSocket(), "client")  # type: ignore
+    song = Song.from_missing_data(name="test", song_id="id", url="url")
+    tracker = FakeTracker(song)
+
+    update = client.create_update(tracker, 0, "Searching")  # type: ignore
+    assert update["song"] == song.json
+
+    update = client.create_update(tracker, 10, "Downloading")  # type: ignore
+    assert update["song"] == {"song_id": "id", "url": "url"}
+
+    song.download_url = "https://music.youtube.com/watch?v=id"
+    update = client.create_update(tracker, 50, "Converting")  # type: ignore
+    assert update["song"] == song.json
+    assert update["song"]["download_url"] == song.download_url
+
+
+def test_run_batch_reports_engine_errors(monkeypatch):
+    """
+    Test that the client is told when the batch can't be started.
+    """
+
+    monkeypatch.setattr(app_state, "downloader_settings", {}, raising=False)
+
+    class FailingEngine:
+        async def get_downloader(self, settings):
+            raise RuntimeError("ffmpeg not found")
+
+    class FakeState:
+        engine = FailingEngine()
+        logger = logging.getLogger(__name__)
+
+    websocket = FakeWebSocket()
+    client = Client(websocket, "client")  # type: ignore
+    songs = [Song.from_missing_data(name="test", song_id="id", url="url")]
+
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(
+        run_batch("batch", songs, {}, client, FakeState())  # type: ignore
+    )
+    loop.close()
+
+    assert websocket.sent == [
+        {
+            "batch_id": "batch",
+            "finished": True,
+            "downloaded": 0,
+            "failed": 1,
+            "error": "ffmpeg not found",
+        }
+    ]
@@ -375,31 +375,24 @@ async def execute_download(
                 traceback.print_exc()
                 raise Exception(error_msg)  # 直接抛出原始错误信息，不重复包装
         else:
-            # 批量下载：获取歌曲列表（已下载到临时目录）
-            print(f"[{task_id}] 批量模式，获取歌曲列表...")
-            status.message = "正在获取歌曲列表..."
-            audio_files = await asyncio.to_thread(downloader.get_songs_list, url)
-            status.total = len(audio_files)
-            status.message = f"找到 {len(audio_files)} 首歌曲"
-            print(f"[{task_id}] 找到 {len(audio_files)} 首歌曲")
+            # 批量下载：每首歌下载完成后立即处理并加入结果列表，
+            # 后处理与剩余歌曲的下载同时进行
+            print(f"[{task_id}] 批量模式，边下载边处理...")
+            status.message = "正在下载歌曲..."
             
-            # 处理每首已下载的歌曲
-            downloaded_files = []
-            for i, audio_file in enumerate(audio_files, 1):
-                status.progress = i
-                status.current_song = f"正在处理第 {i}/{len(audio_files)} 首"
-                print(f"\n[{task_id}] 处理进度: {i}/{len(audio_files)}")
-                print(f"[{task_id}] 文件: {audio_file}")
-                
-                try:
-                    # 处理已下载的文件
-                    result = await asyncio.to_thread(
-                        downloader.process_single_file,
-                        audio_file
-                    )
+            def discovered_songs():
+                for audio_file in downloader.iter_songs(url):
+                    status.total += 1
+                    print(f"[{task_id}] 下载完成: {audio_file.name}")
+                    yield audio_file
+            
+            def run_batch():
+                for audio_file, result in downloader.process_files(discovered_songs()):
+                    status.progress += 1
+                    status.current_song = audio_file.stem
+                    status.message = f"已处理 {status.progress} 首（已下载 {status.total} 首）"
                     
                     if result:
-                        downloaded_files.append(result)
                         status.files.append({
                             "name": result["song_name"],
                             "path": result["directory"],
@@ -407,13 +400,10 @@ async def execute_download(
                         })
                         print(f"[{task_id}] ✅ 处理成功: {result['song_name']}")
                     else:
-                        print(f"[{task_id}] ⚠️  处理返回空结果")
-                    
-                except Exception as e:
-                    print(f"[{task_id}] ❌ 处理失败: {str(e)}")
-                    import traceback
-                    traceback.print_exc()
-                    continue
+                        print(f"[{task_id}] ⚠️  处理返回空结果: {audio_file.name}")
+            
+            await asyncio.to_thread(run_batch)
+            print(f"[{task_id}] 共下载 {status.total} 首歌曲")
             
             # 清理临时目录
             temp_dir = downloader.output_dir / "temp"